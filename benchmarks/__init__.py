@@ -0,0 +1 @@
+"""パイプラインのベンチマーク用パッケージ"""
@@ -0,0 +1,81 @@
+"""clean_text() のマイクロベンチマーク
+
+1 MBのテキストに対して、従来の実装（encode/decode + 正規表現2回）と
+現在の実装（translateテーブル + split/join 1回）の所要時間を比較する。
+また、要約1回あたりに行っていた3回分のクリーニングと、
+CleanTextによって1回で済む場合の比較も出力する。
+
+使い方（リポジトリのルートで実行）:
+    python -m benchmarks.bench_clean_text --size-mb 1
+"""
+import argparse
+import random
+import re
+import sys
+import timeit
+
+from src.obsidian_automation.pdf_processor import clean_text
+
+from .synthetic_pdf import WORDS
+
+
+def legacy_clean_text(text):
+    """変更前の clean_text() の実装"""
+    if not text:
+        return ""
+    text = text.encode('utf-8', errors='ignore').decode('utf-8')
+    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def make_text(size_bytes, seed=0):
+    """PDF抽出結果に近い、改行・タブ・制御文字を含むテキストを生成"""
+    rng = random.Random(seed)
+    separators = [' ', ' ', ' ', '  ', '\n', '\t', ' \x0c', '\x00']
+    parts = []
+    length = 0
+    while length < size_bytes:
+        word = rng.choice(WORDS) + rng.choice(separators)
+        parts.append(word)
+        length += len(word)
+    return ''.join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='clean_textの速度を比較する')
+    parser.add_argument('--size-mb', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    text = make_text(int(args.size_mb * 1024 * 1024))
+    assert legacy_clean_text(text) == clean_text(text)
+
+    def best_ms(func):
+        return min(timeit.repeat(func, number=1, repeat=args.repeat)) * 1000
+
+    legacy = best_ms(lambda: legacy_clean_text(text))
+    current = best_ms(lambda: clean_text(text))
+    print(f"text size: {len(text) / 1024 / 1024:.2f} MB")
+    print(f"legacy clean_text   : {legacy:8.1f} ms")
+    print(f"single-pass clean   : {current:8.1f} ms  ({legacy / current:.1f}x)")
+
+    # 要約1回分: 変更前はページ・summarize_text・プロンプト全体の3回クリーニングしていた
+    def legacy_pipeline():
+        cleaned = legacy_clean_text(text)
+        cleaned = legacy_clean_text(cleaned)
+        legacy_clean_text(f"prompt\n\n{cleaned}")
+
+    def current_pipeline():
+        cleaned = clean_text(text)
+        clean_text(cleaned)  # CleanTextなので再処理されない
+
+    legacy_total = best_ms(legacy_pipeline)
+    current_total = best_ms(current_pipeline)
+    print(f"per-summary (3x legacy) : {legacy_total:8.1f} ms")
+    print(f"per-summary (clean once): {current_total:8.1f} ms  "
+          f"({legacy_total / current_total:.1f}x)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
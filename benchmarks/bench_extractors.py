@@ -0,0 +1,86 @@
+"""PDFテキスト抽出バックエンドの比較ベンチマーク
+
+インストール済みの各バックエンドで同じコーパスを抽出し、
+pages/second と抽出文字数を出力する。
+
+使い方（リポジトリのルートで実行）:
+    python -m benchmarks.bench_extractors                 # 合成コーパス
+    python -m benchmarks.bench_extractors --corpus ~/Papers  # 手元のPDF
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+from src.obsidian_automation.pdf_extractors import EXTRACTORS, get_extractor
+from src.obsidian_automation.pdf_processor import clean_text
+
+from .synthetic_pdf import generate_corpus
+
+
+def run_backend(name, pdf_paths):
+    """1つのバックエンドでコーパス全体を抽出し、計測結果を返す"""
+    extractor = get_extractor(name)
+    pages = 0
+    raw_chars = 0
+    cleaned_chars = 0
+    failures = 0
+    start = time.perf_counter()
+    for pdf_path in pdf_paths:
+        try:
+            for page_text in extractor.iter_page_texts(pdf_path):
+                pages += 1
+                if page_text:
+                    raw_chars += len(page_text)
+                    cleaned_chars += len(clean_text(page_text))
+        except Exception as e:
+            failures += 1
+            print(f"  {name}: {os.path.basename(pdf_path)} の抽出に失敗: {e}")
+    elapsed = time.perf_counter() - start
+    return {
+        'pages': pages,
+        'elapsed': elapsed,
+        'raw_chars': raw_chars,
+        'cleaned_chars': cleaned_chars,
+        'failures': failures,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='PDF抽出バックエンドごとの速度と抽出文字数を比較する')
+    parser.add_argument('--corpus',
+                        help='PDFを含むディレクトリ（省略時は合成コーパスを生成）')
+    parser.add_argument('--papers', type=int, default=10,
+                        help='合成コーパスの論文数')
+    parser.add_argument('--backends', nargs='+', default=sorted(EXTRACTORS),
+                        help='比較するバックエンド名')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="obsidian-extract-") as work_dir:
+        if args.corpus:
+            pdf_paths = sorted(glob.glob(os.path.join(args.corpus, "*.pdf")))
+        else:
+            corpus = generate_corpus(work_dir, args.papers)
+            pdf_paths = [pdf_path for pdf_path, _ in corpus]
+        print(f"対象PDF: {len(pdf_paths)}本")
+
+        print(f"{'backend':<12}{'pages':>8}{'pages/s':>10}"
+              f"{'raw chars':>12}{'cleaned':>12}{'failed':>8}")
+        for name in args.backends:
+            extractor_class = EXTRACTORS.get(name)
+            if extractor_class is None or not extractor_class().is_available():
+                print(f"{name:<12}{'(not installed)':>20}")
+                continue
+            result = run_backend(name, pdf_paths)
+            pages_per_second = (result['pages'] / result['elapsed']
+                                if result['elapsed'] else 0.0)
+            print(f"{name:<12}{result['pages']:>8}{pages_per_second:>10.1f}"
+                  f"{result['raw_chars']:>12}{result['cleaned_chars']:>12}"
+                  f"{result['failures']:>8}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
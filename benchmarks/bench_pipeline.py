@@ -0,0 +1,262 @@
+"""main.main() のエンドツーエンド・ベンチマーク
+
+合成PDFコーパスを生成し、GeminiとZoteroをプロセス内フェイクに差し替えて
+パイプライン全体を実行する。直列/並列それぞれについて、スループット
+（papers/minute）、ステージごとのレイテンシ、ピークメモリを出力する。
+
+使い方（リポジトリのルートで実行）:
+    python -m benchmarks.bench_pipeline --papers 20 --workers 1 4
+    python -m benchmarks.bench_pipeline --gemini-latency 0.5 --rate-limit 0.1
+    python -m benchmarks.bench_pipeline --context-cache  # 固定プロンプトをキャッシュ
+    python -m benchmarks.bench_pipeline --max-pages 4 --pack  # 短い論文をまとめて要約
+    python -m benchmarks.bench_pipeline --min-pages 2 --max-pages 120 --route-models
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import main as pipeline
+from src.obsidian_automation import (
+    config,
+    fingerprint,
+    keyword_manager,
+    model_router,
+    note_artifacts,
+    obsidian_note_creator,
+    pdf_processor,
+    prompt_cache,
+    resilience,
+    text_cache,
+    usage_ledger,
+    zotero_integrator,
+)
+
+from .fakes import FakeGenAI, FakeZoteroModule
+from .synthetic_pdf import generate_corpus
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(PROJECT_ROOT, "template", "template.md")
+
+# main.py から呼ばれる各ステージの関数名
+STAGES = {
+    'extract': 'extract_text_from_pdf',
+    'summarize': 'summarize_routed',
+    'zotero': 'get_zotero_item_info',
+    'note': 'create_obsidian_note',
+}
+
+
+class StageTimer:
+    """ステージごとの所要時間をスレッドセーフに記録する"""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.samples[stage].append(elapsed)
+        return timed
+
+
+def _percentile(values, ratio):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(ratio * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_pipeline(pdf_folder, work_dir, workers, args):
+    """フェイク環境で main.main() を1回実行し、計測結果を返す"""
+    note_folder = tempfile.mkdtemp(prefix=f"notes-w{workers}-", dir=work_dir)
+    keywords_file = os.path.join(note_folder, "keywords.json")
+
+    lite_latency = (args.lite_latency if args.lite_latency is not None
+                    else args.gemini_latency / 2)
+    fake_genai = FakeGenAI(latency=args.gemini_latency,
+                           rate_limit_ratio=args.rate_limit, seed=args.seed,
+                           model_latency={config.GEMINI_LITE_MODEL: lite_latency})
+    fake_zotero = FakeZoteroModule(latency=args.zotero_latency)
+    for pdf_name in os.listdir(pdf_folder):
+        fake_zotero.add_paper(os.path.splitext(pdf_name)[0])
+
+    original_init = keyword_manager.KeywordManager.__init__
+
+    def keyword_manager_init(self, keywords_file_arg=None):
+        original_init(self, keywords_file_arg or keywords_file)
+
+    timer = StageTimer()
+    with contextlib.ExitStack() as stack:
+        # 環境変数の検証を通すためのダミー値（実際のパスは下で差し替える）
+        for name in config.PIPELINE_REQUIRED_VARS:
+            stack.enter_context(patch.object(config, name, "benchmark"))
+        stack.enter_context(patch.object(pdf_processor, 'genai', fake_genai))
+        stack.enter_context(
+            patch.object(zotero_integrator, 'zotero', fake_zotero))
+        stack.enter_context(patch.object(pipeline, 'PDF_FOLDER', pdf_folder))
+        stack.enter_context(patch.object(pipeline, 'NOTE_FOLDER', note_folder))
+        stack.enter_context(
+            patch.object(obsidian_note_creator, 'NOTE_FOLDER', note_folder))
+        stack.enter_context(
+            patch.object(obsidian_note_creator, 'TEMPLATE_PATH', TEMPLATE_PATH))
+        stack.enter_context(patch.object(
+            keyword_manager.KeywordManager, '__init__', keyword_manager_init))
+        # フィンガープリント・抽出テキスト・ノートの作成データは
+        # プロジェクトのdata/ではなく実行ごとの一時フォルダに保存
+        stack.enter_context(patch.object(fingerprint, 'DATA_DIR', note_folder))
+        stack.enter_context(patch.object(text_cache, 'DATA_DIR', note_folder))
+        stack.enter_context(patch.object(note_artifacts, 'DATA_DIR', note_folder))
+        stack.enter_context(patch.object(zotero_integrator, 'DATA_DIR', note_folder))
+        stack.enter_context(patch.object(usage_ledger, 'DATA_DIR', note_folder))
+        stack.enter_context(patch.object(zotero_integrator, '_attachment_index', None))
+        stack.enter_context(patch.object(
+            zotero_integrator, 'ZOTERO_ATTACHMENT_LOOKUP', args.attachment_lookup))
+        # 注入した429の再試行は実際の秒単位ではなく短い待ち時間で行う
+        stack.enter_context(patch.object(resilience, 'RETRY_BASE_DELAY', 0.01))
+        stack.enter_context(patch.object(resilience, 'RETRY_MAX_DELAY', 0.1))
+        # main() が有効化したコンテキストキャッシュの設定を実行ごとに元へ戻す
+        stack.enter_context(patch.object(prompt_cache, '_enabled', False))
+        stack.enter_context(patch.object(model_router, '_enabled', False))
+        for stage, func_name in STAGES.items():
+            stack.enter_context(patch.object(
+                pipeline, func_name,
+                timer.wrap(stage, getattr(pipeline, func_name))))
+        if not args.verbose:
+            devnull = stack.enter_context(open(os.devnull, 'w'))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+
+        if args.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        main_args = ['--workers', str(workers)]
+        if args.context_cache:
+            main_args.append('--context-cache')
+        if args.pack:
+            main_args.append('--pack')
+        if args.route_models:
+            main_args.append('--route-models')
+        pipeline.main(main_args)
+        elapsed = time.perf_counter() - start
+        peak_memory = None
+        if args.trace_memory:
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    gemini_breaker = resilience.get_circuit_breaker('gemini')
+    usage = usage_ledger.get_run_usage()['total']
+    notes = [name for name in os.listdir(note_folder) if name.endswith('.md')]
+    return {
+        'workers': workers,
+        'elapsed': elapsed,
+        'notes': len(notes),
+        'peak_memory': peak_memory,
+        'stages': timer.samples,
+        'gemini_calls': len(fake_genai.calls),
+        'rate_limited': fake_genai.rate_limited_calls,
+        'retries': gemini_breaker.retries,
+        'pauses': gemini_breaker.pauses,
+        'zotero_requests': fake_zotero.request_count,
+        'input_tokens': fake_genai.input_tokens,
+        'cached_input_tokens': fake_genai.cached_input_tokens,
+        'caches_created': len(fake_genai.cached_contents),
+        'output_tokens': usage['output_tokens'],
+        'routes': model_router.get_route_counts(),
+    }
+
+
+def print_report(result, paper_count, page_count):
+    mode = "serial" if result['workers'] == 1 else f"parallel x{result['workers']}"
+    papers_per_minute = paper_count / result['elapsed'] * 60
+    print(f"\n=== {mode} ===")
+    print(f"papers: {paper_count} ({page_count} pages), "
+          f"notes written: {result['notes']}")
+    print(f"elapsed: {result['elapsed']:.2f}s, "
+          f"throughput: {papers_per_minute:.1f} papers/minute")
+    if result['peak_memory'] is not None:
+        print(f"peak traced memory: {result['peak_memory'] / 1024 / 1024:.1f} MiB")
+    print(f"gemini calls: {result['gemini_calls']} "
+          f"(429 injected: {result['rate_limited']}, retried: {result['retries']}, "
+          f"circuit pauses: {result['pauses']}), "
+          f"zotero requests: {result['zotero_requests']}")
+    print(f"input tokens: {result['input_tokens']} billed, "
+          f"{result['cached_input_tokens']} from cache "
+          f"(caches created: {result['caches_created']}), "
+          f"output tokens: {result['output_tokens']}")
+    routes = {route: count for route, count in result['routes'].items() if count}
+    print("routes: " + ", ".join(f"{route} {count}" for route, count in routes.items()))
+    print(f"{'stage':<10}{'count':>7}{'mean ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for stage, samples in result['stages'].items():
+        if not samples:
+            print(f"{stage:<10}{0:>7}")
+            continue
+        print(f"{stage:<10}{len(samples):>7}"
+              f"{statistics.mean(samples) * 1000:>10.1f}"
+              f"{_percentile(samples, 0.95) * 1000:>10.1f}"
+              f"{sum(samples):>10.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='パイプライン全体のスループットを計測するベンチマーク')
+    parser.add_argument('--papers', type=int, default=20,
+                        help='生成する合成論文の数')
+    parser.add_argument('--min-pages', type=int, default=4)
+    parser.add_argument('--max-pages', type=int, default=30)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4],
+                        help='比較するワーカー数（1は直列）')
+    parser.add_argument('--gemini-latency', type=float, default=0.2,
+                        help='フェイクGeminiの1リクエストあたりの遅延（秒）')
+    parser.add_argument('--zotero-latency', type=float, default=0.05,
+                        help='フェイクZoteroの1リクエストあたりの遅延（秒）')
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help='フェイクGeminiが429を返す確率（0-1）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--context-cache', action='store_true',
+                        help='プロンプトの固定部分をコンテキストキャッシュで再利用する')
+    parser.add_argument('--pack', action='store_true',
+                        help='短い論文を1回のリクエストにまとめて要約する')
+    parser.add_argument('--route-models', action='store_true',
+                        help='論文の推定トークン数に応じてモデルを選ぶ')
+    parser.add_argument('--lite-latency', type=float, default=None,
+                        help='フェイクGeminiの軽量モデルの遅延'
+                             '（秒、デフォルト: --gemini-latencyの半分）')
+    parser.add_argument('--no-attachment-lookup', dest='attachment_lookup',
+                        action='store_false',
+                        help='添付ファイルの索引を使わず、タイトル検索だけでZoteroのアイテムを探す')
+    parser.add_argument('--no-trace-memory', dest='trace_memory',
+                        action='store_false',
+                        help='tracemallocによるピークメモリ計測を無効にする'
+                             '（計測のオーバーヘッドを除いたスループットを見る場合）')
+    parser.add_argument('--verbose', action='store_true',
+                        help='パイプラインのログを表示する')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="obsidian-bench-") as work_dir:
+        pdf_folder = os.path.join(work_dir, "pdfs")
+        corpus = generate_corpus(pdf_folder, args.papers, args.min_pages,
+                                 args.max_pages, seed=args.seed)
+        page_count = sum(pages for _, pages in corpus)
+        print(f"合成コーパスを生成しました: {len(corpus)}本, {page_count}ページ")
+
+        for workers in args.workers:
+            result = run_pipeline(pdf_folder, work_dir, workers, args)
+            print_report(result, len(corpus), page_count)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
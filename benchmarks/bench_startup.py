@@ -0,0 +1,49 @@
+"""CLIの起動時間ベンチマーク
+
+`python main.py --help` などを新しいプロセスで繰り返し起動し、
+所要時間の中央値を出力する。
+
+使い方（リポジトリのルートで実行）:
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    'help': [sys.executable, 'main.py', '--help'],
+    'import main': [sys.executable, '-c', 'import main'],
+}
+
+
+def measure(command, runs):
+    """コマンドを runs 回起動し、各回の所要時間（秒）を返す"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CLIの起動時間を計測する')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    for label, command in COMMANDS.items():
+        # 1回目はファイルシステムキャッシュを温めるため捨てる
+        measure(command, 1)
+        samples = measure(command, args.runs)
+        print(f"{label:<12} median {statistics.median(samples) * 1000:7.1f} ms"
+              f"  min {min(samples) * 1000:7.1f} ms  ({args.runs} runs)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
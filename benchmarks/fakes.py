@@ -0,0 +1,296 @@
+"""GeminiとZoteroのプロセス内フェイク
+
+ネットワークを使わずにパイプライン全体を決定的に動かすためのスタンドイン。
+`google.generativeai` モジュールと `pyzotero.zotero` モジュールの代わりに
+各モジュールの `genai` / `zotero` 属性へ差し替えて使う。
+"""
+import json
+import random
+import re
+import threading
+import time
+
+try:
+    from google.api_core.exceptions import ResourceExhausted
+except ImportError:  # google-api-core が無い環境向け
+    class ResourceExhausted(Exception):
+        """429 Too Many Requests 相当の例外"""
+        code = 429
+
+
+# まとめて要約するプロンプト内の論文の区切り
+PACKED_PAPER_PATTERN = re.compile(r'<paper id="(\w+)">(.*?)</paper>', re.S)
+
+SUMMARY_FIELDS = [
+    'abstract', 'glossary', 'task', 'setting', 'input', 'output', 'dataset',
+    'claim', 'issue', 'improve', 'novelty', 'keyidea', 'method', 'result',
+    'ablation', 'publication', 'field', 'theme', 'keyword',
+]
+
+
+class FakeModelInfo:
+    def __init__(self, name):
+        self.name = f"models/{name}"
+        self.supported_generation_methods = ['generateContent']
+
+
+class FakeUsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count,
+                 cached_content_token_count=0):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.cached_content_token_count = cached_content_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeGenerativeModel:
+    def __init__(self, genai, model_name, cached_content=None):
+        self._genai = genai
+        self.model_name = model_name
+        self.cached_content = cached_content
+
+    def generate_content(self, contents, **kwargs):
+        return self._genai._generate(self.model_name, contents, kwargs,
+                                     self.cached_content)
+
+
+class FakeModelFactory:
+    """`genai.GenerativeModel` の代わり（呼び出しと from_cached_content に対応）"""
+
+    def __init__(self, genai):
+        self._genai = genai
+
+    def __call__(self, model_name, **kwargs):
+        return FakeGenerativeModel(self._genai, model_name)
+
+    def from_cached_content(self, cached_content, **kwargs):
+        if cached_content.deleted:
+            raise ValueError(f"cached content {cached_content.name} was deleted")
+        model_name = cached_content.model.replace('models/', '')
+        return FakeGenerativeModel(self._genai, model_name, cached_content)
+
+
+class FakeCachedContent:
+    """`genai.caching.CachedContent` のインスタンスの代わり"""
+
+    def __init__(self, name, model, contents, system_instruction, ttl):
+        self.name = name
+        self.model = model
+        self.contents = contents
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self.deleted = False
+        text = ''.join(str(content) for content in contents or [])
+        self.token_count = (len(text) + len(system_instruction or '')) // 4
+
+    def delete(self):
+        self.deleted = True
+
+
+class FakeCachedContentFactory:
+    """`genai.caching.CachedContent` クラスの代わり"""
+
+    def __init__(self, genai):
+        self._genai = genai
+
+    def create(self, model, *, system_instruction=None, contents=None,
+               ttl=None, **kwargs):
+        with self._genai._lock:
+            cached = FakeCachedContent(
+                f"cachedContents/fake-{len(self._genai.cached_contents)}",
+                model, contents, system_instruction, ttl)
+            if cached.token_count < self._genai.min_cache_tokens:
+                raise ValueError(
+                    f"Cached content is too small. total_token_count="
+                    f"{cached.token_count}, min_total_token_count="
+                    f"{self._genai.min_cache_tokens}")
+            self._genai.cached_contents.append(cached)
+        return cached
+
+
+class FakeCaching:
+    """`google.generativeai.caching` モジュールの代わり"""
+
+    def __init__(self, genai):
+        self.CachedContent = FakeCachedContentFactory(genai)
+
+
+class FakeGenAI:
+    """google.generativeai の代わりに使うフェイク
+
+    Args:
+        latency: generate_content 1回あたりの遅延（秒）
+        model_latency: モデル名 -> 遅延（秒）。指定したモデルはlatencyの代わりにこの値を使う
+        rate_limit_ratio: 429を返す確率（0-1）。乱数は seed で決定的
+        models: list_models が返すモデル名
+        min_cache_tokens: コンテキストキャッシュを作成できる最小トークン数
+    """
+
+    def __init__(self, latency=0.0, rate_limit_ratio=0.0, seed=0,
+                 models=("gemini-2.5-flash", "gemini-2.5-flash-lite", "gemini-1.5-flash"),
+                 min_cache_tokens=0, model_latency=None):
+        self.latency = latency
+        self.model_latency = dict(model_latency or {})
+        self.rate_limit_ratio = rate_limit_ratio
+        self.models = list(models)
+        self.min_cache_tokens = min_cache_tokens
+        self.calls = []
+        self.rate_limited_calls = 0
+        self.cached_contents = []
+        # 課金対象の入力トークン（キャッシュ分を除く）とキャッシュから読んだトークン
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.GenerativeModel = FakeModelFactory(self)
+        self.caching = FakeCaching(self)
+
+    def configure(self, **kwargs):
+        pass
+
+    def list_models(self):
+        return [FakeModelInfo(name) for name in self.models]
+
+    def _generate(self, model_name, contents, kwargs, cached_content=None):
+        cached_name = cached_content.name if cached_content else None
+        with self._lock:
+            self.calls.append({'model': model_name, 'contents': contents,
+                               'kwargs': kwargs,
+                               'cached_content': cached_name})
+            rate_limited = self._rng.random() < self.rate_limit_ratio
+            if rate_limited:
+                self.rate_limited_calls += 1
+        latency = self.model_latency.get(model_name, self.latency)
+        if latency:
+            time.sleep(latency)
+        if rate_limited:
+            raise ResourceExhausted("429 Resource has been exhausted")
+
+        prompt = contents if isinstance(contents, str) else str(contents)
+        schema = (kwargs.get('generation_config') or {}).get('response_schema') or {}
+        if 'generation_config' not in kwargs:
+            # JSONモードでないリクエスト（長い論文の部分ごとの要点）には短いテキストを返す
+            title_match = re.search(r'Synthetic Paper \d+', prompt)
+            text = f"{title_match.group(0) if title_match else 'Paper'} digest."
+        elif schema.get('type') == 'array':
+            # 複数の論文をまとめたリクエストには論文ごとの要約の配列を返す
+            result = [dict(self.make_summary(paper), id=paper_id)
+                      for paper_id, paper in PACKED_PAPER_PATTERN.findall(prompt)]
+            text = json.dumps(result, ensure_ascii=False)
+        else:
+            text = json.dumps(self.make_summary(prompt), ensure_ascii=False)
+        cached_tokens = cached_content.token_count if cached_content else 0
+        # 実APIと同様、prompt_token_count はキャッシュ分を含む
+        usage = FakeUsageMetadata(len(prompt) // 4 + cached_tokens,
+                                  len(text) // 4, cached_tokens)
+        with self._lock:
+            self.input_tokens += len(prompt) // 4
+            self.cached_input_tokens += cached_tokens
+        return FakeResponse(text, usage)
+
+    def make_summary(self, prompt):
+        """プロンプトから決定的な要約JSONを作る"""
+        title_match = re.search(r'Synthetic Paper (\d+)', prompt)
+        paper_id = title_match.group(1) if title_match else '0000'
+        summary = {field: f"{field} of paper {paper_id}"
+                   for field in SUMMARY_FIELDS}
+        summary['field'] = 'CV'
+        summary['theme'] = 'Self-supervised'
+        summary['publication'] = 'CVPR'
+        summary['keyword'] = '#Transformer #AttentionMechanism #SyntheticBenchmark'
+        return summary
+
+
+class FakeZotero:
+    """pyzotero.zotero.Zotero の代わりに使うフェイク"""
+
+    def __init__(self, library, latency):
+        self._library = library
+        self.latency = latency
+
+    def items(self, q=None, **kwargs):
+        self._library.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        query = (q or '').lower()
+        return [item for item in self._library.attachments
+                if query in item['data']['title'].lower()]
+
+    def item(self, key):
+        self._library.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._library.parents.get(key)
+
+    def last_modified_version(self, **kwargs):
+        self._library.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._library.version
+
+    def everything(self, query):
+        # フェイクは1回の items() で全件を返すため、追加のページはない
+        return query
+
+    def deleted(self, **kwargs):
+        self._library.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {'items': []}
+
+
+class FakeZoteroModule:
+    """`from pyzotero import zotero` の代わりに使うフェイクモジュール
+
+    `add_paper` で登録した論文ごとに、親アイテムとPDF添付アイテムを持つ。
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.attachments = []
+        self.parents = {}
+        self.request_count = 0
+        self.version = 0
+
+    def add_paper(self, title, year=2024):
+        index = len(self.parents)
+        self.version += 1
+        parent_key = f"PARENT{index:04d}"
+        self.parents[parent_key] = {
+            'key': parent_key,
+            'data': {
+                'key': parent_key,
+                'itemType': 'conferencePaper',
+                'title': title,
+                'creators': [
+                    {'creatorType': 'author', 'firstName': 'Ada',
+                     'lastName': 'Lovelace'},
+                    {'creatorType': 'author', 'firstName': 'Alan',
+                     'lastName': 'Turing'},
+                ],
+                'date': f"{year}-06-01",
+                'DOI': f"10.0000/synthetic.{index:04d}",
+                'url': f"https://example.org/{index:04d}",
+                'dateAdded': f"{year}-07-01T00:00:00Z",
+                'tags': [],
+            },
+        }
+        self.attachments.append({
+            'key': f"ATTACH{index:04d}",
+            'data': {
+                'key': f"ATTACH{index:04d}",
+                'itemType': 'attachment',
+                'title': title,
+                'parentItem': parent_key,
+                'filename': f"{title}.pdf",
+            },
+        })
+
+    def Zotero(self, library_id, library_type, api_key):
+        return FakeZotero(self, self.latency)
@@ -0,0 +1,95 @@
+"""ベンチマーク用の合成PDFコーパスを生成する
+
+外部ライブラリに依存せず、PyPDF2で読み込める最小限のテキストPDFを書き出す。
+"""
+import os
+import random
+
+WORDS = [
+    "transformer", "attention", "segmentation", "diffusion", "latent",
+    "encoder", "decoder", "benchmark", "ablation", "dataset", "baseline",
+    "contrastive", "representation", "distillation", "gradient", "token",
+    "vision", "language", "retrieval", "reinforcement", "policy", "reward",
+    "convolution", "residual", "normalization", "optimizer", "objective",
+]
+
+LINES_PER_PAGE = 45
+WORDS_PER_LINE = 12
+
+
+def _escape_pdf_text(text):
+    """PDFの文字列リテラル用にエスケープ"""
+    return (text.replace('\\', '\\\\')
+            .replace('(', '\\(')
+            .replace(')', '\\)'))
+
+
+def write_pdf(pdf_path, pages):
+    """各要素を1ページのテキスト（改行区切り）としてPDFを書き出す"""
+    objects = []
+    page_count = len(pages)
+    # 1: カタログ, 2: ページツリー, 3: フォント, 以降: ページとコンテンツ
+    page_ids = [4 + i * 2 for i in range(page_count)]
+    kids = ' '.join(f"{pid} 0 R" for pid in page_ids)
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(
+        f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode())
+    objects.append(
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for page_id, page_text in zip(page_ids, pages, strict=True):
+        objects.append(
+            (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+             f"/Resources << /Font << /F1 3 0 R >> >> "
+             f"/Contents {page_id + 1} 0 R >>").encode())
+        stream_lines = ["BT", "/F1 10 Tf", "12 TL", "50 750 Td"]
+        for line in page_text.split('\n'):
+            stream_lines.append(f"({_escape_pdf_text(line)}) Tj T*")
+        stream_lines.append("ET")
+        stream = '\n'.join(stream_lines).encode('latin-1', errors='replace')
+        objects.append(
+            b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n"
+            + stream + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for obj_id, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n".encode()
+    output += b"0000000000 65535 f \n"
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+               f"startxref\n{xref_offset}\n%%EOF\n").encode()
+
+    with open(pdf_path, 'wb') as f:
+        f.write(output)
+
+
+def make_page_text(rng, page_number):
+    """ランダムな英単語で1ページ分のテキストを作成"""
+    lines = [f"Section {page_number}"]
+    for _ in range(LINES_PER_PAGE - 1):
+        lines.append(' '.join(rng.choice(WORDS) for _ in range(WORDS_PER_LINE)))
+    return '\n'.join(lines)
+
+
+def generate_corpus(output_dir, paper_count, min_pages=4, max_pages=30,
+                    seed=0):
+    """ページ数の異なる合成論文PDFを生成し、(パス, ページ数)のリストを返す"""
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    corpus = []
+    for index in range(paper_count):
+        page_count = rng.randint(min_pages, max_pages)
+        title = f"Synthetic Paper {index:04d} on {rng.choice(WORDS).title()}"
+        pages = [f"{title}\n" + make_page_text(rng, 1)]
+        pages.extend(make_page_text(rng, n) for n in range(2, page_count + 1))
+        pdf_path = os.path.join(output_dir, f"{title}.pdf")
+        write_pdf(pdf_path, pages)
+        corpus.append((pdf_path, page_count))
+    return corpus
@@ -1,48 +1,132 @@
 import os
-import glob
+import sys
 import argparse
-from src.obsidian_automation.config import (ZOTERO_USER_ID, PDF_FOLDER,
-                                            NOTE_FOLDER)
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from src.obsidian_automation.config import (ZOTERO_USER_ID, ZOTERO_BACKEND,
+                                            ZOTERO_SQLITE_PATH, PDF_FOLDER,
+                                            PDF_FOLDERS, NOTE_FOLDER,
+                                            NOTE_FOLDERS, DUPLICATE_DETECTION,
+                                            SUMMARY_PACK,
+                                            PIPELINE_REQUIRED_VARS,
+                                            KEYWORDS_REQUIRED_VARS,
+                                            FIELDS_REQUIRED_VARS,
+                                            RERENDER_REQUIRED_VARS,
+                                            validate_config)
 from src.obsidian_automation.pdf_processor import (extract_text_from_pdf,
-                                                   summarize_text)
+                                                   tag_keywords_offline)
+from src.obsidian_automation.model_router import (get_route_counts,
+                                                  is_model_routing_enabled,
+                                                  reset_route_counts,
+                                                  set_model_routing_enabled,
+                                                  summarize_routed)
 from src.obsidian_automation.zotero_integrator import get_zotero_item_info
 from src.obsidian_automation.obsidian_note_creator import (
-    create_obsidian_note)
+    create_obsidian_note, link_duplicate_pdf)
 from src.obsidian_automation.keywords_reconstructor import (
     KeywordsReconstructor)
+from src.obsidian_automation.pdf_extractors import (EXTRACTORS,
+                                                    set_default_extractor)
+from src.obsidian_automation.pdf_source import open_pdf
+from src.obsidian_automation.note_writer import (get_write_counts,
+                                                 reset_write_counts)
+from src.obsidian_automation.prompt_cache import (release_context_caches,
+                                                  set_context_cache_enabled)
+from src.obsidian_automation.vault_index import update_vault_indexes
+from src.obsidian_automation.fingerprint import FingerprintStore
+from src.obsidian_automation.scheduler import (SCHEDULE_ORDERS,
+                                               estimate_text_tokens,
+                                               schedule_pdfs)
+from src.obsidian_automation.summary_packer import prepare_packed_summaries
+from src.obsidian_automation.resilience import (ServiceUnavailableError,
+                                                reset_circuit_breakers)
+from src.obsidian_automation.file_scanner import (build_name_index,
+                                                  merge_roots, scan_files)
+from src.obsidian_automation.text_cache import save_cached_text
+from src.obsidian_automation.usage_ledger import (get_run_usage,
+                                                  get_today_usage,
+                                                  has_daily_quota,
+                                                  reset_run_usage, usage_paper)
+from src.obsidian_automation.field_regenerator import regenerate_fields
+from src.obsidian_automation.note_rerenderer import rerender_notes
 
+# 重複したPDFとして既存のノートにリンクした場合のprocess_pdfの戻り値
+DUPLICATE = "duplicate"
 
-def get_existing_notes():
-    """Obsidian vault内の既存のノートファイル名を取得"""
-    existing_notes = set()
+
+def get_note_index():
+    """既存のノート名 -> パスの索引を取得（NOTE_FOLDERとNOTE_FOLDERSのサブフォルダも含む）"""
     try:
-        for md_file in glob.glob(os.path.join(NOTE_FOLDER, "*.md")):
-            note_name = os.path.splitext(os.path.basename(md_file))[0]
-            existing_notes.add(note_name)
-        return existing_notes
+        return build_name_index(
+            scan_files(merge_roots(NOTE_FOLDER, NOTE_FOLDERS), '.md'))
     except Exception as e:
         print(f"既存ノートの取得中にエラーが発生しました: {e}")
-        return set()
+        return {}
+
+
+def get_existing_notes():
+    """Obsidian vault内の既存のノートファイル名を取得"""
+    return set(get_note_index())
 
 
-def process_pdf(pdf_path):
-    """PDFを処理してノートを作成"""
+def process_pdf(pdf_path, fingerprints=None, note_index=None, prepared_papers=None):
+    """PDFを処理してノートを作成
+
+    Args:
+        pdf_path: PDFファイルのパス
+        fingerprints: 重複検出に使うFingerprintStore（省略時は重複検出を行わない）
+        note_index: 既存のノート名 -> パスの索引（重複PDFのリンク先の特定に使う）
+        prepared_papers: prepare_packed_summariesで抽出・要約済みのテキストと要約
+
+    Returns:
+        ノートを作成した場合はTrue、重複として既存のノートにリンクした場合はDUPLICATE
+    """
     try:
         print(f"PDFを処理中: {pdf_path}")
+        prepared = (prepared_papers or {}).get(pdf_path) or {}
 
         # 1. PDFからテキストを抽出
-        try:
-            pdf_text = extract_text_from_pdf(pdf_path)
-            if not pdf_text:
-                print(f"エラー: {pdf_path} からテキストを抽出できませんでした。")
+        # （PDFは1回だけ開き、テキスト抽出と重複検出のハッシュで同じマッピングを使う）
+        with open_pdf(pdf_path) as pdf:
+            try:
+                pdf_text = prepared.get('text') or extract_text_from_pdf(pdf)
+                if not pdf_text:
+                    print(f"エラー: {pdf_path} からテキストを抽出できませんでした。")
+                    return False
+            except Exception as e:
+                print(f"PDF読み込みエラー: {e}")
                 return False
-        except Exception as e:
-            print(f"PDF読み込みエラー: {e}")
-            return False
+            # 後でフィールドを作り直すときにPDFを抽出し直さずに済むよう保存しておく
+            save_cached_text(pdf_path, pdf_text)
+
+            # 重複したPDFでないか確認（要約の前に行い、Gemini APIの呼び出しを節約する）
+            if fingerprints is not None:
+                duplicate = fingerprints.claim(pdf_path, pdf_text, pdf)
+                if duplicate:
+                    note_title, similarity = duplicate
+                    print(f"重複: {pdf_path} は既存のノート '{note_title}' と同じ論文です"
+                          f"（類似度: {similarity:.2f}）。要約せずにリンクを追加します。")
+                    note_path = (note_index or {}).get(note_title)
+                    if link_duplicate_pdf(note_title, pdf_path, note_path):
+                        fingerprints.mark_duplicate(pdf_path, note_title)
+                    return DUPLICATE
 
         # 2. テキストを要約
+        file_name_without_ext = os.path.splitext(os.path.basename(pdf_path))[0]
+        summary_data = prepared.get('summary')
+        if not summary_data and not has_daily_quota(estimate_text_tokens(pdf_text)):
+            # 上限を超えて要約すると失敗するか課金されるため、ノートを作らず次回の実行に回す
+            print(f"スキップ: Geminiの1日の上限に達したため、{pdf_path} の要約は"
+                  f"次回の実行で行います。")
+            if fingerprints is not None:
+                fingerprints.release(pdf_path)
+            return False
         try:
-            summary_data = summarize_text(pdf_text)
+            # まとめて要約できていればそれを使い、できなかった場合は1本だけで要約する
+            if not summary_data:
+                with usage_paper(file_name_without_ext):
+                    # 論文の長さに応じたモデルで要約する（--route-models）
+                    summary_data = summarize_routed(pdf_text)
             if not summary_data:
                 print(f"エラー: {pdf_path} の要約を生成できませんでした。")
                 # 要約が失敗した場合でも、空の要約でノートを作成する
@@ -61,6 +145,13 @@ def process_pdf(pdf_path):
                     'theme': '',
                     'keyword': ''
                 }
+        except ServiceUnavailableError as e:
+            # レート制限などの一時的な障害ではノートを作らず、次回の実行で処理する
+            print(f"スキップ: {pdf_path} の要約をGeminiの一時的な障害のため中止しました"
+                  f"（次回の実行で再試行します）: {e}")
+            if fingerprints is not None:
+                fingerprints.release(pdf_path)
+            return False
         except Exception as e:
             print(f"要約生成エラー: {e}")
             summary_data = {
@@ -79,14 +170,22 @@ def process_pdf(pdf_path):
                 'keyword': ''
             }
 
+        # 要約にキーワードが無い場合（API制限など）はローカルのタガーで付与する
+        if isinstance(summary_data, dict) and not summary_data.get('keyword'):
+            summary_data['keyword'] = tag_keywords_offline(pdf_text)
+
         # 3. Zoteroから関連情報を取得
         try:
-            file_name_without_ext = os.path.splitext(
-                os.path.basename(pdf_path))[0]
-            zotero_data = get_zotero_item_info(file_name_without_ext)
+            zotero_data = get_zotero_item_info(file_name_without_ext, pdf_path)
             if not zotero_data:
                 print(f"注意: Zoteroで '{file_name_without_ext}' に関連する"
                       f"アイテムが見つかりませんでした。")
+        except ServiceUnavailableError as e:
+            print(f"スキップ: {pdf_path} のZotero情報をZoteroの一時的な障害のため"
+                  f"取得できませんでした（次回の実行で再試行します）: {e}")
+            if fingerprints is not None:
+                fingerprints.release(pdf_path)
+            return False
         except Exception as e:
             print(f"Zotero情報取得エラー: {e}")
             zotero_data = None
@@ -97,6 +196,8 @@ def process_pdf(pdf_path):
             return True
         except Exception as e:
             print(f"ノート作成エラー: {e}")
+            if fingerprints is not None:
+                fingerprints.release(pdf_path)
             return False
 
     except Exception as e:
@@ -104,63 +205,233 @@ def process_pdf(pdf_path):
         return False
 
 
-def main():
+def run_keywords_reconstruction(incremental=False):
+    """キーワード再構成を実行"""
+    print("キーワード再構成を開始します...")
+
+    try:
+        reconstructor = KeywordsReconstructor()
+        success = reconstructor.reconstruct_keywords(incremental=incremental)
+
+        if success:
+            print("✅ キーワード再構成が正常に完了しました")
+        else:
+            print("❌ キーワード再構成に失敗しました")
+    except Exception as e:
+        print(f"❌ キーワード再構成中にエラーが発生しました: {e}")
+
+
+def print_note_write_summary():
+    """書き込んだノートの数と、内容が同じため書き込みを省略した数を表示"""
+    counts = get_write_counts()
+    if counts['written'] or counts['unchanged']:
+        print(f"ノートの書き込み: {counts['written']}件"
+              f"（内容が同じため省略: {counts['unchanged']}件）")
+
+
+def print_gemini_usage_summary():
+    """今回の実行で使ったGeminiのトークン数と、今日の合計を表示"""
+    usage = get_run_usage()
+    total = usage['total']
+    if not total['requests']:
+        return
+    print(f"Geminiの使用量: {total['requests']}リクエスト、入力{total['input_tokens']}トークン"
+          f"（うちキャッシュ{total['cached_tokens']}）、出力{total['output_tokens']}トークン")
+    if len(usage['models']) > 1:
+        for model_name, model_usage in sorted(usage['models'].items()):
+            print(f"  {model_name}: {model_usage['requests']}リクエスト、"
+                  f"入力{model_usage['input_tokens']}トークン、"
+                  f"出力{model_usage['output_tokens']}トークン")
+    routes = get_route_counts()
+    if is_model_routing_enabled() and any(routes.values()):
+        print("モデルの選択: " + "、".join(
+            f"{route} {count}本" for route, count in routes.items() if count))
+    today = get_today_usage()
+    print(f"今日（{today['date']}）の合計: {today['requests']}リクエスト、"
+          f"{today['input_tokens'] + today['output_tokens']}トークン")
+
+
+def main(argv=None):
     # コマンドライン引数の解析
     parser = argparse.ArgumentParser(description='Obsidian PDF自動化ツール')
     parser.add_argument('-k', '--keywords', action='store_true',
                         help='キーワード再構成を実行する')
-    args = parser.parse_args()
+    parser.add_argument('--keywords-only', action='store_true',
+                        help='PDF処理を行わずキーワード再構成のみを実行する')
+    parser.add_argument('--incremental', action='store_true',
+                        help='キーワード再構成で前回以降に追加されたキーワードのみを精査する')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='PDFを並列処理するワーカー数（デフォルト: 1）')
+    parser.add_argument('--extractor', choices=sorted(EXTRACTORS),
+                        help='PDFテキスト抽出のバックエンド'
+                             '（デフォルト: 環境変数PDF_EXTRACTORまたはpypdf2）')
+    parser.add_argument('--context-cache', action='store_true',
+                        help='プロンプトの固定部分をGeminiのコンテキストキャッシュで'
+                             '再利用する（環境変数GEMINI_CONTEXT_CACHEでも有効化できる）')
+    parser.add_argument('--pack', action='store_true',
+                        help='短い論文を1回のGeminiリクエストにまとめて要約する'
+                             '（環境変数SUMMARY_PACKでも有効化できる）')
+    parser.add_argument('--route-models', action='store_true',
+                        help='論文の推定トークン数に応じて軽量モデル・通常のモデル・分割要約を選ぶ'
+                             '（環境変数GEMINI_MODEL_ROUTINGでも有効化できる）')
+    parser.add_argument('--order', choices=SCHEDULE_ORDERS,
+                        help='PDFの処理順（デフォルト: 環境変数SCHEDULE_ORDERまたはnewest）')
+    parser.add_argument('--priority-file',
+                        help='--order priority で先に処理するPDFファイル名の一覧')
+    parser.add_argument('--max-papers', type=int,
+                        help='1回の実行で処理する論文数の上限')
+    parser.add_argument('--max-tokens', type=int,
+                        help='1回の実行で使う推定入力トークン数の上限')
+    parser.add_argument('--fields',
+                        help='既存のノートの指定したフィールドだけを作り直す'
+                             '（カンマ区切り、例: ablation,result）')
+    parser.add_argument('--notes', nargs='+',
+                        help='--fields で作り直すノート名のパターン'
+                             '（ワイルドカード可、デフォルト: すべてのノート）')
+    parser.add_argument('--rerender', action='store_true',
+                        help='テンプレートを変更した後、保存しておいた要約とZoteroのデータから'
+                             '既存のノートを作り直す（APIは呼ばない）')
+    args = parser.parse_args(argv)
+    reset_write_counts()
+    reset_run_usage()
+    reset_route_counts()
+
+    if args.extractor:
+        set_default_extractor(args.extractor)
+    if args.context_cache:
+        set_context_cache_enabled(True)
+    if args.route_models:
+        set_model_routing_enabled(True)
 
-    print(f"Zotero User ID: {ZOTERO_USER_ID}")
-    print(f"PDF Folder: {PDF_FOLDER}")
-    print(f"Note Folder: {NOTE_FOLDER}")
+    # キーワード再構成のみの場合はZoteroやPDFフォルダの設定は不要
+    if args.keywords_only:
+        if not validate_config(KEYWORDS_REQUIRED_VARS):
+            sys.exit(1)
+        run_keywords_reconstruction(args.incremental)
+        print_note_write_summary()
+        print_gemini_usage_summary()
+        return
+
+    # テンプレートの変更を反映するだけならAPIキーは不要
+    if args.rerender:
+        if not validate_config(RERENDER_REQUIRED_VARS):
+            sys.exit(1)
+        rerender_notes(workers=args.workers)
+        print_note_write_summary()
+        return
+
+    # フィールドの再生成のみの場合はZoteroの設定は不要
+    if args.fields:
+        if not validate_config(FIELDS_REQUIRED_VARS):
+            sys.exit(1)
+        fields = [field.strip() for field in args.fields.split(',') if field.strip()]
+        reset_circuit_breakers()
+        regenerate_fields(fields, args.notes, workers=args.workers)
+        print_note_write_summary()
+        print_gemini_usage_summary()
+        return
+
+    if not validate_config(PIPELINE_REQUIRED_VARS):
+        sys.exit(1)
+
+    if ZOTERO_BACKEND == "local":
+        print(f"Zotero Database: {ZOTERO_SQLITE_PATH}")
+    else:
+        print(f"Zotero User ID: {ZOTERO_USER_ID}")
+    pdf_roots = merge_roots(PDF_FOLDER, PDF_FOLDERS)
+    print(f"PDF Folder: {os.pathsep.join(pdf_roots)}")
+    print(f"Note Folder: {os.pathsep.join(merge_roots(NOTE_FOLDER, NOTE_FOLDERS))}")
 
     # PDFフォルダの存在確認
-    if not os.path.exists(PDF_FOLDER):
-        print(f"エラー: PDFフォルダ '{PDF_FOLDER}' が見つかりません。")
+    if not any(os.path.exists(folder) for folder in pdf_roots):
+        print(f"エラー: PDFフォルダ '{os.pathsep.join(pdf_roots)}' が見つかりません。")
         return
 
-    # 既存のノートを取得
-    existing_notes = get_existing_notes()
+    # 既存のノートを取得（名前 -> パスの索引なので存在確認はO(1)）
+    existing_notes = get_note_index()
     print(f"既存のノート数: {len(existing_notes)}")
 
-    # PDFフォルダ内のPDFファイルを取得
-    pdf_files = glob.glob(os.path.join(PDF_FOLDER, "*.pdf"))
+    # PDFフォルダ内のPDFファイルをサブフォルダまで取得（同名のPDFは最初に見つかったものだけ）
+    pdf_paths = scan_files(pdf_roots, '.pdf')
+    pdf_files = list(build_name_index(pdf_paths).values())
     print(f"PDFフォルダ内のPDFファイル数: {len(pdf_files)}")
+    if len(pdf_files) < len(pdf_paths):
+        print(f"注意: 同名のPDF {len(pdf_paths) - len(pdf_files)}個は処理対象から除外しました。")
+
+    fingerprints = FingerprintStore() if DUPLICATE_DETECTION else None
 
-    processed_count = 0
+    target_pdfs = []
+    noted_pdfs = []
     for pdf_path in pdf_files:
         pdf_name_without_ext = os.path.splitext(os.path.basename(pdf_path))[0]
 
         # 同名のノートが既に存在するかチェック
         if pdf_name_without_ext in existing_notes:
             print(f"スキップ: '{pdf_name_without_ext}' のノートは既に存在します。")
+            noted_pdfs.append(pdf_path)
             continue
 
-        # ノートが存在しない場合、処理を実行
-        if process_pdf(pdf_path):
-            processed_count += 1
+        if fingerprints is not None and fingerprints.is_duplicate(pdf_path):
+            print(f"スキップ: '{pdf_name_without_ext}' は重複したPDFとして"
+                  f"既存のノートにリンク済みです。")
+            continue
+
+        target_pdfs.append(pdf_path)
+
+    # 処理順を決め、上限を超える分は次回の実行に回す
+    target_pdfs, _ = schedule_pdfs(target_pdfs, order=args.order,
+                                   priority_file=args.priority_file,
+                                   max_papers=args.max_papers,
+                                   max_tokens=args.max_tokens,
+                                   workers=args.workers)
+
+    # ノートが存在しないPDFのみ処理を実行
+    reset_circuit_breakers()
+    try:
+        if fingerprints is not None:
+            # 既存のノートのPDFも重複検出の対象にする（未登録のものだけ計算される）
+            with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+                list(executor.map(fingerprints.register, noted_pdfs))
+
+        # 短い論文は先にまとめて要約しておく（RPMの上限に対してリクエスト数を減らす）
+        prepared_papers = {}
+        if args.pack or SUMMARY_PACK:
+            prepared_papers = prepare_packed_summaries(
+                target_pdfs, workers=args.workers, fingerprints=fingerprints)
+
+        process = functools.partial(process_pdf, fingerprints=fingerprints,
+                                    note_index=existing_notes,
+                                    prepared_papers=prepared_papers)
+        if args.workers > 1:
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                results = list(executor.map(process, target_pdfs))
+        else:
+            results = [process(pdf_path) for pdf_path in target_pdfs]
+    finally:
+        # バッチが終わったらコンテキストキャッシュを削除して保存料金を止める
+        release_context_caches()
+        if fingerprints is not None:
+            fingerprints.save()
+    processed_count = sum(1 for result in results if result is True)
+    duplicate_count = sum(1 for result in results if result == DUPLICATE)
 
     print(f"処理完了: {processed_count}個の新しいノートを作成しました。")
+    if duplicate_count:
+        print(f"重複: {duplicate_count}個のPDFを既存のノートにリンクしました。")
+
+    # 作成したノートとObsidian上での評価やコメントの編集をダッシュボード用のインデックスに反映
+    # （ノートごとに更新するとインデックス全体の読み書きを繰り返すため、実行の最後にまとめて行う）
+    update_vault_indexes(roots=merge_roots(NOTE_FOLDER, NOTE_FOLDERS))
 
     # -kオプションが指定された場合のみキーワード再構成を実行
     if args.keywords:
         print("\n" + "="*50)
-        print("キーワード再構成を開始します...")
-
-        try:
-            reconstructor = KeywordsReconstructor()
-            success = reconstructor.reconstruct_keywords()
-
-            if success:
-                print("✅ キーワード再構成が正常に完了しました")
-            else:
-                print("❌ キーワード再構成に失敗しました")
-        except Exception as e:
-            print(f"❌ キーワード再構成中にエラーが発生しました: {e}")
+        run_keywords_reconstruction(args.incremental)
     else:
         print("\nキーワード再構成はスキップされました。")
         print("キーワード再構成を実行するには -k オプションを使用してください。")
+    print_note_write_summary()
+    print_gemini_usage_summary()
 
 
 if __name__ == "__main__":
@@ -1,26 +1,186 @@
-# config.py (または main スクリプトの先頭)
-import google.generativeai as genai
+# config.py
+# インポート時には環境変数を読むだけで、重いライブラリの読み込みや検証は行わない。
+# 必要な環境変数の検証はコマンドごとに validate_config() で行う。
 import os
 from dotenv import load_dotenv
 
 load_dotenv()  # .env ファイルから環境変数を読み込む
 
+
+def _get_int_env(name, default=None):
+    """整数の環境変数を読み込む（未設定・不正な値の場合はdefault）"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"警告: 環境変数 {name} の値 '{value}' は整数ではないため無視します。")
+        return default
+
+
+def _get_float_env(name, default=None):
+    """小数の環境変数を読み込む（未設定・不正な値の場合はdefault）"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"警告: 環境変数 {name} の値 '{value}' は数値ではないため無視します。")
+        return default
+
+
+def _get_bool_env(name, default=False):
+    """真偽値の環境変数を読み込む（1/true/yes/on を真とみなす）"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _get_path_list_env(name):
+    """os.pathsep（Windowsでは;、それ以外では:）区切りのフォルダ一覧の環境変数を読み込む"""
+    return [path.strip() for path in (os.getenv(name) or '').split(os.pathsep)
+            if path.strip()]
+
+
 ZOTERO_API_KEY = os.getenv("ZOTERO_API_KEY")
 ZOTERO_USER_ID = os.getenv("ZOTERO_USER_ID")
+# Zoteroのメタデータの取得元（api: Web API、local: Zoteroデスクトップのzotero.sqlite）
+ZOTERO_BACKEND = (os.getenv("ZOTERO_BACKEND") or "api").strip().lower()
+# ZOTERO_BACKEND=localで読むデータベース（デフォルト: ~/Zotero/zotero.sqlite）
+ZOTERO_SQLITE_PATH = os.getenv("ZOTERO_SQLITE_PATH") or os.path.join(
+    os.path.expanduser("~"), "Zotero", "zotero.sqlite")
+# zotero.sqliteのコピーを読むか（Zoteroの起動中のロックを避ける。無効にすると元のファイルを
+# immutableモードで直接読む。デフォルト: 有効）
+ZOTERO_SQLITE_SNAPSHOT = _get_bool_env("ZOTERO_SQLITE_SNAPSHOT", True)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 PDF_FOLDER = os.getenv("PDF_FOLDER")
 NOTE_FOLDER = os.getenv("NOTE_FOLDER")
 TEMPLATE_PATH = os.getenv("TEMPLATE_PATH")
 
-required_vars = [
-    ZOTERO_API_KEY, ZOTERO_USER_ID, GEMINI_API_KEY,
-    PDF_FOLDER, NOTE_FOLDER, TEMPLATE_PATH
+# PDF_FOLDER・NOTE_FOLDERに加えて走査するフォルダ（いずれもサブフォルダまで走査する）
+PDF_FOLDERS = _get_path_list_env("PDF_FOLDERS")
+NOTE_FOLDERS = _get_path_list_env("NOTE_FOLDERS")
+# フォルダの走査で並列にos.scandirするフォルダ数
+SCAN_WORKERS = _get_int_env("SCAN_WORKERS", 8)
+
+# 自動化ツールが管理するデータ（フィンガープリントなど）の保存先（未設定時はプロジェクトのdata/）
+DATA_DIR = os.getenv("DATA_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data")
+
+# PDFテキスト抽出のバックエンド（pypdf2 / pypdfium2 / pdfminer、未設定時はpypdf2）
+PDF_EXTRACTOR = os.getenv("PDF_EXTRACTOR")
+# 1本のPDFから抽出するページ数・文字数の上限（未設定時は無制限）
+PDF_MAX_PAGES = _get_int_env("PDF_MAX_PAGES")
+PDF_MAX_CHARS = _get_int_env("PDF_MAX_CHARS")
+# PDFをメモリマップして、重複検出のハッシュとテキスト抽出で同じマッピングを使うか
+# （PDFの読み込み中に同期クライアントがファイルを書き換える環境では無効にする。デフォルト: 有効）
+PDF_MMAP = _get_bool_env("PDF_MMAP", True)
+
+# 要約プロンプトのキーワードセクションに含めるカテゴリごとの語彙数の上限
+# （論文テキストとの関連度で選ぶ。fieldは常に全件。未設定時は全語彙）
+KEYWORD_PROMPT_TOP_K = _get_int_env("KEYWORD_PROMPT_TOP_K")
+
+# LLMを使わないローカルのキーワード付与
+#   off: 使わない / fallback: LLMがキーワードを返さなかった場合のみ（デフォルト）
+#   merge: LLMのキーワードと突き合わせ、LLMが付与しなかった上位のキーワードを追加する
+KEYWORD_TAGGER = (os.getenv("KEYWORD_TAGGER") or "fallback").lower()
+KEYWORD_TAGGER_TOP_N = _get_int_env("KEYWORD_TAGGER_TOP_N", 5)
+
+# バッチの処理順（name / newest / oldest / smallest / priority、未設定時はnewest）
+SCHEDULE_ORDER = os.getenv("SCHEDULE_ORDER")
+# 処理順がpriorityの場合の優先リスト（1行に1つのPDFファイル名）
+SCHEDULE_PRIORITY_FILE = os.getenv("SCHEDULE_PRIORITY_FILE")
+# 1回の実行で処理する論文数と推定入力トークン数の上限（未設定時は無制限）
+MAX_PAPERS_PER_RUN = _get_int_env("MAX_PAPERS_PER_RUN")
+MAX_TOKENS_PER_RUN = _get_int_env("MAX_TOKENS_PER_RUN")
+
+# PDFから抽出したテキストをDATA_DIRにキャッシュするか（フィールドの再生成に使う、デフォルト: 有効）
+TEXT_CACHE = _get_bool_env("TEXT_CACHE", True)
+
+# 要約の前に重複したPDFを検出し、既存のノートにリンクするか（デフォルト: 有効）
+DUPLICATE_DETECTION = _get_bool_env("DUPLICATE_DETECTION", True)
+
+# PDFのファイル名・パスからZoteroの添付ファイルを特定し、その親アイテムを使うか
+# （見つからない場合のみタイトル検索を行う。デフォルト: 有効）
+ZOTERO_ATTACHMENT_LOOKUP = _get_bool_env("ZOTERO_ATTACHMENT_LOOKUP", True)
+
+# キーワード再構成で1回のリクエストに含めるキーワード数の上限と並列リクエスト数
+KEYWORDS_SHARD_SIZE = _get_int_env("KEYWORDS_SHARD_SIZE", 150)
+KEYWORDS_RECONSTRUCTION_WORKERS = _get_int_env("KEYWORDS_RECONSTRUCTION_WORKERS", 4)
+
+# ダッシュボード用のメタデータインデックスのパス（未設定時はNOTE_FOLDER/paper_index.json）
+VAULT_INDEX_FILE = os.getenv("VAULT_INDEX_FILE")
+
+# プロンプトの固定部分をGeminiのコンテキストキャッシュで再利用するか
+GEMINI_CONTEXT_CACHE = _get_bool_env("GEMINI_CONTEXT_CACHE")
+# コンテキストキャッシュの有効期間（秒）
+GEMINI_CACHE_TTL = _get_int_env("GEMINI_CACHE_TTL", 3600)
+
+# 短い論文を1回のGeminiリクエストにまとめて要約するか（--packと同じ）
+SUMMARY_PACK = _get_bool_env("SUMMARY_PACK")
+# まとめる対象にする論文の推定トークン数の上限と、1回のリクエストにまとめる論文数
+SUMMARY_PACK_MAX_TOKENS = _get_int_env("SUMMARY_PACK_MAX_TOKENS", 8000)
+SUMMARY_PACK_SIZE = _get_int_env("SUMMARY_PACK_SIZE", 4)
+
+# 要約に使うモデル（通常の論文）と、短い論文に使う軽量モデル
+GEMINI_MODEL = os.getenv("GEMINI_MODEL") or "gemini-2.5-flash"
+GEMINI_LITE_MODEL = os.getenv("GEMINI_LITE_MODEL") or "gemini-2.5-flash-lite"
+# 論文の推定トークン数に応じてモデルを選ぶか（--route-modelsと同じ、デフォルト: 無効）
+GEMINI_MODEL_ROUTING = _get_bool_env("GEMINI_MODEL_ROUTING")
+# 軽量モデルで要約する推定トークン数の上限と、分割して要約する推定トークン数の下限
+# （推定トークン数はプロンプトと出力の分を含む。約9ページ・約250ページに相当）
+GEMINI_LITE_MAX_TOKENS = _get_int_env("GEMINI_LITE_MAX_TOKENS", 10000)
+GEMINI_CHUNK_MIN_TOKENS = _get_int_env("GEMINI_CHUNK_MIN_TOKENS", 200000)
+# 分割して要約する場合の1つの部分の推定トークン数
+GEMINI_CHUNK_TOKENS = _get_int_env("GEMINI_CHUNK_TOKENS", 50000)
+# 1本の論文の要約にかける時間の目標（秒、未設定時は考慮しない）
+# （今回の実行で観測した通常のモデルの速度で目標を超えそうな論文は軽量モデルに回す）
+GEMINI_LATENCY_TARGET = _get_float_env("GEMINI_LATENCY_TARGET")
+
+# Geminiの呼び出しごとのトークン使用量をDATA_DIR/gemini_usage.jsonlに記録するか（デフォルト: 有効）
+GEMINI_USAGE_LEDGER = _get_bool_env("GEMINI_USAGE_LEDGER", True)
+# 1日に使うGeminiのトークン数（入力＋出力）とリクエスト数の上限（未設定時は無制限）
+# （上限に達したら新しい論文の要約を始めず、次回の実行に回す）
+GEMINI_DAILY_TOKEN_LIMIT = _get_int_env("GEMINI_DAILY_TOKEN_LIMIT")
+GEMINI_DAILY_REQUEST_LIMIT = _get_int_env("GEMINI_DAILY_REQUEST_LIMIT")
+# 1日の区切りに使うタイムゾーン（Geminiの無料枠は太平洋時間の0時にリセットされる）
+GEMINI_QUOTA_TIMEZONE = os.getenv("GEMINI_QUOTA_TIMEZONE") or "America/Los_Angeles"
+
+# GeminiとZoteroの一時的なエラー（429・5xx）に対する再試行
+#   最大試行回数、指数バックオフの初期値と上限（秒、上限は最初の一時停止の長さにも使う）
+RETRY_MAX_ATTEMPTS = _get_int_env("RETRY_MAX_ATTEMPTS", 5)
+RETRY_BASE_DELAY = _get_float_env("RETRY_BASE_DELAY", 2.0)
+RETRY_MAX_DELAY = _get_float_env("RETRY_MAX_DELAY", 60.0)
+# 連続して何回失敗したらバッチ全体を一時停止するか、待つ時間の上限（秒）
+# （上限を超える待ち時間を指示された場合は、その実行での呼び出しを中止する）
+CIRCUIT_FAILURE_THRESHOLD = _get_int_env("CIRCUIT_FAILURE_THRESHOLD", 3)
+CIRCUIT_MAX_PAUSE = _get_float_env("CIRCUIT_MAX_PAUSE", 900.0)
+
+# コマンドごとに必要な環境変数
+ZOTERO_REQUIRED_VARS = (["ZOTERO_SQLITE_PATH"] if ZOTERO_BACKEND == "local"
+                        else ["ZOTERO_API_KEY", "ZOTERO_USER_ID"])
+PIPELINE_REQUIRED_VARS = ZOTERO_REQUIRED_VARS + [
+    "GEMINI_API_KEY", "PDF_FOLDER", "NOTE_FOLDER", "TEMPLATE_PATH",
 ]
-if not all(required_vars):
-    print("エラー: 環境変数が正しく設定されていません。")
-    print("ZOTERO_API_KEY, ZOTERO_USER_ID, GEMINI_API_KEY, "
-          "PDF_FOLDER, NOTE_FOLDER, TEMPLATE_PATH を .env ファイルで設定してください。")
-    exit(1)
-
-# Gemini API の設定
-genai.configure(api_key=GEMINI_API_KEY)
+KEYWORDS_REQUIRED_VARS = ["GEMINI_API_KEY", "NOTE_FOLDER"]
+FIELDS_REQUIRED_VARS = ["GEMINI_API_KEY", "NOTE_FOLDER", "TEMPLATE_PATH"]
+RERENDER_REQUIRED_VARS = ["NOTE_FOLDER", "TEMPLATE_PATH"]
+
+
+def validate_config(required_vars):
+    """指定された環境変数がすべて設定されているか確認する"""
+    missing = [name for name in required_vars if not globals().get(name)]
+    if missing:
+        print("エラー: 環境変数が正しく設定されていません。")
+        print(f"{', '.join(missing)} を .env ファイルで設定してください。")
+        return False
+    return True
+
+
+def configure_gemini(genai):
+    """google.generativeai のインポート直後に API キーを設定する"""
+    genai.configure(api_key=GEMINI_API_KEY)
@@ -0,0 +1,245 @@
+# field_regenerator.py
+# 既存のノートの一部のフィールド（ablation、resultなど）だけを作り直す。
+# 論文テキストはキャッシュ（なければPDFから抽出）を使い、custom_prompt.mdから
+# 指定したフィールドの指示だけを抜き出したプロンプトで要約させる。
+# ノート内のフィールドの位置はテンプレートの前後の文字列から特定するため、
+# MemoやCommentsなどユーザーが書き込んだ部分はそのまま残る。
+import fnmatch
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .config import NOTE_FOLDER, NOTE_FOLDERS, PDF_FOLDER, PDF_FOLDERS
+from .file_scanner import build_name_index, merge_roots, scan_files
+from .llm_json import PROMPT_FIELD_PATTERN, get_prompt_fields, get_template_llm_fields
+from .note_artifacts import update_note_artifacts
+from .note_writer import write_note
+from .obsidian_note_creator import format_llm_value, load_template
+from .pdf_processor import fill_keywords_section, read_custom_prompt_file, summarize_fields
+from .resilience import ServiceUnavailableError
+from .scheduler import estimate_text_tokens
+from .text_cache import get_paper_text
+from .usage_ledger import has_daily_quota, usage_paper
+from .vault_index import update_vault_indexes
+
+_PLACEHOLDER_PATTERN = re.compile(r'\{\{\s*(\w+)[^}]*\}\}')
+_WORD_PATTERN = re.compile(r'\w')
+
+
+def split_prompt_fields(raw_prompt: str) -> Tuple[str, Dict[str, str]]:
+    """custom_prompt.mdを (前置きの指示, フィールド名 -> そのフィールドの指示) に分ける"""
+    blocks = {}
+    preamble = raw_prompt
+    for match in PROMPT_FIELD_PATTERN.finditer(raw_prompt):
+        if not blocks:
+            # 前置きはJSONのフォーマットの開始（{）より前
+            preamble = raw_prompt[:match.start()].rstrip()
+            if preamble.endswith('{'):
+                preamble = preamble[:-1].rstrip()
+        blocks[match.group(1)] = match.group(0).rstrip().rstrip(',')
+    return preamble, blocks
+
+
+def build_field_prompt(fields: List[str], paper_text=None,
+                       raw_prompt: str = None) -> Optional[str]:
+    """指定したフィールドの指示だけを含むプロンプトを作成（クリーニング済み）"""
+    try:
+        if raw_prompt is None:
+            raw_prompt = read_custom_prompt_file()
+        preamble, blocks = split_prompt_fields(raw_prompt)
+        missing = [field for field in fields if field not in blocks]
+        if missing:
+            print(f"custom_prompt.mdに指示がないフィールドがあります: {missing}")
+            return None
+        selected = ',\n'.join(blocks[field] for field in fields)
+        return fill_keywords_section(f"{preamble}\n\n{{\n{selected}\n}}", paper_text)
+    except Exception as e:
+        print(f"フィールド再生成用のプロンプトの作成中にエラーが発生しました: {e}")
+        return None
+
+
+def _before_anchor(literal: str) -> str:
+    """プレースホルダーの直前の文字列のうち、ノート内の位置の特定に使う部分
+
+    見出しなど単語を含む最後の行から末尾まで（単語を含む行がなければ全体）。
+    """
+    lines = literal.split('\n')
+    for i in range(len(lines) - 1, -1, -1):
+        if _WORD_PATTERN.search(lines[i]):
+            return '\n'.join(lines[i:])
+    return literal
+
+
+def _after_anchor(literal: str) -> str:
+    """プレースホルダーの直後の文字列のうち、値の終わりの特定に使う部分（最初の空でない行まで）"""
+    lines = literal.split('\n')
+    for i, line in enumerate(lines):
+        if line.strip():
+            return '\n'.join(lines[:i + 1])
+    return ''
+
+
+def find_field_spans(content: str, template: str) -> List[Tuple[str, int, int]]:
+    """
+    テンプレートのプレースホルダーに対応するノート内の範囲を取得
+
+    テンプレートを前から順にたどり、各プレースホルダーの前後の文字列をノート内で探す。
+    位置を特定できなかったプレースホルダーは結果に含めない。
+
+    Returns:
+        (フィールド名, 開始位置, 終了位置) のリスト（ノート内の出現順）
+    """
+    matches = list(_PLACEHOLDER_PATTERN.finditer(template))
+    spans = []
+    position = 0
+    for i, match in enumerate(matches):
+        literal_start = matches[i - 1].end() if i else 0
+        before = _before_anchor(template[literal_start:match.start()])
+        start = content.find(before, position)
+        if start < 0:
+            continue
+        start += len(before)
+
+        is_last = i + 1 == len(matches)
+        after_literal = template[match.end():
+                                 len(template) if is_last else matches[i + 1].start()]
+        after = _after_anchor(after_literal)
+        if after:
+            end = content.find(after, start)
+        elif is_last:
+            # テンプレートの末尾のフィールドはノートの末尾まで（末尾の改行は残す）
+            end = max(start, len(content.rstrip()))
+        else:
+            end = -1
+        if end < 0:
+            continue
+        spans.append((match.group(1), start, end))
+        position = end
+    return spans
+
+
+def replace_note_fields(content: str, template: str,
+                        values: Dict[str, str]) -> Optional[str]:
+    """ノート内の指定したフィールドの値を置き換える（位置を特定できないフィールドがあればNone）"""
+    spans = [span for span in find_field_spans(content, template) if span[0] in values]
+    located = {span[0] for span in spans}
+    missing = [field for field in values if field not in located]
+    if missing:
+        print(f"ノート内でフィールドの位置を特定できませんでした: {missing}")
+        return None
+    # 後ろから置き換えて、前のフィールドの位置がずれないようにする
+    for field, start, end in reversed(spans):
+        content = content[:start] + format_llm_value(field, values[field]) + content[end:]
+    return content
+
+
+def regenerate_note_fields(note_path: str, pdf_path: str, fields: List[str],
+                           template: str = None) -> bool:
+    """
+    1つのノートの指定したフィールドを作り直す
+
+    Args:
+        note_path: ノートのパス
+        pdf_path: 論文のPDFのパス（PDFがなくてもテキストのキャッシュがあれば作り直せる）
+        fields: 作り直すフィールド名のリスト
+        template: ノートの作成に使ったテンプレート（省略時はTEMPLATE_PATH）
+
+    Returns:
+        ノートを書き換えた場合はTrue
+    """
+    try:
+        template = template or load_template()
+        if not template:
+            print("テンプレートが見つからないため、フィールドを作り直せません。")
+            return False
+        with open(note_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        paper_text = get_paper_text(pdf_path)
+        if not paper_text:
+            print(f"エラー: {note_path} の論文テキストを取得できませんでした"
+                  f"（PDFもキャッシュも見つかりません）。")
+            return False
+
+        prompt_head = build_field_prompt(fields, paper_text)
+        if not prompt_head:
+            return False
+        if not has_daily_quota(estimate_text_tokens(paper_text)):
+            print(f"スキップ: Geminiの1日の上限に達したため、{note_path} は書き換えません。")
+            return False
+        with usage_paper(os.path.splitext(os.path.basename(note_path))[0]):
+            values = summarize_fields(paper_text, prompt_head, fields)
+        if not values:
+            print(f"エラー: {note_path} のフィールドを生成できませんでした。")
+            return False
+
+        new_content = replace_note_fields(content, template, values)
+        if new_content is None:
+            return False
+        write_note(note_path, new_content)
+        print(f"フィールド {', '.join(fields)} を作り直しました: {note_path}")
+        # テンプレートの変更でノートを作り直したときも新しい値を使うよう、保存した要約も更新
+        update_note_artifacts(os.path.splitext(os.path.basename(note_path))[0], values)
+        return True
+    except ServiceUnavailableError as e:
+        print(f"エラー: {e}。{note_path} は書き換えません。")
+        return False
+    except Exception as e:
+        print(f"フィールドの再生成中にエラーが発生しました: {e}")
+        return False
+
+
+def regenerate_fields(fields: List[str], note_patterns: List[str] = None,
+                      workers: int = 1) -> int:
+    """
+    既存のノートの指定したフィールドをまとめて作り直す
+
+    Args:
+        fields: 作り直すフィールド名のリスト（例: ['ablation', 'result']）
+        note_patterns: 対象のノート名のパターン（fnmatch形式、省略時はすべてのノート）
+        workers: 並列に処理するノート数
+
+    Returns:
+        書き換えたノートの数
+    """
+    template = load_template()
+    if not template:
+        print("テンプレートが見つからないため、フィールドを作り直せません。")
+        return 0
+    try:
+        prompt_fields = get_prompt_fields(read_custom_prompt_file())
+    except Exception as e:
+        print(f"カスタムプロンプトの読み込み中にエラーが発生しました: {e}")
+        return 0
+    # issueのようにZoteroと同名のフィールドも、プロンプトで指示していればLLMの出力として扱う
+    template_fields = get_template_llm_fields(template, prompt_fields)
+    unknown = [field for field in fields
+               if field not in template_fields or f'{{{{{field}}}}}' not in template]
+    if unknown:
+        print(f"エラー: テンプレートにないフィールドは作り直せません: {unknown}")
+        return 0
+
+    note_index = build_name_index(
+        scan_files(merge_roots(NOTE_FOLDER, NOTE_FOLDERS), '.md'))
+    pdf_index = build_name_index(
+        scan_files(merge_roots(PDF_FOLDER, PDF_FOLDERS), '.pdf'))
+    targets = [name for name in sorted(note_index)
+               if not note_patterns
+               or any(fnmatch.fnmatchcase(name, pattern) for pattern in note_patterns)]
+    print(f"フィールドを作り直すノート数: {len(targets)}")
+
+    def regenerate(name):
+        # PDFが見つからない場合もノート名でテキストのキャッシュを探す
+        pdf_path = pdf_index.get(name) or f"{name}.pdf"
+        return regenerate_note_fields(note_index[name], pdf_path, fields, template)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(regenerate, targets))
+    written = [note_index[name] for name, result in zip(targets, results, strict=True) if result]
+
+    if written:
+        # 書き換えたノートをダッシュボード用のインデックスに反映
+        update_vault_indexes(written, merge_roots(NOTE_FOLDER, NOTE_FOLDERS))
+    print(f"フィールドの再生成完了: {len(written)}/{len(targets)}個のノートを更新しました。")
+    return len(written)
@@ -0,0 +1,87 @@
+# file_scanner.py
+# 複数のPDFフォルダ・ノートフォルダをサブフォルダまで走査する。
+# os.scandirで1階層ずつ並列に読み、ファイル名（拡張子なし） -> パスの索引を作る。
+# 索引を使えば、入れ子のコレクションがあるVaultでもノートの存在確認はO(1)で済む。
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from .config import SCAN_WORKERS
+
+
+def merge_roots(primary: str, extra: Iterable[str]) -> List[str]:
+    """主フォルダ（PDF_FOLDERやNOTE_FOLDER）を先頭に、追加のフォルダを重複なく並べる"""
+    roots = [primary] if primary else []
+    roots.extend(folder for folder in extra if folder not in roots)
+    return roots
+
+
+def _scan_directory(directory: str, extension: str) -> Tuple[List[str], List[str]]:
+    """1つのフォルダを読み、(一致したファイル, サブフォルダ) を返す"""
+    files = []
+    subdirectories = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                # .obsidianや.trashなどの隠しフォルダ・隠しファイルは対象外
+                if entry.name.startswith('.'):
+                    continue
+                # シンボリックリンクのフォルダはたどらない（循環を避ける）
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.name.lower().endswith(extension) and entry.is_file():
+                    files.append(entry.path)
+    except OSError as e:
+        print(f"フォルダ {directory} の読み込み中にエラーが発生しました: {e}")
+    return files, subdirectories
+
+
+def scan_files(roots: Iterable[str], extension: str,
+               workers: int = None) -> List[str]:
+    """
+    複数のフォルダをサブフォルダまで走査し、指定した拡張子のファイルを取得
+
+    同じ階層のフォルダはスレッドプールで並列にos.scandirする。
+
+    Args:
+        roots: 走査するフォルダ（存在しないものは警告して飛ばす）
+        extension: 拡張子（例: '.pdf'、大文字小文字は区別しない）
+        workers: 並列に読むフォルダ数（省略時は環境変数SCAN_WORKERS）
+
+    Returns:
+        見つかったファイルのパス（フォルダの指定順、同じフォルダ内は名前順）
+    """
+    extension = extension.lower()
+    pending = []
+    seen = set()
+    for root in roots:
+        if not root or not os.path.isdir(root):
+            print(f"警告: フォルダ '{root}' が見つからないため、走査しません。")
+            continue
+        real_root = os.path.realpath(root)
+        if real_root not in seen:
+            seen.add(real_root)
+            pending.append(root)
+
+    found = {root: [] for root in pending}
+    with ThreadPoolExecutor(max_workers=max(1, workers or SCAN_WORKERS)) as executor:
+        # 1階層ずつ並列に読む（各フォルダの結果はそのフォルダが属するルートにまとめる）
+        level = [(root, root) for root in pending]
+        while level:
+            results = executor.map(
+                lambda item: _scan_directory(item[1], extension), level)
+            next_level = []
+            for (root, _), (files, subdirectories) in zip(level, results, strict=True):
+                found[root].extend(files)
+                next_level.extend((root, directory) for directory in subdirectories)
+            level = next_level
+    return [path for root in pending for path in sorted(found[root])]
+
+
+def build_name_index(paths: Iterable[str]) -> Dict[str, str]:
+    """ファイル名（拡張子なし） -> パスの索引を作る（同名のファイルは最初に見つかったものを使う）"""
+    index = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        index.setdefault(name, path)
+    return index
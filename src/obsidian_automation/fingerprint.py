@@ -0,0 +1,203 @@
+# fingerprint.py
+# 要約の前に重複したPDFを検出するためのフィンガープリント。
+# バイト単位で同一のファイルはSHA-256で、プレプリントとカメラレディ版のような
+# ほぼ同一の論文は先頭ページのテキストのMinHash（bottom-k）で検出する。
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .config import DATA_DIR
+from .keyword_manager import split_words
+from .pdf_processor import extract_text_from_pdf
+from .pdf_source import PDFSource, open_pdf
+
+# MinHashの署名に残すハッシュ値の数
+SIGNATURE_SIZE = 128
+# シングル（連続する単語列）の単語数
+SHINGLE_SIZE = 5
+# 署名に使う先頭テキストの文字数（おおよそ最初の数ページ分）
+FINGERPRINT_CHARS = 12000
+# この推定Jaccard類似度以上であれば重複とみなす
+DUPLICATE_THRESHOLD = 0.7
+
+FINGERPRINTS_FILE_NAME = "fingerprints.json"
+
+
+def file_sha256(pdf_path: str) -> str:
+    """ファイル内容のSHA-256を計算"""
+    with open_pdf(pdf_path) as pdf:
+        return pdf.sha256()
+
+
+def minhash_signature(text: str, size: int = SIGNATURE_SIZE) -> List[int]:
+    """先頭テキストの単語シングルからbottom-k MinHash署名を作成
+
+    各シングルを64bitのハッシュ値にし、小さい方からsize個を残す。
+    ハッシュにはプロセスごとに値が変わらないblake2bを使う（署名はファイルに保存するため）。
+    """
+    words = split_words((text or '')[:FINGERPRINT_CHARS])
+    hashes = set()
+    for start in range(len(words) - SHINGLE_SIZE + 1):
+        shingle = ' '.join(words[start:start + SHINGLE_SIZE]).encode('utf-8')
+        hashes.add(int.from_bytes(
+            hashlib.blake2b(shingle, digest_size=8).digest(), 'big'))
+    return sorted(hashes)[:size]
+
+
+def estimate_similarity(signature_a: List[int], signature_b: List[int],
+                        size: int = SIGNATURE_SIZE) -> float:
+    """2つのbottom-k署名からJaccard類似度を推定"""
+    if not signature_a or not signature_b:
+        return 0.0
+    union = sorted(set(signature_a) | set(signature_b))[:size]
+    shared = set(signature_a) & set(signature_b)
+    return sum(1 for value in union if value in shared) / len(union)
+
+
+class FingerprintStore:
+    def __init__(self, store_file=None, threshold=DUPLICATE_THRESHOLD):
+        """
+        処理済みの論文のフィンガープリントを管理するクラス
+
+        Args:
+            store_file: 保存先のJSONファイル（省略時はDATA_DIR/fingerprints.json）
+            threshold: 重複とみなす推定Jaccard類似度
+        """
+        self.store_file = store_file or os.path.join(DATA_DIR, FINGERPRINTS_FILE_NAME)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.data = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            if os.path.exists(self.store_file):
+                with open(self.store_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for key in ('papers', 'files', 'duplicates'):
+                    data.setdefault(key, {})
+                return data
+        except Exception as e:
+            print(f"フィンガープリントファイルの読み込み中にエラーが発生しました: {e}")
+        # papers: ノート名 -> {sha256, signature, pdf}
+        # files: PDFファイル名 -> {mtime_ns, size, sha256}（ハッシュの再計算を避ける）
+        # duplicates: 重複と判定したPDFファイル名 -> リンク先のノート名
+        return {'papers': {}, 'files': {}, 'duplicates': {}}
+
+    def save(self):
+        """フィンガープリントを保存"""
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.store_file), exist_ok=True)
+                temp_path = f"{self.store_file}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False)
+                os.replace(temp_path, self.store_file)
+            except Exception as e:
+                print(f"フィンガープリントファイルの保存中にエラーが発生しました: {e}")
+
+    def _file_sha256(self, pdf_path: str, pdf: PDFSource = None) -> str:
+        """更新日時とサイズが変わっていなければ保存済みのSHA-256を使う
+
+        pdfを渡した場合は、テキスト抽出で開いたものと同じマッピングからハッシュを計算する。
+        """
+        stat = os.stat(pdf_path)
+        pdf_name = os.path.basename(pdf_path)
+        cached = self.data['files'].get(pdf_name)
+        if (cached and cached['mtime_ns'] == stat.st_mtime_ns
+                and cached['size'] == stat.st_size):
+            return cached['sha256']
+        sha256 = pdf.sha256() if pdf is not None else file_sha256(pdf_path)
+        with self._lock:
+            self.data['files'][pdf_name] = {
+                'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': sha256}
+        return sha256
+
+    def fingerprint(self, pdf_path: str, text: str = None,
+                    pdf: PDFSource = None) -> Dict:
+        """PDFのフィンガープリントを作成（textを省略した場合は先頭部分のみ抽出する）"""
+        if pdf is None:
+            with open_pdf(pdf_path) as pdf:
+                return self.fingerprint(pdf_path, text, pdf)
+        if text is None:
+            text = extract_text_from_pdf(pdf, max_chars=FINGERPRINT_CHARS)
+        return {
+            'sha256': self._file_sha256(pdf_path, pdf),
+            'signature': minhash_signature(text),
+            'pdf': os.path.basename(pdf_path),
+        }
+
+    def _find_duplicate_locked(self, fingerprint: Dict,
+                               exclude: str = None) -> Optional[Tuple[str, float]]:
+        best = None
+        for note_name, paper in self.data['papers'].items():
+            if note_name == exclude:
+                continue
+            if paper['sha256'] == fingerprint['sha256']:
+                return note_name, 1.0
+            similarity = estimate_similarity(paper['signature'],
+                                             fingerprint['signature'])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (note_name, similarity)
+        return best
+
+    def find_duplicate(self, fingerprint: Dict,
+                       exclude: str = None) -> Optional[Tuple[str, float]]:
+        """
+        登録済みの論文から重複を探す
+
+        Returns:
+            (ノート名, 類似度) 。重複がない場合はNone
+        """
+        with self._lock:
+            return self._find_duplicate_locked(fingerprint, exclude)
+
+    def claim(self, pdf_path: str, text: str,
+              pdf: PDFSource = None) -> Optional[Tuple[str, float]]:
+        """
+        重複を確認し、重複でなければこのPDFを登録する（並列処理でも同じ論文を二重に要約しない）
+
+        Args:
+            pdf_path: PDFファイルのパス
+            text: PDFから抽出したテキスト
+            pdf: テキストの抽出に使ったPDFSource（ハッシュの計算で同じマッピングを使う）
+
+        Returns:
+            重複している場合は (既存のノート名, 類似度)、そうでなければNone
+        """
+        note_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        fingerprint = self.fingerprint(pdf_path, text, pdf)
+        with self._lock:
+            duplicate = self._find_duplicate_locked(fingerprint, exclude=note_name)
+            if duplicate is None:
+                self.data['papers'][note_name] = fingerprint
+            return duplicate
+
+    def register(self, pdf_path: str, note_name: str = None):
+        """既存のノートに対応するPDFを登録（登録済みの場合は何もしない）"""
+        note_name = note_name or os.path.splitext(os.path.basename(pdf_path))[0]
+        if note_name in self.data['papers']:
+            return
+        try:
+            fingerprint = self.fingerprint(pdf_path)
+        except Exception as e:
+            print(f"{pdf_path} のフィンガープリント作成中にエラーが発生しました: {e}")
+            return
+        with self._lock:
+            self.data['papers'].setdefault(note_name, fingerprint)
+
+    def release(self, pdf_path: str):
+        """ノートの作成に失敗したPDFの登録を取り消す"""
+        note_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        with self._lock:
+            self.data['papers'].pop(note_name, None)
+
+    def mark_duplicate(self, pdf_path: str, note_name: str):
+        """重複と判定したPDFを記録（次回以降の実行でスキップする）"""
+        with self._lock:
+            self.data['duplicates'][os.path.basename(pdf_path)] = note_name
+
+    def is_duplicate(self, pdf_path: str) -> bool:
+        """重複と判定済みのPDFかどうか"""
+        return os.path.basename(pdf_path) in self.data['duplicates']
@@ -1,9 +1,74 @@
 import os
 import json
+import math
 import re
+import threading
+from collections import Counter
 from typing import List, Dict, Tuple
 from difflib import SequenceMatcher
 
+# 並列処理時にkeywords.jsonへの書き込みが競合しないようにするためのロック
+_KEYWORDS_FILE_LOCK = threading.Lock()
+
+# 関連度によるフィルタリングを行っても常に全件をプロンプトに含めるカテゴリ
+ALWAYS_INCLUDED_CATEGORIES = ("field",)
+
+_CAMEL_CASE_PATTERN = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def split_keyword(keyword: str) -> List[str]:
+    """CamelCaseのキーワードを小文字の単語に分割
+
+    例: SemanticSegmentation -> semantic, segmentation
+    """
+    return [part.lower() for part in _CAMEL_CASE_PATTERN.findall(keyword)]
+
+
+def split_words(text: str) -> List[str]:
+    """テキストを小文字の英数字列の単語に分割"""
+    return _WORD_PATTERN.findall((text or '').lower())
+
+
+def count_words(text: str, max_phrase_length: int = 3) -> Counter:
+    """テキスト中の単語と連続する単語列（空白区切り、最大max_phrase_length語）の出現回数を数える"""
+    words = split_words(text)
+    counts = Counter(words)
+    for n in range(2, max_phrase_length + 1):
+        counts.update(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+    return counts
+
+
+def score_keywords(keywords: List[str], word_counts: Counter) -> Dict[str, float]:
+    """語彙の各キーワードと論文テキストの関連度をTF-IDFで計算
+
+    キーワードが語句としてそのまま出現する回数（"semantic segmentation" や
+    "vit"）を語数で重み付けしたものと、CamelCaseを分割した各単語の出現回数（TF）を
+    語彙内での希少さ（IDF）で重み付けした平均を足し合わせる。
+    "learning" のように多くのキーワードに含まれる単語だけが一致しても高いスコアにはならない。
+    """
+    parts_by_keyword = {}
+    document_frequency = Counter()
+    for keyword in keywords:
+        parts = split_keyword(keyword)
+        parts_by_keyword[keyword] = parts
+        document_frequency.update(set(part for part in parts if len(part) >= 3))
+
+    keyword_count = len(keywords)
+    scores = {}
+    for keyword, parts in parts_by_keyword.items():
+        phrase_count = max(word_counts.get(keyword.lower(), 0),
+                           word_counts.get(' '.join(parts), 0))
+        score = (1 + len(parts)) * math.log1p(phrase_count)
+        long_parts = [part for part in parts if len(part) >= 3]
+        if long_parts:
+            score += sum(
+                math.log1p(word_counts.get(part, 0))
+                * math.log(1 + keyword_count / document_frequency[part])
+                for part in long_parts) / len(long_parts)
+        scores[keyword] = score
+    return scores
+
 
 class KeywordManager:
     def __init__(self, keywords_file=None):
@@ -233,6 +298,13 @@ class KeywordManager:
 
     def add_new_keywords(self, new_keywords: List[str], category: str = "custom"):
         """新規キーワードを追加"""
+        with _KEYWORDS_FILE_LOCK:
+            # 他スレッドが保存した内容を失わないよう最新のファイルを読み直す
+            self.keywords_data = self._load_keywords()
+            self._add_new_keywords(new_keywords, category)
+
+    def _add_new_keywords(self, new_keywords: List[str], category: str):
+        """新規キーワードを追加（ロック取得済みの状態で呼び出す）"""
         # 禁止キーワードをフィルタリング
         filtered_keywords = self._filter_prohibited_keywords(new_keywords)
 
@@ -286,15 +358,50 @@ class KeywordManager:
             "architecture": "アーキテクチャ(CNNやTransformerやViTなど)"
         }
 
-    def create_keyword_prompt(self) -> str:
-        """キーワード生成のためのプロンプトを作成"""
+    def select_relevant_keywords(self, text: str, top_k: int) -> Dict[str, List[str]]:
+        """
+        論文テキストとの関連度が高いキーワードをカテゴリごとに選ぶ
+
+        Args:
+            text: 論文の抽出テキスト
+            top_k: カテゴリごとに残すキーワード数の上限
+
+        Returns:
+            カテゴリ名 -> キーワードリスト（fieldは常に全件、他は関連度順の上位top_k件）
+        """
+        categories = self.keywords_data["categories"]
+        all_keywords = sorted({keyword for keywords in categories.values()
+                               for keyword in keywords})
+        scores = score_keywords(all_keywords, count_words(text))
+
+        selected = {}
+        for category, keywords in categories.items():
+            if category in ALWAYS_INCLUDED_CATEGORIES:
+                selected[category] = list(keywords)
+                continue
+            relevant = [keyword for keyword in keywords if scores[keyword] > 0]
+            relevant.sort(key=lambda keyword: scores[keyword], reverse=True)
+            selected[category] = relevant[:top_k]
+        return selected
 
-        field_list = ', '.join(self.keywords_data["categories"]["field"])
-        theme_list = ', '.join(self.keywords_data["categories"].get("theme", []))
-        task_list = ', '.join(self.keywords_data["categories"]["task"])
-        method_list = ', '.join(self.keywords_data["categories"]["method"])
-        architecture_list = ', '.join(
-            self.keywords_data["categories"]["architecture"])
+    def create_keyword_prompt(self, text: str = None, top_k: int = None) -> str:
+        """
+        キーワード生成のためのプロンプトを作成
+
+        Args:
+            text: 論文の抽出テキスト。top_kと両方指定した場合は関連するキーワードのみを含める
+            top_k: fieldを除くカテゴリごとのキーワード数の上限（省略時は全語彙）
+        """
+        if text and top_k:
+            categories = self.select_relevant_keywords(text, top_k)
+        else:
+            categories = self.keywords_data["categories"]
+
+        field_list = ', '.join(categories["field"])
+        theme_list = ', '.join(categories.get("theme", []))
+        task_list = ', '.join(categories["task"])
+        method_list = ', '.join(categories["method"])
+        architecture_list = ', '.join(categories["architecture"])
 
         prompt = f"""
 > - 分野(Field): {field_list}
@@ -325,12 +432,17 @@ class KeywordManager:
         
         return unique_matches
 
-    def process_generated_keywords(self, generated_text: str) -> List[str]:
+    def process_generated_keywords(self, generated_text: str,
+                                   offline_keywords: List[str] = None,
+                                   max_added: int = 0) -> List[str]:
         """
         生成されたテキストからキーワードを抽出し、既存キーワードとマッチング
 
         Args:
             generated_text: LLMが生成したテキスト
+            offline_keywords: KeywordTaggerが同じ論文の本文から付与したキーワード（関連度順）。
+                指定した場合、本文から確認できないLLMのキーワードを表示する
+            max_added: LLMが付与しなかったoffline_keywordsを最大何件追加するか
 
         Returns:
             処理済みのキーワードリスト
@@ -355,5 +467,15 @@ class KeywordManager:
         # 最終的なキーワードリストを作成
         final_keywords = existing_keywords + new_keywords
 
+        # ローカルのタガーの結果と突き合わせる
+        if offline_keywords is not None:
+            unconfirmed = [kw for kw in final_keywords if kw not in offline_keywords]
+            if unconfirmed:
+                print(f"本文から確認できなかったキーワード: {unconfirmed}")
+            missing = [kw for kw in offline_keywords if kw not in final_keywords]
+            if missing[:max_added]:
+                print(f"ローカルのタガーからキーワードを追加しました: {missing[:max_added]}")
+                final_keywords.extend(missing[:max_added])
+
         print(f"最終キーワード: {final_keywords}")
         return final_keywords
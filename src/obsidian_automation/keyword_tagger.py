@@ -0,0 +1,182 @@
+# keyword_tagger.py
+# LLMを呼ばずに、論文テキストとkeywords.jsonの語彙・エイリアスを照合してキーワードを付与する。
+# 語彙の表記（"ViT"、"Vision Transformer"、"vision-transformer" など）を単語列に正規化した
+# 辞書を一度だけ作り、本文の単語列を左から最長一致で1回走査する。
+# 重み付けには、Vault内のノートでの出現ノート数から求めたIDFを使う。
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from .config import KEYWORD_TAGGER_TOP_N, NOTE_FOLDER
+from .file_scanner import scan_files
+from .keyword_manager import KeywordManager, split_keyword, split_words
+
+
+class KeywordTagger:
+    def __init__(self, keywords_data: Dict):
+        """
+        語彙とのマッチングによるキーワード付与クラス
+
+        Args:
+            keywords_data: KeywordManager.keywords_data と同じ形式の語彙データ
+        """
+        prohibited = {kw.lower() for kw in keywords_data.get("prohibited_keywords", [])}
+        # 単語列（空白区切り） -> 正規のキーワード
+        self.patterns = {}
+        # 正規のキーワード -> カテゴリ
+        self.categories = {}
+
+        for category, keywords in keywords_data.get("categories", {}).items():
+            for keyword in keywords:
+                self.categories.setdefault(keyword, category)
+        for keyword in keywords_data.get("custom_keywords", []):
+            self.categories.setdefault(keyword, "custom")
+
+        for keyword in self.categories:
+            if keyword.lower() not in prohibited:
+                self._add_pattern(keyword, keyword)
+        # エイリアスは正規化先のキーワードとしてマッチさせる
+        for alias, keyword in keywords_data.get("aliases", {}).items():
+            if keyword.lower() not in prohibited:
+                self._add_pattern(alias, keyword)
+
+        # 先頭の単語 -> その単語で始まる表記の最大単語数（先頭で一致しない単語はすぐ読み飛ばす）
+        self.max_lengths = {}
+        for phrase in self.patterns:
+            first_word, *rest = phrase.split(' ')
+            self.max_lengths[first_word] = max(
+                self.max_lengths.get(first_word, 0), len(rest) + 1)
+        self.document_count = 0
+        self.document_frequency = Counter()
+
+    def _add_pattern(self, surface: str, keyword: str):
+        """キーワードの表記をマッチング用の単語列として登録"""
+        for phrase in (surface.lower(), ' '.join(split_keyword(surface))):
+            # 1文字の単語列は誤検出が多いため登録しない
+            if len(phrase) >= 2 and phrase not in self.patterns:
+                self.patterns[phrase] = keyword
+
+    def count_matches(self, text: str) -> Counter:
+        """本文中に出現する語彙を数える（左から最長一致）"""
+        words = split_words(text)
+        counts = Counter()
+        patterns = self.patterns
+        max_lengths = self.max_lengths
+        position = 0
+        while position < len(words):
+            max_length = max_lengths.get(words[position])
+            if max_length is not None:
+                for length in range(min(max_length, len(words) - position), 0, -1):
+                    keyword = patterns.get(' '.join(words[position:position + length]))
+                    if keyword is not None:
+                        counts[keyword] += 1
+                        position += length
+                        break
+                else:
+                    position += 1
+            else:
+                position += 1
+        return counts
+
+    def fit_vault(self, note_folder: str):
+        """Vault内のノートから各キーワードが出現するノート数（IDF用）を数える"""
+        self.document_count = 0
+        self.document_frequency = Counter()
+        if not note_folder or not os.path.isdir(note_folder):
+            return
+        for note_path in scan_files([note_folder], '.md'):
+            try:
+                with open(note_path, 'r', encoding='utf-8') as f:
+                    matches = self.count_matches(f.read())
+            except Exception as e:
+                print(f"ノート {os.path.basename(note_path)} の読み込み中に"
+                      f"エラーが発生しました: {e}")
+                continue
+            self.document_count += 1
+            self.document_frequency.update(matches.keys())
+
+    def idf(self, keyword: str) -> float:
+        """Vault内での出現ノート数から求めたIDF（平滑化あり）"""
+        return math.log((1 + self.document_count)
+                        / (1 + self.document_frequency[keyword])) + 1
+
+    def tag(self, text: str, top_n: int = None) -> List[Tuple[str, float]]:
+        """
+        本文にキーワードをTF-IDFの高い順に付与
+
+        Returns:
+            (キーワード, スコア) のリスト
+        """
+        scored = [(keyword, (1 + math.log(count)) * self.idf(keyword))
+                  for keyword, count in self.count_matches(text).items()]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:top_n] if top_n else scored
+
+    def tag_keywords(self, text: str, top_n: int = None) -> List[str]:
+        """本文に付与するキーワード名のみを関連度順に取得"""
+        return [keyword for keyword, _ in self.tag(text, top_n)]
+
+
+_taggers = {}
+_taggers_lock = threading.Lock()
+
+
+def get_keyword_tagger(keywords_file: str = None,
+                       note_folder: str = None) -> KeywordTagger:
+    """語彙ファイルとVaultごとに1度だけ構築したKeywordTaggerを取得
+
+    実行中に追加されたキーワードは次回の実行から照合対象になる。
+    """
+    keyword_manager = KeywordManager(keywords_file)
+    note_folder = note_folder or NOTE_FOLDER
+    key = (keyword_manager.keywords_file, note_folder)
+    with _taggers_lock:
+        tagger = _taggers.get(key)
+        if tagger is None:
+            tagger = KeywordTagger(keyword_manager.keywords_data)
+            tagger.fit_vault(note_folder)
+            _taggers[key] = tagger
+    return tagger
+
+
+def main(argv=None):
+    """単体実行用のメイン関数: PDFまたはテキストファイルにキーワードを付与して表示"""
+    parser = argparse.ArgumentParser(
+        description='LLMを使わずに語彙とのマッチングでキーワードを付与する')
+    parser.add_argument('paths', nargs='+', help='PDFまたはテキストファイル')
+    parser.add_argument('--top', type=int, default=KEYWORD_TAGGER_TOP_N,
+                        help='表示するキーワード数')
+    parser.add_argument('--keywords-file', help='keywords.jsonのパス')
+    args = parser.parse_args(argv)
+
+    from .pdf_processor import extract_text_from_pdf
+
+    tagger = get_keyword_tagger(args.keywords_file)
+    print(f"語彙の表記数: {len(tagger.patterns)}, "
+          f"Vaultのノート数: {tagger.document_count}")
+    for path in args.paths:
+        if path.lower().endswith('.pdf'):
+            text = extract_text_from_pdf(path)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        if not text:
+            print(f"{path}: テキストを取得できませんでした")
+            continue
+
+        start = time.perf_counter()
+        tags = tagger.tag(text, args.top)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"\n{os.path.basename(path)} ({elapsed_ms:.1f} ms)")
+        for keyword, score in tags:
+            print(f"  #{keyword:<30} {tagger.categories.get(keyword, ''):<14}"
+                  f"{score:.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
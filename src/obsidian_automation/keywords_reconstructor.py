@@ -1,9 +1,31 @@
+import argparse
 import json
 import os
 import re
-from typing import Dict, List
-import google.generativeai as genai
-from .config import NOTE_FOLDER, GEMINI_API_KEY
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from .config import (NOTE_FOLDER, KEYWORDS_REQUIRED_VARS,
+                     KEYWORDS_RECONSTRUCTION_WORKERS, KEYWORDS_SHARD_SIZE,
+                     configure_gemini, validate_config)
+from .file_scanner import scan_files
+from .keyword_manager import count_words, score_keywords, split_keyword
+from .lazy_import import lazy_import
+from .llm_json import json_generation_config, parse_llm_json
+from .note_writer import write_note
+from .resilience import call_with_retry
+from .usage_ledger import generate_content
+from .vault_index import update_vault_index
+
+# google.generativeaiはAPI呼び出し時まで読み込まない（APIキーは読み込み時に設定）
+genai = lazy_import("google.generativeai", on_import=configure_gemini)
+
+# custom_keywordsを表すシャードのキー（それ以外はcategories内のカテゴリ名）
+CUSTOM_KEY = "custom_keywords"
+# 選択肢が固定のため、再構成で他のカテゴリから移動させないカテゴリ
+FIXED_CATEGORIES = ("field", "theme")
+# 各シャードに判断材料として含める既存キーワード数（カテゴリごと）
+CONTEXT_SIZE = 40
 
 
 class KeywordsReconstructor:
@@ -26,10 +48,12 @@ class KeywordsReconstructor:
         if reconstruction_prompt_file is None:
             reconstruction_prompt_file = os.path.join(project_root, "prompt", "keywords_reconstruction.md")
         self.prompt_file = reconstruction_prompt_file
+        # 前回の再構成で精査済みのキーワードを記録するファイル
+        self.state_file = (os.path.splitext(self.keywords_file)[0]
+                           + "_reconstruction_state.json")
         self.note_folder = NOTE_FOLDER
-
-        # Gemini API設定
-        genai.configure(api_key=GEMINI_API_KEY)
+        self.shard_size = KEYWORDS_SHARD_SIZE
+        self.max_workers = KEYWORDS_RECONSTRUCTION_WORKERS
 
     def load_keywords(self) -> Dict:
         """現在のkeywords.jsonを読み込み"""
@@ -66,7 +90,8 @@ class KeywordsReconstructor:
     def get_available_models(self) -> List[str]:
         """利用可能なモデルを確認"""
         try:
-            models = genai.list_models()
+            models = call_with_retry(lambda: list(genai.list_models()),
+                                     service='gemini')
             available_models = []
             for model in models:
                 if 'generateContent' in model.supported_generation_methods:
@@ -99,7 +124,11 @@ class KeywordsReconstructor:
                     return ""
 
             model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt)
+            # keywords.jsonのaliasesは任意キーのマップでスキーマ化できないため、
+            # スキーマなしのJSONモードで出力させる
+            response = generate_content(
+                model, prompt, model_name, kind='keywords',
+                generation_config=json_generation_config())
 
             if response.text:
                 return response.text.strip()
@@ -114,33 +143,10 @@ class KeywordsReconstructor:
     def parse_json_response(self, response_text: str) -> Dict:
         """APIレスポンスからJSONを抽出・解析"""
         try:
-            # レスポンステキストからJSONブロックを抽出
-            # マークダウンコードブロックや余分なテキストを除去
-            lines = response_text.strip().split('\n')
-            json_lines = []
-            in_json_block = False
-
-            for line in lines:
-                # JSON開始を検出
-                if line.strip().startswith('{'):
-                    in_json_block = True
-                    json_lines.append(line)
-                elif in_json_block:
-                    json_lines.append(line)
-                    # JSON終了を検出
-                    if (line.strip().endswith('}') and
-                            line.count('}') >= line.count('{')):
-                        break
-
-            if not json_lines:
-                # 直接JSON解析を試行
-                return json.loads(response_text)
-
-            json_text = '\n'.join(json_lines)
-            return json.loads(json_text)
-
-        except json.JSONDecodeError as e:
-            print(f"JSON解析エラー: {e}")
+            data = parse_llm_json(response_text)
+            if isinstance(data, dict):
+                return data
+            print("JSON解析エラー: JSONオブジェクトが見つかりません")
             print(f"レスポンステキスト: {response_text}")
             return {}
         except Exception as e:
@@ -158,20 +164,223 @@ class KeywordsReconstructor:
             print(f"キーワードファイル更新エラー: {e}")
             return False
 
-    def get_markdown_files(self) -> List[str]:
-        """NOTE_FOLDER内のMarkdownファイル一覧を取得"""
-        markdown_files = []
+    def load_reviewed_keywords(self) -> set:
+        """前回の再構成で精査済みのキーワードを読み込み（記録がなければ空）"""
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return set(json.load(f).get("reviewed", []))
+        except Exception as e:
+            print(f"再構成の記録ファイルの読み込みエラー: {e}")
+        return set()
 
+    def save_reviewed_keywords(self, reviewed: set):
+        """精査済みのキーワードを記録"""
+        try:
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                json.dump({"reviewed": sorted(reviewed)}, f,
+                          ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"再構成の記録ファイルの保存エラー: {e}")
+
+    def collect_keywords(self, keywords_data: Dict) -> Dict[str, List[str]]:
+        """カテゴリ（custom_keywordsを含む）ごとのキーワード一覧を取得"""
+        collected = {category: list(keywords)
+                     for category, keywords in keywords_data.get("categories", {}).items()}
+        collected[CUSTOM_KEY] = list(keywords_data.get(CUSTOM_KEY, []))
+        return collected
+
+    def build_shards(self, keywords_data: Dict,
+                     targets: Dict[str, List[str]]) -> List[Dict]:
+        """
+        精査対象のキーワードをカテゴリごと・shard_size件ごとのシャードに分割
+
+        各シャードは keywords.json と同じ形式で、精査対象に加えて
+        判断材料となる既存キーワード（fieldとthemeは全件、他は関連度の高い上位CONTEXT_SIZE件）を含む。
+
+        Returns:
+            {'key': カテゴリ, 'terms': 精査対象, 'payload': プロンプトに埋め込むデータ} のリスト
+        """
+        collected = self.collect_keywords(keywords_data)
+        aliases = keywords_data.get("aliases", {})
+        shards = []
+        for key, terms in targets.items():
+            for start in range(0, len(terms), self.shard_size):
+                chunk = terms[start:start + self.shard_size]
+                chunk_set = set(chunk)
+                chunk_words = count_words(' '.join(
+                    ' '.join(split_keyword(term)) for term in chunk))
+
+                categories = {}
+                for category, existing in collected.items():
+                    if category == CUSTOM_KEY:
+                        continue
+                    others = [term for term in existing if term not in chunk_set]
+                    if category not in FIXED_CATEGORIES and len(others) > CONTEXT_SIZE:
+                        scores = score_keywords(others, chunk_words)
+                        ranked = sorted(others, key=lambda term: (-scores[term], term))
+                        keep = set(ranked[:CONTEXT_SIZE])
+                        others = [term for term in others if term in keep]
+                    categories[category] = (others + chunk) if category == key else others
+
+                payload_terms = {term for terms_ in categories.values() for term in terms_}
+                payload_terms.update(chunk)
+                payload = {
+                    "categories": categories,
+                    CUSTOM_KEY: chunk if key == CUSTOM_KEY else [],
+                    "aliases": {full: short for full, short in aliases.items()
+                                if full in payload_terms or short in payload_terms},
+                }
+                shards.append({'key': key, 'terms': chunk, 'payload': payload})
+        return shards
+
+    def review_shard(self, shard: Dict) -> Dict:
+        """1つのシャードをGeminiで精査（失敗した場合は空のdict）"""
+        prompt = self.create_reconstruction_prompt(shard['payload'])
+        if not prompt:
+            return {}
+        response = self.call_gemini_api(prompt)
+        if not response:
+            print(f"シャード {shard['key']} の応答が取得できませんでした")
+            return {}
+        return self.parse_json_response(response)
+
+    def merge_shard_results(self, keywords_data: Dict, shards: List[Dict],
+                            results: List[Dict]) -> Tuple[Dict, List[str], Dict[str, str], set]:
+        """
+        シャードごとの精査結果をkeywords.jsonに決定的にマージ
+
+        - 各シャードの結果は、そのシャードで精査対象にしたキーワードにのみ適用する
+        - fieldとthemeへの移動や、存在しないカテゴリへの移動は無視する
+        - 応答に含まれなかったキーワードは変更しない
+        - aliasesは既存のものを優先し、新規の候補が競合した場合は多数決
+          （同数の場合は辞書順で最初のもの）で決める
+
+        Returns:
+            (マージ後のデータ, 削除したキーワード, 新規に追加したaliases, 精査できたキーワード)
+        """
+        merged = json.loads(json.dumps(keywords_data))
+        merged.setdefault("categories", {})
+        merged.setdefault(CUSTOM_KEY, [])
+        merged.setdefault("aliases", {})
+        allowed = set(merged["categories"]) | {CUSTOM_KEY}
+
+        deleted = set()
+        destinations = {}
+        alias_candidates = {}
+        reviewed = set()
+        for shard, result in zip(shards, results, strict=True):
+            if not result:
+                continue
+            terms = set(shard['terms'])
+            reviewed.update(terms)
+            deleted.update(terms & set(result.get("deleted", [])))
+
+            placements = [(category, result_terms) for category, result_terms
+                          in result.get("categories", {}).items()]
+            placements.append((CUSTOM_KEY, result.get(CUSTOM_KEY, [])))
+            for category, result_terms in placements:
+                if category not in allowed:
+                    continue
+                if category in FIXED_CATEGORIES and category != shard['key']:
+                    continue
+                for term in result_terms:
+                    if term in terms:
+                        destinations.setdefault(term, category)
+
+            for full, short in result.get("aliases", {}).items():
+                if full != short and full not in merged["aliases"]:
+                    alias_candidates.setdefault(full, []).append(short)
+
+        # 削除と移動
+        for shard in shards:
+            for term in shard['terms']:
+                destination = destinations.get(term, shard['key'])
+                if term not in deleted and destination == shard['key']:
+                    continue
+                source = (merged[CUSTOM_KEY] if shard['key'] == CUSTOM_KEY
+                          else merged["categories"].get(shard['key'], []))
+                if term in source:
+                    source.remove(term)
+                if term in deleted:
+                    continue
+                target = (merged[CUSTOM_KEY] if destination == CUSTOM_KEY
+                          else merged["categories"][destination])
+                if term not in target:
+                    target.append(term)
+
+        new_aliases = {}
+        for full in sorted(alias_candidates):
+            votes = Counter(alias_candidates[full])
+            new_aliases[full] = min(votes, key=lambda short: (-votes[short], short))
+        merged["aliases"].update(new_aliases)
+
+        return merged, sorted(deleted), new_aliases, reviewed
+
+    def reconstruct_keywords_sharded(self, current_keywords: Dict,
+                                     incremental: bool = False) -> bool:
+        """
+        キーワードをシャードに分けて並列に精査し、結果をマージして反映
+
+        Args:
+            current_keywords: 現在のkeywords.jsonのデータ
+            incremental: Trueの場合、前回の再構成以降に追加されたキーワードのみを精査する
+        """
+        collected = self.collect_keywords(current_keywords)
+        reviewed_before = self.load_reviewed_keywords() if incremental else set()
+        targets = {}
+        for key, terms in collected.items():
+            new_terms = [term for term in terms if term not in reviewed_before]
+            if new_terms:
+                targets[key] = new_terms
+
+        target_count = sum(len(terms) for terms in targets.values())
+        if not target_count:
+            print("前回の再構成以降に追加されたキーワードはありません")
+            return True
+
+        shards = self.build_shards(current_keywords, targets)
+        print(f"精査対象: {target_count}件のキーワードを{len(shards)}個のシャードで精査します")
+
+        workers = max(1, min(self.max_workers, len(shards)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # mapは投入順に結果を返すため、マージ結果は完了順に依存しない
+            results = list(executor.map(self.review_shard, shards))
+
+        failed = sum(1 for result in results if not result)
+        if failed == len(shards):
+            print("すべてのシャードの精査に失敗しました")
+            return False
+        if failed:
+            print(f"{failed}個のシャードの精査に失敗しました（次回の再構成で再度精査します）")
+
+        merged, deleted_keywords, new_aliases, reviewed = self.merge_shard_results(
+            current_keywords, shards, results)
+
+        if not self.update_keywords_file(merged):
+            print("keywords.jsonの更新に失敗しました")
+            return False
+
+        # 精査できなかったシャードのキーワードは次回も精査対象に残す
+        unreviewed = {term for terms in targets.values() for term in terms} - reviewed
+        all_terms = {term for terms in self.collect_keywords(merged).values()
+                     for term in terms}
+        self.save_reviewed_keywords((all_terms | reviewed_before) - unreviewed)
+
+        if deleted_keywords or new_aliases:
+            print("ノートファイルを更新中...")
+            self.update_all_notes(deleted_keywords, new_aliases)
+
+        print("キーワード再構成が完了しました")
+        return True
+
+    def get_markdown_files(self) -> List[str]:
+        """NOTE_FOLDER内のMarkdownファイル一覧を取得（サブフォルダも含む）"""
         if not os.path.exists(self.note_folder):
             print(f"ノートフォルダが見つかりません: {self.note_folder}")
-            return markdown_files
-
-        for root, dirs, files in os.walk(self.note_folder):
-            for file in files:
-                if file.endswith('.md'):
-                    markdown_files.append(os.path.join(root, file))
+            return []
 
-        return markdown_files
+        return scan_files([self.note_folder], '.md')
 
     def update_note_keywords(self, file_path: str, deleted_keywords: List[str],
                              aliases: Dict[str, str]) -> bool:
@@ -203,9 +412,7 @@ class KeywordsReconstructor:
 
             # 変更があった場合のみファイルを更新
             if modified:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                return True
+                return write_note(file_path, content)
 
             return False
 
@@ -217,19 +424,29 @@ class KeywordsReconstructor:
                          aliases: Dict[str, str]) -> int:
         """全てのノートファイルを更新"""
         markdown_files = self.get_markdown_files()
-        updated_count = 0
+        updated_files = []
 
         print(f"対象ファイル数: {len(markdown_files)}")
 
         for file_path in markdown_files:
             if self.update_note_keywords(file_path, deleted_keywords, aliases):
-                updated_count += 1
+                updated_files.append(file_path)
 
+        updated_count = len(updated_files)
         print(f"更新されたファイル数: {updated_count}")
+
+        # タグが変わったノートだけダッシュボード用のインデックスを更新
+        if updated_files:
+            update_vault_index(self.note_folder, updated_files)
         return updated_count
 
-    def reconstruct_keywords(self) -> bool:
-        """キーワード再構成のメイン処理"""
+    def reconstruct_keywords(self, incremental: bool = False) -> bool:
+        """
+        キーワード再構成のメイン処理
+
+        Args:
+            incremental: Trueの場合、前回の再構成以降に追加されたキーワードのみを精査する
+        """
         print("キーワード再構成を開始します...")
 
         # 1. 現在のキーワードデータを読み込み
@@ -238,6 +455,12 @@ class KeywordsReconstructor:
             print("キーワードデータが読み込めませんでした")
             return False
 
+        # 差分のみ精査する場合や、語彙が1回のリクエストに収まらない場合はシャードに分ける
+        keyword_count = sum(len(terms) for terms in
+                            self.collect_keywords(current_keywords).values())
+        if incremental or keyword_count > self.shard_size:
+            return self.reconstruct_keywords_sharded(current_keywords, incremental)
+
         # 2. 再構成プロンプトを作成
         prompt = self.create_reconstruction_prompt(current_keywords)
         if not prompt:
@@ -278,14 +501,27 @@ class KeywordsReconstructor:
             print("ノートファイルを更新中...")
             self.update_all_notes(deleted_keywords, new_aliases)
 
+        # 10. 次回の差分精査のために精査済みのキーワードを記録
+        self.save_reviewed_keywords({
+            term for terms in self.collect_keywords(new_keywords_data).values()
+            for term in terms})
+
         print("キーワード再構成が完了しました")
         return True
 
 
 def main():
     """単体実行用のメイン関数"""
+    parser = argparse.ArgumentParser(description='keywords.jsonを再構成する')
+    parser.add_argument('--incremental', action='store_true',
+                        help='前回の再構成以降に追加されたキーワードのみを精査する')
+    args = parser.parse_args()
+
+    if not validate_config(KEYWORDS_REQUIRED_VARS):
+        exit(1)
+
     reconstructor = KeywordsReconstructor()
-    success = reconstructor.reconstruct_keywords()
+    success = reconstructor.reconstruct_keywords(incremental=args.incremental)
 
     if success:
         print("✅ キーワード再構成が正常に完了しました")
@@ -0,0 +1,45 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """属性に初めてアクセスした時点でインポートされるモジュールの代理オブジェクト
+
+    google.generativeai や PyPDF2 のような重いライブラリを、そのステージが
+    実際に実行されるまで読み込まないために使う。
+
+    Args:
+        module_name: インポートするモジュール名
+        on_import: インポート直後に一度だけ呼ばれる初期化関数（モジュールを受け取る）
+    """
+
+    def __init__(self, module_name, on_import=None):
+        self._module_name = module_name
+        self._on_import = on_import
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self._module_name)
+                    if self._on_import:
+                        self._on_import(module)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule '{self._module_name}' ({state})>"
+
+
+def lazy_import(module_name, on_import=None):
+    """モジュールを遅延インポートする"""
+    return LazyModule(module_name, on_import)
@@ -0,0 +1,106 @@
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+
+from .obsidian_note_creator import ZOTERO_PLACEHOLDERS
+
+# JSONモードで出力させるためのgeneration_config
+JSON_MIME_TYPE = "application/json"
+
+# テンプレートに現れなくても常にLLMに出力させるフィールド
+# （publicationはZoteroのpublicationTitleが空の場合の補完に使う）
+ALWAYS_REQUESTED_FIELDS = ['publication']
+
+_PLACEHOLDER_PATTERN = re.compile(r'\{\{\s*(\w+)[^}]*\}\}')
+# custom_prompt.mdの1フィールド分の指示（"name": "..." の行から、行頭の " で閉じる行まで）
+PROMPT_FIELD_PATTERN = re.compile(r'^"(\w+)":\s*"(.*?)^",?[ \t]*$', re.M | re.S)
+_FENCE_PATTERN = re.compile(r'```(?:json)?\s*\n(.*?)\n```', re.DOTALL)
+_INVALID_BACKSLASH_PATTERN = re.compile(r'\\(?![\\"nt/])')
+_FIELD_PATTERN = re.compile(r'"(\w+)"\s*:\s*"([\s\S]*?)"\s*(,|})')
+
+
+def get_prompt_fields(raw_prompt: str) -> List[str]:
+    """custom_prompt.mdでLLMに出力を指示しているフィールド名を出現順に取得"""
+    fields = []
+    for match in PROMPT_FIELD_PATTERN.finditer(raw_prompt or ''):
+        if match.group(1) not in fields:
+            fields.append(match.group(1))
+    return fields
+
+
+def get_template_llm_fields(template_content: str,
+                            prompt_fields: Iterable[str] = ()) -> List[str]:
+    """テンプレートで使われているLLM出力のフィールド名を出現順に取得
+
+    Zoteroのプレースホルダーと同じ名前（issueなど）でも、プロンプトで出力を
+    指示しているフィールドはLLMの出力が優先されるため含める。
+    """
+    prompt_fields = set(prompt_fields)
+    fields = []
+    for name in _PLACEHOLDER_PATTERN.findall(template_content or ''):
+        if name in fields:
+            continue
+        if name not in ZOTERO_PLACEHOLDERS or name in prompt_fields:
+            fields.append(name)
+    for name in ALWAYS_REQUESTED_FIELDS:
+        if name not in fields:
+            fields.append(name)
+    return fields
+
+
+def build_object_schema(fields: List[str]) -> Dict:
+    """全フィールドを文字列として必須にしたresponse_schemaを作成"""
+    return {
+        "type": "object",
+        "properties": {field: {"type": "string"} for field in fields},
+        "required": list(fields),
+    }
+
+
+def json_generation_config(schema: Optional[Dict] = None) -> Dict:
+    """JSON出力を要求するgeneration_configを作成（schema指定時は構造も制約する）"""
+    config = {"response_mime_type": JSON_MIME_TYPE}
+    if schema:
+        config["response_schema"] = schema
+    return config
+
+
+def parse_llm_json(response_text: str):
+    """LLMのJSON出力を解析する
+
+    JSONモードの出力はそのまま json.loads で解析できるため、まずそれを試す。
+    失敗した場合のみ、コードフェンスの除去・前後の余分なテキストの除去・
+    無効なバックスラッシュの修正・フィールドごとの正規表現抽出の順に試す。
+
+    Returns:
+        解析結果（dictまたはlist）。何も取り出せない場合はNone
+    """
+    if not response_text:
+        return None
+
+    # 1. JSONモードの通常ケース
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        pass
+
+    # 2. コードフェンスや前後の説明文を除去
+    fence_match = _FENCE_PATTERN.search(response_text)
+    raw = fence_match.group(1) if fence_match else response_text.strip()
+    start = min((i for i in (raw.find('{'), raw.find('[')) if i >= 0),
+                default=-1)
+    end = max(raw.rfind('}'), raw.rfind(']'))
+    if start >= 0 and end > start:
+        raw = raw[start:end + 1]
+
+    # 3. 無効なバックスラッシュ（LaTeXなど）を二重化して再試行
+    for candidate in (raw, _INVALID_BACKSLASH_PATTERN.sub(r'\\\\', raw)):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+
+    # 4. 最後のフォールバック: 正規表現で各文字列フィールドを抜き出す
+    print("JSONとして解析できなかったため、フィールドごとに抽出します")
+    result = {field: value for field, value, _ in _FIELD_PATTERN.findall(raw)}
+    return result or None
@@ -0,0 +1,100 @@
+# model_router.py
+# 論文の推定トークン数から、要約に使うモデル（ルート）を論文ごとに選ぶ。
+#   lite: 短い論文（GEMINI_LITE_MAX_TOKENS以下）は軽量モデル（GEMINI_LITE_MODEL）で要約する
+#   standard: 通常の論文は通常のモデル（GEMINI_MODEL）で要約する
+#   chunked: 非常に長い論文（GEMINI_CHUNK_MIN_TOKENS以上）は分割して要点を抜き出してから要約する
+# GEMINI_LATENCY_TARGETを設定した場合は、今回の実行で観測した通常のモデルの速度から
+# 目標時間を超えると見込まれる論文も軽量モデルに回す。
+# 選んだルートは使用量の台帳（usage_ledger）の各呼び出しに記録する。
+import threading
+from typing import Dict, Optional
+
+from .config import (
+    GEMINI_CHUNK_MIN_TOKENS,
+    GEMINI_LATENCY_TARGET,
+    GEMINI_LITE_MAX_TOKENS,
+    GEMINI_LITE_MODEL,
+    GEMINI_MODEL,
+    GEMINI_MODEL_ROUTING,
+)
+from .pdf_processor import summarize_chunked, summarize_text
+from .scheduler import estimate_text_tokens
+from .usage_ledger import get_run_usage, usage_route
+
+ROUTES = ("lite", "standard", "chunked")
+
+_enabled = GEMINI_MODEL_ROUTING
+# ルートごとの論文数（プロセス全体）
+_counts = dict.fromkeys(ROUTES, 0)
+_counts_lock = threading.Lock()
+
+
+def set_model_routing_enabled(enabled: bool):
+    """このプロセスで論文の長さに応じてモデルを選ぶかを設定"""
+    global _enabled
+    _enabled = enabled
+
+
+def is_model_routing_enabled() -> bool:
+    return _enabled
+
+
+def estimate_latency(model_name: str, estimated_tokens: int) -> Optional[float]:
+    """今回の実行で観測した入力トークンあたりの所要時間から、1本の要約の時間を見積もる（未観測ならNone）"""
+    usage = get_run_usage()['models'].get(model_name)
+    if not usage or not usage['input_tokens']:
+        return None
+    return usage['latency'] / usage['input_tokens'] * estimated_tokens
+
+
+def choose_route(estimated_tokens: int) -> str:
+    """推定トークン数から論文のルートを選ぶ（モデルの選択が無効な場合は常にstandard）"""
+    if not _enabled:
+        return "standard"
+    if estimated_tokens >= GEMINI_CHUNK_MIN_TOKENS:
+        return "chunked"
+    if estimated_tokens <= GEMINI_LITE_MAX_TOKENS:
+        return "lite"
+    if GEMINI_LATENCY_TARGET:
+        latency = estimate_latency(GEMINI_MODEL, estimated_tokens)
+        if latency is not None and latency > GEMINI_LATENCY_TARGET:
+            return "lite"
+    return "standard"
+
+
+def route_model(route: str) -> str:
+    """ルートに対応するモデル名"""
+    return GEMINI_LITE_MODEL if route == "lite" else GEMINI_MODEL
+
+
+def summarize_routed(text):
+    """
+    論文の長さに応じたモデルで要約する
+
+    Returns:
+        summarize_textと同じ要約データ。失敗した場合はNone
+    """
+    estimated_tokens = estimate_text_tokens(text)
+    route = choose_route(estimated_tokens)
+    model_name = route_model(route)
+    with _counts_lock:
+        _counts[route] += 1
+    if _enabled:
+        print(f"モデルの選択: {route}（{model_name}、推定{estimated_tokens}トークン）")
+    with usage_route(route):
+        if route == "chunked":
+            return summarize_chunked(text, model_name)
+        return summarize_text(text, model_name)
+
+
+def get_route_counts() -> Dict[str, int]:
+    """ルートごとの論文数を取得"""
+    with _counts_lock:
+        return dict(_counts)
+
+
+def reset_route_counts():
+    """ルートごとの集計をリセット"""
+    with _counts_lock:
+        for route in _counts:
+            _counts[route] = 0
@@ -0,0 +1,94 @@
+# note_artifacts.py
+# ノートの作成に使った要約（LLMのJSON）とZoteroのメタデータをDATA_DIR/note_artifactsに保存する。
+# テンプレートを変更したときに、Gemini・Zoteroを呼ばずにノートを作り直すために使う。
+# どのテンプレートで作成したかはテンプレートのハッシュ値で記録する。
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from .config import DATA_DIR
+from .zotero_record import attach_record
+
+NOTE_ARTIFACTS_DIR_NAME = "note_artifacts"
+
+
+def template_hash(template_content: str) -> str:
+    """テンプレートの内容のハッシュ値（SHA-256）"""
+    return hashlib.sha256((template_content or '').encode('utf-8')).hexdigest()
+
+
+def get_artifact_path(note_title: str) -> str:
+    """ノートに対応する保存ファイルのパス"""
+    return os.path.join(DATA_DIR, NOTE_ARTIFACTS_DIR_NAME, f"{note_title}.json")
+
+
+def _write_json(path: str, data: Dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def save_note_artifacts(note_title: str, pdf_filename: str, zotero_data: Optional[Dict],
+                        summary_data, template_content: str) -> bool:
+    """
+    ノートの作成に使ったデータを保存する
+
+    Args:
+        note_title: ノート名
+        pdf_filename: PDFのファイル名（拡張子あり）
+        zotero_data: Zoteroのメタデータ（見つからなかった場合はNone）
+        summary_data: LLMの要約データ
+        template_content: ノートの作成に使ったテンプレート
+    """
+    try:
+        zotero_data = dict(zotero_data) if zotero_data else None
+        if zotero_data is not None and not zotero_data.get('dateAdded'):
+            # importDateが空の場合は作成日を使うため、作り直しても日付が変わらないよう記録する
+            zotero_data['dateAdded'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            # 固定した取り込み日時もレコードに入れ、作り直すときに解析しないようにする
+            attach_record(zotero_data)
+        _write_json(get_artifact_path(note_title), {
+            'pdf_filename': pdf_filename,
+            'zotero': zotero_data,
+            'summary': summary_data if isinstance(summary_data, dict) else {},
+            'template_hash': template_hash(template_content),
+        })
+        return True
+    except Exception as e:
+        print(f"ノートの作成データの保存中にエラーが発生しました: {e}")
+        return False
+
+
+def load_note_artifacts(note_title: str) -> Optional[Dict]:
+    """保存したデータを読み込む（保存されていない場合はNone）"""
+    path = get_artifact_path(note_title)
+    try:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"ノートの作成データの読み込み中にエラーが発生しました: {e}")
+        return None
+
+
+def update_note_artifacts(note_title: str, summary_updates: Dict = None,
+                          template_content: str = None) -> bool:
+    """保存したデータの要約の一部やテンプレートのハッシュ値を更新する（保存されていなければ何もしない）"""
+    artifacts = load_note_artifacts(note_title)
+    if artifacts is None:
+        return False
+    try:
+        if summary_updates:
+            artifacts.setdefault('summary', {}).update(summary_updates)
+        if template_content is not None:
+            artifacts['template_hash'] = template_hash(template_content)
+        _write_json(get_artifact_path(note_title), artifacts)
+        return True
+    except Exception as e:
+        print(f"ノートの作成データの更新中にエラーが発生しました: {e}")
+        return False
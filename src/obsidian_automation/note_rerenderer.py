@@ -0,0 +1,186 @@
+# note_rerenderer.py
+# テンプレートを変更したときに、保存しておいた要約とZoteroのデータ（note_artifacts）から
+# 既存のノートを作り直す。PDFの抽出・Gemini・Zoteroは一切呼ばない。
+# テンプレートに埋め込むデータがない見出し（# Memo、# Commentsなど）の本文、
+# frontmatterの評価（rating）、重複PDFのリンクなど、ユーザーが書き込んだ部分は引き継ぐ。
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .config import NOTE_FOLDER, NOTE_FOLDERS
+from .file_scanner import build_name_index, merge_roots, scan_files
+from .note_artifacts import load_note_artifacts, template_hash, update_note_artifacts
+from .note_writer import write_note
+from .obsidian_note_creator import add_pdf_link, load_template, render_template_note
+from .vault_index import update_vault_indexes
+
+# rerender_noteの結果
+RERENDERED = "rerendered"
+UP_TO_DATE = "up_to_date"
+NO_ARTIFACTS = "no_artifacts"
+FAILED = "failed"
+
+_HEADING_PATTERN = re.compile(r'^(#{1,6})[ \t]+\S.*$', re.M)
+_FRONTMATTER_PATTERN = re.compile(r'\A---\n(.*?\n)---\n', re.S)
+_FRONTMATTER_KEY_PATTERN = re.compile(r'^([\w-]+):')
+_PDF_LINK_PATTERN = re.compile(r'\[\[([^\[\]|]+\.pdf)\]\]')
+
+
+def _section_span(content: str, heading: str) -> Optional[Tuple[int, int]]:
+    """見出しの本文の範囲（同じかより上の階層の次の見出しまで）。見出しがなければNone"""
+    match = re.search(rf'^{re.escape(heading)}[ \t]*$', content, re.M)
+    if not match:
+        return None
+    level = len(heading) - len(heading.lstrip('#'))
+    for next_heading in _HEADING_PATTERN.finditer(content, match.end()):
+        if len(next_heading.group(1)) <= level:
+            return match.end(), next_heading.start()
+    return match.end(), len(content)
+
+
+def get_user_sections(template: str) -> List[str]:
+    """テンプレートの見出しのうち、本文にプレースホルダーがないもの（ユーザーが書き込む見出し）"""
+    user_sections = []
+    for match in _HEADING_PATTERN.finditer(template):
+        heading = match.group(0).rstrip()
+        start, end = _section_span(template, heading)
+        if '{{' not in template[start:end] and heading not in user_sections:
+            user_sections.append(heading)
+    return user_sections
+
+
+def _frontmatter_blocks(frontmatter: str) -> Dict[str, str]:
+    """frontmatterをキー -> そのキーの行（続くリストなどの行を含む）に分ける"""
+    blocks = {}
+    key = None
+    for line in frontmatter.splitlines(keepends=True):
+        match = _FRONTMATTER_KEY_PATTERN.match(line)
+        if match:
+            key = match.group(1)
+            blocks[key] = line
+        elif key is not None:
+            blocks[key] += line
+    return blocks
+
+
+def _merge_frontmatter(new_content: str, old_content: str, template: str) -> str:
+    """テンプレートで値を埋め込まないキー（ratingなど）とユーザーが追加したキーは元のノートの値を使う"""
+    new_match = _FRONTMATTER_PATTERN.match(new_content)
+    old_match = _FRONTMATTER_PATTERN.match(old_content)
+    template_match = _FRONTMATTER_PATTERN.match(template)
+    if not (new_match and old_match and template_match):
+        return new_content
+    new_blocks = _frontmatter_blocks(new_match.group(1))
+    old_blocks = _frontmatter_blocks(old_match.group(1))
+    template_blocks = _frontmatter_blocks(template_match.group(1))
+
+    merged = []
+    for key, block in new_blocks.items():
+        if key in old_blocks and '{{' not in template_blocks.get(key, '{{'):
+            block = old_blocks[key]
+        merged.append(block)
+    merged.extend(block for key, block in old_blocks.items()
+                  if key not in new_blocks and key not in template_blocks)
+    merged_text = ''.join(block if block.endswith('\n') else block + '\n'
+                          for block in merged)
+    return f"---\n{merged_text}---\n" + new_content[new_match.end():]
+
+
+def preserve_user_content(new_content: str, old_content: str, template: str,
+                          note_title: str) -> str:
+    """作り直したノートに、元のノートでユーザーが書き込んだ部分を引き継ぐ"""
+    content = _merge_frontmatter(new_content, old_content, template)
+
+    for heading in get_user_sections(template):
+        old_span = _section_span(old_content, heading)
+        new_span = _section_span(content, heading)
+        if old_span is None or new_span is None:
+            continue
+        content = (content[:new_span[0]] + old_content[old_span[0]:old_span[1]]
+                   + content[new_span[1]:])
+
+    # 重複したPDFとして追加したリンクを引き継ぐ
+    for pdf_filename in _PDF_LINK_PATTERN.findall(old_content):
+        link = f"[[{pdf_filename}]]"
+        if link not in content:
+            content = add_pdf_link(content, note_title, link)
+    return content
+
+
+def rerender_note(note_path: str, template: str, force: bool = False) -> str:
+    """
+    保存しておいたデータから1つのノートを作り直す
+
+    Args:
+        note_path: ノートのパス
+        template: 現在のテンプレート
+        force: テンプレートが変わっていなくても作り直す
+
+    Returns:
+        RERENDERED / UP_TO_DATE / NO_ARTIFACTS / FAILED
+    """
+    note_title = os.path.splitext(os.path.basename(note_path))[0]
+    artifacts = load_note_artifacts(note_title)
+    if artifacts is None:
+        return NO_ARTIFACTS
+    if not force and artifacts.get('template_hash') == template_hash(template):
+        return UP_TO_DATE
+    try:
+        with open(note_path, 'r', encoding='utf-8') as f:
+            old_content = f.read()
+        zotero_data = artifacts.get('zotero')
+        content = render_template_note(
+            template, note_title,
+            artifacts.get('pdf_filename') or f"{note_title}.pdf",
+            dict(zotero_data) if zotero_data else None,
+            artifacts.get('summary') or {})
+        content = preserve_user_content(content, old_content, template, note_title)
+        write_note(note_path, content)
+        update_note_artifacts(note_title, template_content=template)
+        return RERENDERED
+    except Exception as e:
+        print(f"ノート {note_path} の作り直し中にエラーが発生しました: {e}")
+        return FAILED
+
+
+def rerender_notes(workers: int = 1, force: bool = False) -> Dict[str, int]:
+    """
+    テンプレートが変わったノートを、保存しておいたデータからまとめて作り直す
+
+    Args:
+        workers: 並列に処理するノート数
+        force: テンプレートが変わっていないノートも作り直す
+
+    Returns:
+        結果ごとのノート数
+    """
+    template = load_template()
+    if not template:
+        print("テンプレートが見つからないため、ノートを作り直せません。")
+        return {}
+
+    note_index = build_name_index(
+        scan_files(merge_roots(NOTE_FOLDER, NOTE_FOLDERS), '.md'))
+    note_paths = [note_index[name] for name in sorted(note_index)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(
+            lambda note_path: rerender_note(note_path, template, force), note_paths))
+
+    counts = {status: results.count(status)
+              for status in (RERENDERED, UP_TO_DATE, NO_ARTIFACTS, FAILED)}
+    written = [path for path, result in zip(note_paths, results, strict=True)
+               if result == RERENDERED]
+    if written:
+        # 作り直したノートをダッシュボード用のインデックスに反映
+        update_vault_indexes(written, merge_roots(NOTE_FOLDER, NOTE_FOLDERS))
+
+    print(f"ノートの作り直し完了: {counts[RERENDERED]}個のノートを"
+          f"現在のテンプレートで作り直しました。")
+    if counts[UP_TO_DATE]:
+        print(f"テンプレートが変わっていないノート: {counts[UP_TO_DATE]}個")
+    if counts[NO_ARTIFACTS]:
+        print(f"作成時のデータが保存されていないため作り直せないノート: {counts[NO_ARTIFACTS]}個")
+    if counts[FAILED]:
+        print(f"エラーで作り直せなかったノート: {counts[FAILED]}個")
+    return counts
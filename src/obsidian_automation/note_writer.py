@@ -0,0 +1,77 @@
+# note_writer.py
+# ノートの書き込みをまとめる。
+# 内容が既存のファイルと同じ場合は書き込まない
+# （Obsidianの再インデックスや同期のアップロードを起こさない）。
+# 書き込む場合は同じフォルダの一時ファイルに書いてから置き換えるため、
+# 途中でプロセスが止まっても書きかけのノートが残らない。
+import os
+import threading
+from typing import Dict
+
+# 書き込んだノートと、内容が同じため書き込みを省略したノートの数（プロセス全体）
+_counts = {'written': 0, 'unchanged': 0}
+_counts_lock = threading.Lock()
+
+
+def _read_existing(note_path: str, content: str):
+    """内容を比較するために既存のノートを読む（存在しない・明らかに内容が違う場合はNone）"""
+    try:
+        # UTF-8のバイト数は文字数以上なので、ファイルの方が小さければ読むまでもなく違う
+        if os.path.getsize(note_path) < len(content):
+            return None
+        with open(note_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def write_note(note_path: str, content: str) -> bool:
+    """
+    ノートを書き込む（内容が同じなら何もしない）
+
+    Args:
+        note_path: ノートのパス
+        content: ノートの内容
+
+    Returns:
+        書き込んだ場合はTrue、内容が同じため省略した場合はFalse
+    """
+    if _read_existing(note_path, content) == content:
+        with _counts_lock:
+            _counts['unchanged'] += 1
+        return False
+
+    # 一時ファイルは同じフォルダに作る（別のファイルシステムだとos.replaceがアトミックにならない）。
+    # 先頭を"."にしてObsidianに拾われないようにし、並列に書き込んでも衝突しない名前にする
+    folder, file_name = os.path.split(note_path)
+    temp_path = os.path.join(
+        folder, f".{file_name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(note_path):
+            # ユーザーが設定したパーミッションを引き継ぐ
+            os.chmod(temp_path, os.stat(note_path).st_mode & 0o7777)
+        os.replace(temp_path, note_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    with _counts_lock:
+        _counts['written'] += 1
+    return True
+
+
+def get_write_counts() -> Dict[str, int]:
+    """書き込んだノートと書き込みを省略したノートの数を取得"""
+    with _counts_lock:
+        return dict(_counts)
+
+
+def reset_write_counts():
+    """書き込みの集計をリセット"""
+    with _counts_lock:
+        for key in _counts:
+            _counts[key] = 0
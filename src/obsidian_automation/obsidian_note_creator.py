@@ -1,8 +1,25 @@
 import os
 import re
 from .config import NOTE_FOLDER, TEMPLATE_PATH
+from .note_artifacts import save_note_artifacts
+from .note_writer import write_note
+# make_authors_blockとmake_info_blockは以前このモジュールにあったため、
+# ここからもインポートできるようにする
+from .zotero_record import (get_record, make_authors_block, make_citation,  # noqa: F401
+                            make_info_block, parse_date)
 from datetime import datetime
 
+# Zoteroのデータで置換されるプレースホルダー名（それ以外はLLMの出力で置換される）
+ZOTERO_PLACEHOLDERS = frozenset([
+    'title', 'date', 'year', 'url', 'DOI', 'abstractNote', 'publicationTitle',
+    'journalAbbreviation', 'volume', 'issue', 'pages', 'publisher', 'place',
+    'ISBN', 'ISSN', 'language', 'series', 'seriesNumber', 'edition',
+    'numPages', 'accessDate', 'archive', 'archiveLocation', 'libraryCatalog',
+    'callNumber', 'rights', 'extra', 'itemType', 'citekey', 'importDate',
+    'tags', 'collections', 'authors', 'author', 'firstAuthor',
+    'authors_block', 'info_block', 'bibliography', 'creator',
+])
+
 
 def load_template():
     """テンプレートファイルを読み込む"""
@@ -14,6 +31,18 @@ def load_template():
         return None
 
 
+def to_strftime_format(format_pattern):
+    """Liquid記法の日付フォーマットをPythonの日付フォーマットに変換"""
+    python_format = format_pattern
+    python_format = python_format.replace('YYYY', '%Y')
+    python_format = python_format.replace('MM', '%m')
+    python_format = python_format.replace('DD', '%d')
+    python_format = python_format.replace('HH', '%H')
+    python_format = python_format.replace('mm', '%M')
+    python_format = python_format.replace('ss', '%S')
+    return python_format
+
+
 def format_date(date_string, format_pattern):
     """日付文字列を指定されたフォーマットに変換"""
     if not date_string:
@@ -21,34 +50,10 @@ def format_date(date_string, format_pattern):
 
     try:
         # Liquid記法からPythonの日付フォーマットに変換
-        python_format = format_pattern
-        python_format = python_format.replace('YYYY', '%Y')
-        python_format = python_format.replace('MM', '%m')
-        python_format = python_format.replace('DD', '%d')
-        python_format = python_format.replace('HH', '%H')
-        python_format = python_format.replace('mm', '%M')
-        python_format = python_format.replace('ss', '%S')
+        python_format = to_strftime_format(format_pattern)
 
         # 様々な日付形式に対応
-        date_formats = [
-            '%Y-%m-%d',
-            '%Y/%m/%d',
-            '%Y-%m-%d %H:%M:%S',
-            '%Y/%m/%d %H:%M:%S',
-            '%Y-%m-%dT%H:%M:%S',
-            '%Y-%m-%dT%H:%M:%SZ',
-            '%Y-%m-%dT%H:%M:%S.%fZ',
-            '%Y',
-            '%Y-%m',
-        ]
-
-        parsed_date = None
-        for fmt in date_formats:
-            try:
-                parsed_date = datetime.strptime(date_string, fmt)
-                break
-            except ValueError:
-                continue
+        parsed_date = parse_date(date_string)
 
         if parsed_date:
             formatted_result = parsed_date.strftime(python_format)
@@ -102,6 +107,16 @@ def format_blockquote_content(text):
     return '\n'.join(formatted_lines)
 
 
+def format_llm_value(field, value):
+    """LLMのフィールドの値をノートに書き込む形式に整形（blockquote内のフィールドは> を付ける）"""
+    if not value:
+        return ''
+    # glossaryとkeywordはblockquote内に配置されるため特別処理
+    if field in ('glossary', 'keyword'):
+        return format_blockquote_content(value)
+    return str(value)
+
+
 def replace_llm_placeholders(content, llm_data):
     """LLMから取得したデータを{{}}記法で置換"""
     if not llm_data:
@@ -110,21 +125,11 @@ def replace_llm_placeholders(content, llm_data):
     print("LLMデータで置換を開始...")
     print(f"利用可能なLLMフィールド: {list(llm_data.keys())}")
     
-    # glossaryはblockquote内に配置されるため特別処理
-    glossary_text = llm_data.get('glossary', '')
-    if glossary_text:
-        glossary_text = format_blockquote_content(glossary_text)
-    
-    # keywordもblockquote内に配置されるため特別処理
-    keyword_text = llm_data.get('keyword', '')
-    if keyword_text:
-        keyword_text = format_blockquote_content(keyword_text)
-    
     # LLMデータの全フィールドを動的に置換
-    # 特別処理が必要なフィールド（glossary, keyword）を先に処理
+    # glossaryとkeywordは返ってこなかった場合も空にする
     llm_replacements = {
-        '{{glossary}}': glossary_text,
-        '{{keyword}}': keyword_text,
+        '{{glossary}}': format_llm_value('glossary', llm_data.get('glossary', '')),
+        '{{keyword}}': format_llm_value('keyword', llm_data.get('keyword', '')),
     }
     
     # その他の全フィールドを自動追加
@@ -152,6 +157,8 @@ def replace_zotero_placeholders(content, zotero_data, llm_data=None):
 
     print("Zoteroデータで置換を開始...")
     print(f"利用可能なZoteroフィールド: {list(zotero_data.keys())}")
+    # 日付と著者は取得時に正規化したレコードの値を使う（ここでは解析しない）
+    record = get_record(zotero_data)
     
     # LLMから取得したpublication情報があれば、zotero_dataに追加
     if llm_data and llm_data.get('publication'):
@@ -184,7 +191,13 @@ def replace_zotero_placeholders(content, zotero_data, llm_data=None):
             field_value = datetime.now().strftime('%Y-%m-%d')
             print(f"importDateが空のため現在の日付を使用: {field_value}")
 
-        if field_value:
+        parsed_date = record['dates'].get(actual_field)
+        if field_value and parsed_date:
+            formatted_value = datetime(*parsed_date).strftime(
+                to_strftime_format(format_spec))
+            print(f"フォーマット置換: {match.group(0)} -> {formatted_value}")
+            return formatted_value
+        elif field_value:
             formatted_value = format_date(field_value, format_spec)
             print(f"フォーマット置換: {match.group(0)} -> {formatted_value}")
             return formatted_value
@@ -201,8 +214,7 @@ def replace_zotero_placeholders(content, zotero_data, llm_data=None):
     replacements = {
         '{{title}}': clean_title,  # クリーンなタイトルを使用
         '{{date}}': zotero_data.get('date', ''),
-        '{{year}}': (zotero_data.get('date', '')[:4]
-                     if zotero_data.get('date') else ''),
+        '{{year}}': record['year'],
         '{{url}}': zotero_data.get('url', ''),
         '{{DOI}}': zotero_data.get('DOI', ''),
         '{{abstractNote}}': zotero_data.get('abstractNote', ''),
@@ -239,18 +251,8 @@ def replace_zotero_placeholders(content, zotero_data, llm_data=None):
     # 著者の処理
     creators = zotero_data.get('creators', [])
     if creators:
-        # 著者名のリストを作成
-        author_names = []
-        for creator in creators:
-            if creator.get('creatorType') == 'author':
-                first_name = creator.get('firstName', '')
-                last_name = creator.get('lastName', '')
-                if first_name and last_name:
-                    author_names.append(f"{first_name} {last_name}")
-                elif last_name:
-                    author_names.append(last_name)
-                elif first_name:
-                    author_names.append(first_name)
+        # 著者名のリスト
+        author_names = record['author_names']
 
         replacements['{{authors}}'] = ', '.join(author_names)
         replacements['{{author}}'] = ', '.join(author_names)
@@ -327,12 +329,8 @@ def replace_zotero_placeholders(content, zotero_data, llm_data=None):
     # {%- for creator in creators -%} のようなLiquid記法を処理
     if '{%- for creator in creators -%}' in content:
         if creators:
-            creator_lines = []
-            for creator in creators:
-                if creator.get('creatorType') == 'author':
-                    first_name = creator.get('firstName', '')
-                    last_name = creator.get('lastName', '')
-                    creator_lines.append(f'  - "{last_name}, {first_name}"')
+            creator_lines = [f'  - "{last_name}, {first_name}"'
+                             for last_name, first_name in record['authors']]
             content = content.replace(
                 '{%- for creator in creators -%}\n    - "{{creator.lastName}}, {{creator.firstName}}"\n  {%- endfor %}', '\n'.join(creator_lines))
         else:
@@ -350,31 +348,13 @@ def replace_zotero_placeholders(content, zotero_data, llm_data=None):
 
     # {{bibliography.slice(4)}} のような特殊な記法を処理
     if '{{bibliography.slice(4)}}' in content:
-        citation = make_citation(zotero_data)
+        citation = record['citation'] if 'citation' in record else make_citation(zotero_data)
         content = content.replace('{{bibliography.slice(4)}}', citation)
 
     # {% for type, creators in creators | groupby("creatorType") %} のような複雑な記法を処理
     if '{% for type, creators in creators | groupby("creatorType") %}' in content:
         if creators:
-            creator_info = []
-            for creator in creators:
-                creator_type = creator.get('creatorType', 'unknown')
-                first_name = creator.get('firstName', '')
-                last_name = creator.get('lastName', '')
-                name = creator.get('name', '')
-
-                if name:
-                    creator_info.append(
-                        f'> **{creator_type.capitalize()}**: {name}')
-                elif last_name and first_name:
-                    creator_info.append(
-                        f'> **{creator_type.capitalize()}**: {last_name}, {first_name}')
-                elif last_name:
-                    creator_info.append(
-                        f'> **{creator_type.capitalize()}**: {last_name}')
-                elif first_name:
-                    creator_info.append(
-                        f'> **{creator_type.capitalize()}**: {first_name}')
+            creator_info = record['creator_lines']
 
             # 複雑なLiquid記法を置換
             content = re.sub(r'{% for type, creators in creators \| groupby\("creatorType"\) %}-%}.*?{%- endfor %}',
@@ -385,13 +365,11 @@ def replace_zotero_placeholders(content, zotero_data, llm_data=None):
 
     # authors_blockの置換
     if '{{authors_block}}' in content:
-        content = content.replace('{{authors_block}}', make_authors_block(
-            zotero_data.get('creators', [])))
+        content = content.replace('{{authors_block}}', record['authors_block'])
 
     # info_blockの置換
     if '{{info_block}}' in content:
-        content = content.replace(
-            '{{info_block}}', make_info_block(zotero_data))
+        content = content.replace('{{info_block}}', record['info_block'])
 
     # デバッグ: {{title}}が残っているかチェック
     if '{{title}}' in content:
@@ -404,140 +382,66 @@ def replace_zotero_placeholders(content, zotero_data, llm_data=None):
     return content
 
 
-def make_citation(zotero_data):
-    """Zoteroデータから引用形式を生成"""
-    if not zotero_data:
-        return "<!-- 参考文献は手動で追加してください -->"
+def render_template_note(template_content, note_title, pdf_filename_with_ext,
+                         zotero_data, summary_data):
+    """テンプレートにLLMとZoteroのデータを埋め込んでノートの内容を作成"""
+    # テンプレートを使用してノートを作成
+    content = template_content
 
-    # 著者名を取得（姓、名の順）
-    creators = zotero_data.get('creators', [])
-    author_names = []
-    for creator in creators:
-        if creator.get('creatorType') == 'author':
-            first = creator.get('firstName', '')
-            last = creator.get('lastName', '')
-            if first and last:
-                author_names.append(f"{last}, {first}")
-            elif last:
-                author_names.append(last)
-            elif first:
-                author_names.append(first)
-
-    # 基本情報を取得
-    title = zotero_data.get('title', '')
-    date = zotero_data.get('date', '')
-    year = date[:4] if date else ''
-    doi = zotero_data.get('DOI', '')
-    url = zotero_data.get('url', '')
-    item_type = zotero_data.get('itemType', '')
-
-    # 引用形式を構築（実際のノートの形式に合わせる）
-    citation_parts = []
-
-    # 著者名（最初の著者のみ）
-    if author_names:
-        first_author = author_names[0]
-        if len(author_names) > 1:
-            # 他の著者名を取得
-            other_authors = []
-            for i in range(1, len(author_names)):
-                name_parts = author_names[i].split(', ')
-                if len(name_parts) == 2:
-                    other_authors.append(name_parts[1] + ' ' + name_parts[0])
-                else:
-                    other_authors.append(author_names[i])
+    # タイトルを置換
+    content = content.replace("{title}", note_title)
 
-            authors_str = first_author + ', ' + ', '.join(other_authors)
-        else:
-            authors_str = first_author
-
-        citation_parts.append(authors_str)
-
-    # タイトル（引用符付き）
-    if title:
-        citation_parts.append(f"'{title}'")
-
-    # 出版情報
-    if item_type == 'preprint':
-        citation_parts.append('arXiv')
-        if date:
-            month_names = ['', 'January', 'February', 'March', 'April', 'May',
-                           'June', 'July', 'August', 'September', 'October',
-                           'November', 'December']
-            date_parts = date.split('-')
-            day = date_parts[2]
-            month = month_names[int(date_parts[1])]
-            citation_parts.append(f"{day} {month} {year}")
-
-    # DOIまたはURL
-    if doi:
-        citation_parts.append(
-            f"[https://doi.org/{doi}](https://doi.org/{doi})")
-    elif url:
-        citation_parts.append(f"[{url}]({url})")
-
-    if citation_parts:
-        return '. '.join(citation_parts) + '.'
-    else:
-        return "<!-- 参考文献は手動で追加してください -->"
+    # summary_dataから情報を取得
+    llm_data = summary_data if isinstance(summary_data, dict) else {}
 
+    # LLMから取得したabstractがあれば、zotero_dataに追加
+    abstract_text = llm_data.get('abstract', '')
+    if abstract_text and zotero_data:
+        print(f"LLMから取得したabstract情報を使用します（長さ: {len(abstract_text)}）")
+        zotero_data['abstractNote'] = abstract_text
 
-def make_authors_block(creators):
-    if not creators:
-        return "  - ''"
-    lines = []
-    for creator in creators:
-        if creator.get('creatorType') == 'author':
-            last = creator.get('lastName', '')
-            first = creator.get('firstName', '')
-            if last or first:
-                lines.append(f'  - {last}, {first}')
-    return '\n'.join(lines) if lines else "  - ''"
+    # まずLLMデータの置換を実行
+    content = replace_llm_placeholders(content, llm_data)
 
+    # 次にZoteroの{{}}記法を置換
+    content = replace_zotero_placeholders(content, zotero_data, llm_data)
 
-def make_info_block(zotero_data):
-    creators = zotero_data.get('creators', [])
-    lines = []
-
-    # 著者を処理（FirstAuthor:: と Author:: の形式）
-    first_author = True
-    for creator in creators:
-        if creator.get('creatorType') == 'author':
-            last = creator.get('lastName', '')
-            first = creator.get('firstName', '')
-            name = creator.get('name', '')
-
-            if name:
-                author_name = name
-            elif last and first:
-                author_name = f"{last}, {first}"
-            elif last:
-                author_name = last
-            elif first:
-                author_name = first
-            else:
-                continue
+    # 古いプレースホルダーもサポート（後方互換性のため）
+    if zotero_data:
+        # タイトル
+        if "{zotero_title}" in content:
+            content = content.replace("{zotero_title}",
+                                      zotero_data.get('title', 'N/A'))
 
-            if first_author:
-                lines.append(f'> **FirstAuthor**: {author_name}')
-                first_author = False
-            else:
-                lines.append(f'> **Author**: {author_name}')
-
-    # その他の情報
-    lines.append(f'> **Title**: {zotero_data.get("title", "")}')
-    year = zotero_data.get("date", "")
-    if year:
-        lines.append(f'> **Year**: {year[:4]}')
-    if zotero_data.get("citekey"):
-        lines.append(f'> **Citekey**: {zotero_data.get("citekey", "")}')
-    if zotero_data.get("itemType"):
-        lines.append(f'> **itemType**: {zotero_data.get("itemType", "")}')
+        # 著者
+        if "{zotero_authors}" in content:
+            creators = zotero_data.get('creators', [])
+            creator_names = [
+                f"{a.get('firstName', '')} {a.get('lastName', '')}"
+                for a in creators
+            ]
+            content = content.replace("{zotero_authors}",
+                                      ', '.join(creator_names))
 
-    return '\n'.join(lines)
+        # 発行年
+        if "{zotero_date}" in content:
+            content = content.replace("{zotero_date}",
+                                      zotero_data.get('date', 'N/A'))
+
+        # URL
+        if "{zotero_url}" in content:
+            content = content.replace("{zotero_url}",
+                                      zotero_data.get('url', 'N/A'))
+
+    # PDFファイル名を置換
+    if "{pdf_filename}" in content:
+        content = content.replace("{pdf_filename}", pdf_filename_with_ext)
+
+    return content
 
 
 def create_obsidian_note(pdf_path, zotero_data, summary_data):
+    """PDFのノートを作成する（ノートを書き込めない場合は例外を送出する）"""
     # PDFファイル名からノート名を決定 (拡張子なし)
     pdf_filename_with_ext = os.path.basename(pdf_path)
     note_title = os.path.splitext(pdf_filename_with_ext)[0]
@@ -578,63 +482,63 @@ def create_obsidian_note(pdf_path, zotero_data, summary_data):
         content += "\n"
     else:
         # テンプレートを使用してノートを作成
-        content = template_content
-
-        # タイトルを置換
-        content = content.replace("{title}", note_title)
-
-        # summary_dataから情報を取得
-        llm_data = summary_data if isinstance(summary_data, dict) else {}
-        
-        # LLMから取得したabstractがあれば、zotero_dataに追加
-        abstract_text = llm_data.get('abstract', '')
-        if abstract_text and zotero_data:
-            print(f"LLMから取得したabstract情報を使用します（長さ: {len(abstract_text)}）")
-            zotero_data['abstractNote'] = abstract_text
+        content = render_template_note(template_content, note_title,
+                                       pdf_filename_with_ext, zotero_data,
+                                       summary_data)
 
-        # まずLLMデータの置換を実行
-        content = replace_llm_placeholders(content, llm_data)
+    # 書き込みのエラーは呼び出し元に伝え、処理済みとして記録しないようにする
+    written = write_note(note_path, content)
+    if written:
+        print(f"Obsidianノートが作成されました: {note_path}")
+    else:
+        print(f"ノートの内容に変更がないため書き込みを省略しました: {note_path}")
+
+    # テンプレートを変更したときにAPIを呼ばずに作り直せるよう、要約とZoteroのデータを保存
+    if template_content:
+        save_note_artifacts(note_title, pdf_filename_with_ext, zotero_data,
+                            summary_data, template_content)
+
+
+def add_pdf_link(content, note_title, link):
+    """PDFへのリンクをノートの内容に追加する
+
+    既存のPDFへのリンク（[[<ノート名>.pdf]]）の次の行に追加し、
+    見つからない場合はノートの末尾に追加する。
+    """
+    lines = content.split('\n')
+    original_link = f"[[{note_title}.pdf]]"
+    for i, line in enumerate(lines):
+        if original_link in line:
+            prefix = "> " if line.startswith('>') else ""
+            lines.insert(i + 1, f"{prefix}{link}")
+            break
+    else:
+        lines.extend(["", "> [!Data] Duplicate PDF", f"> {link}"])
+    return '\n'.join(lines)
 
-        # 次にZoteroの{{}}記法を置換
-        content = replace_zotero_placeholders(content, zotero_data, llm_data)
 
-        # 古いプレースホルダーもサポート（後方互換性のため）
-        if zotero_data:
-            # タイトル
-            if "{zotero_title}" in content:
-                content = content.replace("{zotero_title}",
-                                          zotero_data.get('title', 'N/A'))
-
-            # 著者
-            if "{zotero_authors}" in content:
-                creators = zotero_data.get('creators', [])
-                creator_names = [
-                    f"{a.get('firstName', '')} {a.get('lastName', '')}"
-                    for a in creators
-                ]
-                content = content.replace("{zotero_authors}",
-                                          ', '.join(creator_names))
-
-            # 発行年
-            if "{zotero_date}" in content:
-                content = content.replace("{zotero_date}",
-                                          zotero_data.get('date', 'N/A'))
-
-            # URL
-            if "{zotero_url}" in content:
-                content = content.replace("{zotero_url}",
-                                          zotero_data.get('url', 'N/A'))
-
-        # PDFファイル名を置換
-        if "{pdf_filename}" in content:
-            content = content.replace("{pdf_filename}", pdf_filename_with_ext)
+def link_duplicate_pdf(note_title, pdf_path, note_path=None):
+    """重複したPDFへのリンクを既存のノートに追記する
 
+    追加する位置はadd_pdf_linkと同じ。既にリンクがあれば何もしない。
+    note_pathを省略した場合はNOTE_FOLDER直下のノートとみなす。
+    """
+    note_path = note_path or os.path.join(NOTE_FOLDER, f"{note_title}.md")
+    link = f"[[{os.path.basename(pdf_path)}]]"
     try:
-        with open(note_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        print(f"Obsidianノートが作成されました: {note_path}")
+        with open(note_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if link in content:
+            return True
+
+        content = add_pdf_link(content, note_title, link)
+        write_note(note_path, content)
+        print(f"重複したPDFのリンクを追加しました: {note_path}")
     except Exception as e:
-        print(f"Obsidianノートの作成中にエラーが発生しました: {e}")
+        print(f"重複したPDFのリンク追加中にエラーが発生しました: {e}")
+        return False
+    return True
+
 
 # 使用例:
 # create_obsidian_note(
@@ -0,0 +1,124 @@
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List
+
+from .config import PDF_EXTRACTOR
+from .lazy_import import lazy_import
+
+# 各バックエンドのライブラリは実際に抽出するまでインポートしない
+PyPDF2 = lazy_import("PyPDF2")
+pdfium = lazy_import("pypdfium2")
+pdfminer_high_level = lazy_import("pdfminer.high_level")
+pdfminer_layout = lazy_import("pdfminer.layout")
+
+DEFAULT_EXTRACTOR = "pypdf2"
+
+
+class PDFExtractor(ABC):
+    """PDFからページごとの生テキストを取り出す抽出器の基底クラス"""
+
+    name = ""
+    # インストールされている必要があるモジュール名
+    required_module = ""
+
+    def is_available(self) -> bool:
+        """バックエンドのライブラリがインストールされているか確認"""
+        return importlib.util.find_spec(self.required_module) is not None
+
+    @abstractmethod
+    def iter_page_texts(self, source) -> Iterator[str]:
+        """ページごとの生テキストを順に返す
+
+        Args:
+            source: PDFファイルのパス、またはバイナリのファイルオブジェクト
+        """
+
+
+class PyPDF2Extractor(PDFExtractor):
+    """PyPDF2を使う標準の抽出器"""
+
+    name = "pypdf2"
+    required_module = "PyPDF2"
+
+    def iter_page_texts(self, source) -> Iterator[str]:
+        if isinstance(source, str):
+            with open(source, 'rb') as file:
+                yield from self._iter_reader(file)
+        else:
+            yield from self._iter_reader(source)
+
+    def _iter_reader(self, file) -> Iterator[str]:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            yield page.extract_text()
+
+
+class PdfiumExtractor(PDFExtractor):
+    """pypdfium2（PDFiumのバインディング）を使う高速な抽出器"""
+
+    name = "pypdfium2"
+    required_module = "pypdfium2"
+
+    def iter_page_texts(self, source) -> Iterator[str]:
+        document = pdfium.PdfDocument(source)
+        try:
+            for page_index in range(len(document)):
+                page = document[page_index]
+                text_page = page.get_textpage()
+                try:
+                    yield text_page.get_text_range()
+                finally:
+                    text_page.close()
+                    page.close()
+        finally:
+            document.close()
+
+
+class PdfMinerExtractor(PDFExtractor):
+    """pdfminer.sixのレイアウト解析を使う抽出器（2段組の読み順に強い）"""
+
+    name = "pdfminer"
+    required_module = "pdfminer"
+
+    def iter_page_texts(self, source) -> Iterator[str]:
+        for page_layout in pdfminer_high_level.extract_pages(source):
+            yield ''.join(
+                element.get_text() for element in page_layout
+                if isinstance(element, pdfminer_layout.LTTextContainer))
+
+
+EXTRACTORS: Dict[str, type] = {
+    extractor.name: extractor
+    for extractor in (PyPDF2Extractor, PdfiumExtractor, PdfMinerExtractor)
+}
+
+_default_extractor_name = PDF_EXTRACTOR or DEFAULT_EXTRACTOR
+
+
+def available_extractors() -> List[str]:
+    """インストール済みで利用可能なバックエンド名の一覧を取得"""
+    return [name for name, extractor in EXTRACTORS.items()
+            if extractor().is_available()]
+
+
+def set_default_extractor(name: str):
+    """このプロセスで使うデフォルトのバックエンドを設定"""
+    global _default_extractor_name
+    _default_extractor_name = name
+
+
+def get_extractor(name: str = None) -> PDFExtractor:
+    """名前からPDF抽出器を取得（未知・未インストールの場合はPyPDF2にフォールバック）"""
+    name = (name or _default_extractor_name).lower()
+    extractor_class = EXTRACTORS.get(name)
+    if extractor_class is None:
+        print(f"不明なPDF抽出バックエンド '{name}' のため、"
+              f"'{DEFAULT_EXTRACTOR}' を使用します。")
+        return PyPDF2Extractor()
+
+    extractor = extractor_class()
+    if not extractor.is_available():
+        print(f"PDF抽出バックエンド '{name}' がインストールされていないため、"
+              f"'{DEFAULT_EXTRACTOR}' を使用します。")
+        return PyPDF2Extractor()
+    return extractor
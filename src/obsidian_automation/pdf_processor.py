@@ -1,47 +1,111 @@
-import PyPDF2
-import google.generativeai as genai
+import functools
+import itertools
 import os
+from .config import (GEMINI_CHUNK_TOKENS, GEMINI_MODEL,
+                     KEYWORD_PROMPT_TOP_K, KEYWORD_TAGGER,
+                     KEYWORD_TAGGER_TOP_N, PDF_MAX_CHARS, PDF_MAX_PAGES,
+                     configure_gemini)
 from .keyword_manager import KeywordManager
-
-
-def extract_text_from_pdf(pdf_path):
-    text = ""
+from .keyword_tagger import get_keyword_tagger
+from .lazy_import import lazy_import
+from .llm_json import (build_object_schema, get_prompt_fields,
+                       get_template_llm_fields, json_generation_config,
+                       parse_llm_json)
+from .obsidian_note_creator import load_template
+from .pdf_extractors import get_extractor
+from .pdf_source import PDFSource, open_pdf
+from .prompt_cache import get_cached_model
+from .resilience import ServiceUnavailableError, call_with_retry
+from .usage_ledger import generate_content
+
+# google.generativeaiは要約ステージが実行されるまでインポートしない
+genai = lazy_import("google.generativeai", on_import=configure_gemini)
+
+
+def iter_pdf_pages(pdf_path, extractor=None, max_pages=None, max_chars=None):
+    """PDFからクリーニング済みのページテキストを1ページずつ返すジェネレータ
+
+    Args:
+        pdf_path: PDFファイルのパス、またはopen_pdf()で開いたPDFSource
+        extractor: PDF抽出バックエンド名（省略時はデフォルト）
+        max_pages: 読み込むページ数の上限（省略時は環境変数PDF_MAX_PAGES）
+        max_chars: 返す文字数の合計の上限（省略時は環境変数PDF_MAX_CHARS）
+    """
+    if max_pages is None:
+        max_pages = PDF_MAX_PAGES
+    if max_chars is None:
+        max_chars = PDF_MAX_CHARS
+
+    # パスが渡された場合はここで開き、読み終わったら閉じる
+    owned_source = None
+    if not isinstance(pdf_path, PDFSource):
+        pdf_path = owned_source = open_pdf(pdf_path)
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page_num in range(len(reader.pages)):
-                page_text = reader.pages[page_num].extract_text()
-                # 不正な文字を処理
-                if page_text:
-                    # サロゲート文字やその他の問題のある文字を除去/置換
-                    cleaned_text = clean_text(page_text)
-                    text += cleaned_text
-        return text
+        page_texts = get_extractor(extractor).iter_page_texts(pdf_path.stream())
+    except Exception:
+        if owned_source is not None:
+            owned_source.close()
+        raise
+    total_chars = 0
+    try:
+        # isliceで上限を超えるページは抽出自体を行わない
+        for page_text in itertools.islice(page_texts, max_pages):
+            # 不正な文字を処理
+            if not page_text:
+                continue
+            # サロゲート文字やその他の問題のある文字を除去/置換
+            cleaned_text = clean_text(page_text)
+            if max_chars is not None and total_chars + len(cleaned_text) >= max_chars:
+                yield cleaned_text[:max_chars - total_chars]
+                print(f"文字数の上限({max_chars})に達したため、以降のテキストを読み飛ばします。")
+                return
+            total_chars += len(cleaned_text)
+            yield cleaned_text
+    finally:
+        # 途中で打ち切った場合もPDFファイルを確実に閉じる
+        page_texts.close()
+        if owned_source is not None:
+            owned_source.close()
+
+
+def extract_text_from_pdf(pdf_path, extractor=None, max_pages=None,
+                          max_chars=None):
+    """PDFからテキストを抽出（ページごとの結果をまとめて結合する）"""
+    try:
+        # クリーニング済みのページを結合したものはそれ自体クリーニング済み
+        return CleanText(
+            ''.join(iter_pdf_pages(pdf_path, extractor, max_pages, max_chars)))
     except Exception as e:
         print(f"PDFからのテキスト抽出中にエラーが発生しました: {e}")
         return None
 
 
-def clean_text(text):
-    """テキストから不正な文字を除去し、UTF-8エンコーディング問題を解決"""
-    if not text:
-        return ""
+class CleanText(str):
+    """clean_text() 済みであることを示す文字列型
 
-    try:
-        # サロゲート文字を除去
-        text = text.encode('utf-8', errors='ignore').decode('utf-8')
+    この型の文字列は clean_text() に渡してもそのまま返され、再処理されない。
+    """
+    __slots__ = ()
 
-        # 制御文字を除去（改行とタブは保持）
-        import re
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
 
-        # 連続する空白を単一のスペースに
-        text = re.sub(r'\s+', ' ', text)
+# 除去する文字: 制御文字（改行・タブ・CRは残す）とサロゲート文字
+_REMOVE_CHARS_TABLE = dict.fromkeys(
+    [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F,
+     *range(0xD800, 0xE000)])
 
-        # 前後の空白をトリミング
-        text = text.strip()
 
+def clean_text(text):
+    """テキストから不正な文字を除去し、UTF-8エンコーディング問題を解決"""
+    if not text:
+        return CleanText("")
+    if isinstance(text, CleanText):
         return text
+
+    try:
+        # サロゲート文字と制御文字を一度に除去し、
+        # 連続する空白を単一のスペースにする（split()は前後の空白も除去する）
+        text = text.translate(_REMOVE_CHARS_TABLE)
+        return CleanText(' '.join(text.split()))
     except Exception as e:
         print(f"テキストクリーニング中にエラーが発生しました: {e}")
         # フォールバック: ASCII文字のみを保持
@@ -53,23 +117,37 @@ def clean_text(text):
 #     print(pdf_text[:500]) # 最初の500文字を表示
 
 
-def load_custom_prompt():
-    """custom_prompt.mdからテンプレートを読み込む"""
-    try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(os.path.dirname(script_dir))
-        prompt_path = os.path.join(project_root, "prompt", "custom_prompt.md")
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+def read_custom_prompt_file():
+    """custom_prompt.mdを加工せずに読み込む"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(script_dir))
+    prompt_path = os.path.join(project_root, "prompt", "custom_prompt.md")
+    with open(prompt_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
 
+def fill_keywords_section(content, paper_text=None):
+    """プロンプトの{KEYWORDS_SECTION}を既存キーワードの一覧で置き換え、クリーニングする"""
+    if '{KEYWORDS_SECTION}' in content:
         # キーワードマネージャーからキーワードセクションを取得
         keyword_manager = KeywordManager()
-        keywords_section = keyword_manager.create_keyword_prompt()
-
-        # プレースホルダーを置き換え
+        keywords_section = keyword_manager.create_keyword_prompt(
+            paper_text, top_k=KEYWORD_PROMPT_TOP_K)
         content = content.replace('{KEYWORDS_SECTION}', keywords_section)
 
-        return content
+    # プロンプトは送信前に一度だけクリーニングする
+    return clean_text(content)
+
+
+def load_custom_prompt(paper_text=None):
+    """custom_prompt.mdからテンプレートを読み込む
+
+    Args:
+        paper_text: 論文テキスト。KEYWORD_PROMPT_TOP_Kが設定されている場合、
+            キーワードセクションをこのテキストに関連する語彙に絞り込む
+    """
+    try:
+        return fill_keywords_section(read_custom_prompt_file(), paper_text)
     except Exception as e:
         print(f"custom_prompt.mdの読み込み中にエラーが発生しました: {e}")
         return None
@@ -78,7 +156,8 @@ def load_custom_prompt():
 def get_available_models():
     """利用可能なモデルを確認"""
     try:
-        models = genai.list_models()
+        models = call_with_retry(lambda: list(genai.list_models()),
+                                 service='gemini')
         available_models = []
         for model in models:
             if 'generateContent' in model.supported_generation_methods:
@@ -86,6 +165,8 @@ def get_available_models():
                 model_name = model.name.replace('models/', '')
                 available_models.append(model_name)
         return available_models
+    except ServiceUnavailableError:
+        raise
     except Exception as e:
         print(f"利用可能なモデルの取得中にエラーが発生しました: {e}")
         return []
@@ -115,155 +196,360 @@ def normalize_llm_text(markdown_text: str) -> str:
 
 def summarize_text(text, model_name="gemini-2.5-flash"):
     try:
-        # テキストを事前にクリーニング
-        if text:
-            text = clean_text(text)
+        # テキストを事前にクリーニング（クリーニング済みの場合は何もしない）
+        text = clean_text(text)
 
         if not text:
             print("クリーニング後のテキストが空です。")
             return None
 
         # まず利用可能なモデルを確認
-        available_models = get_available_models()
-
-        # モデル名を確認し、必要に応じて調整
-        if model_name not in available_models:
-            # gemini-2.5-flashが見つからない場合、代替モデルを試す
-            fallback_models = ["gemini-1.5-flash"]
-            # fallback_models = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
-            for fallback_model in fallback_models:
-                if fallback_model in available_models:
-                    print(f"モデル '{model_name}' が見つからないため、"
-                          f"'{fallback_model}' を使用します。")
-                    model_name = fallback_model
-                    break
-            else:
-                print("エラー: 利用可能なモデルが見つかりません。")
-                if available_models:
-                    print(f"利用可能なモデル: {available_models}")
-                return None
-
-        model = genai.GenerativeModel(model_name)
+        model_name = select_model_name(model_name)
+        if model_name is None:
+            return None
 
-        # custom_prompt.mdからテンプレートを読み込み
-        custom_prompt = load_custom_prompt()
+        # custom_prompt.mdからテンプレートを読み込み（クリーニング済み）
+        custom_prompt = load_custom_prompt(text)
         if not custom_prompt:
             print("custom_prompt.mdが見つからないため、デフォルトのプロンプトを使用します。")
-            prompt = f"以下のテキストを簡潔に要約してください。重要なポイントを網羅してください。\n\n{text}"
+            prompt_head = ("以下のテキストを簡潔に要約してください。"
+                           "重要なポイントを網羅してください。")
         else:
             # テンプレートを使用してプロンプトを作成
-            prompt = f"{custom_prompt}\n\n以下が要約対象のテキストです：\n\n{text}"
-
-        # プロンプトも念のためクリーニング
-        prompt = clean_text(prompt)
+            prompt_head = f"{custom_prompt} 以下が要約対象のテキストです："
+
+        # 固定部分をコンテキストキャッシュできる場合は論文本文だけを送る
+        # （キーワードセクションを論文ごとに絞り込む場合は固定部分にならない）
+        model = None
+        if not KEYWORD_PROMPT_TOP_K:
+            model = get_cached_model(genai, model_name, prompt_head)
+        if model is not None:
+            prompt = text
+        else:
+            model = genai.GenerativeModel(model_name)
+            # 両方ともクリーニング済みなので、空白1つで連結した結果もクリーニング済み
+            prompt = CleanText(f"{prompt_head} {text}")
 
-        response = model.generate_content(prompt)
+        response = generate_content(
+            model, prompt, model_name,
+            generation_config=json_generation_config(get_summary_schema()))
         response_text = response.text
 
+        # デバッグ: レスポンステキストの最初の500文字を表示
+        print(f"レスポンステキスト（最初の500文字）: {response_text[:500]}")
+
         # JSON形式のレスポンスを解析
-        try:
-            import json
-            import re
-            
-            # デバッグ: レスポンステキストの最初の500文字を表示
-            print(f"レスポンステキスト（最初の500文字）: {response_text[:500]}")
-            
-            # JSONブロックを抽出（```json と ``` で囲まれた部分）
-            json_pattern = r'```json\s*\n(.*?)\n```'
-            json_match = re.search(json_pattern, response_text, re.DOTALL)
-            
-            if json_match:
-                json_text = json_match.group(1)
-                print(f"JSONブロックを抽出: {json_text[:200]}...")
-            else:
-                # JSONブロックが見つからない場合は、全体をJSONとして解析を試行
-                json_text = response_text.strip()
-                print("JSONブロックが見つからないため、全体をJSONとして解析を試行")
-            
-            # JSONを解析してフィールドを取得
-            json_data = json.loads(json_text)
-            
-            # すべてのフィールドを自動抽出して正規化
-            result = {}
-            for field, value in json_data.items():
-                if value:
-                    result[field] = normalize_llm_text(value) if isinstance(value, str) else value
-                else:
-                    result[field] = ''
-            
-            print(f"JSON解析成功 - 抽出フィールド数: {len([k for k, v in result.items() if v])}")
-            print(f"抽出されたフィールド: {list(result.keys())}")
-            
-            # キーワード処理
-            if result.get('keyword'):
-                keyword_manager = KeywordManager()
-                processed_keywords = keyword_manager.process_generated_keywords(result['keyword'])
-                if processed_keywords:
-                    # キーワードを改行区切りの#付き形式に整形
-                    result['keyword'] = '\n> '.join([f'#{kw}' for kw in processed_keywords])
-                    print(f"処理済みキーワード: {result['keyword']}")
-            
-            return result
-        except json.JSONDecodeError as e:
-            # JSON解析に失敗した場合のロバスト処理
-            import re, json
-            print(f"JSON解析に失敗しました: {e}")
+        json_data = parse_llm_json(response_text)
+        if not isinstance(json_data, dict):
+            print("JSON解析に失敗しました")
             print(f"レスポンステキスト全体: {response_text}")
+            return None
 
-            # コードフェンスを剥がしてテキストを取得
-            fence_pattern = r"```json\s*\n(.*?)\n```"
-            fence_match = re.search(fence_pattern, response_text, re.DOTALL)
-            raw = fence_match.group(1) if fence_match else response_text
-
-            # 無効なバックスラッシュを二重化してJSONとして再試行
-            def escape_invalid_backslashes(s: str) -> str:
-                # 有効なエスケープ(\n, \t, \/, \", \\)以外の \x を \\x に置換
-                return re.sub(r"\\(?![\\\"nt/])", r"\\\\", s)
-
-            fixed = escape_invalid_backslashes(raw)
-            try:
-                data = json.loads(fixed)
-                result = {}
-                
-                # すべてのフィールドを自動抽出して正規化
-                for field, value in data.items():
-                    if value:
-                        result[field] = normalize_llm_text(value) if isinstance(value, str) else value
-                    else:
-                        result[field] = ''
-                
-                # キーワード処理
-                if result.get('keyword'):
-                    keyword_manager = KeywordManager()
-                    processed_keywords = keyword_manager.process_generated_keywords(result['keyword'])
-                    if processed_keywords:
-                        result['keyword'] = '\n> '.join([f'#{kw}' for kw in processed_keywords])
-                
-                return result
-            except Exception as e2:
-                print(f"修正後のJSON解析にも失敗: {e2}")
-                # 最後のフォールバック: 正規表現で各フィールドを抜き出す
-                result = {}
-                
-                # JSONから全フィールド名を抽出
-                field_pattern = r'"(\w+)"\s*:\s*"([\s\S]*?)"\s*(,|})'
-                matches = re.findall(field_pattern, raw)
-                
-                for field, value, _ in matches:
-                    result[field] = normalize_llm_text(value)
-                
-                # キーワード処理
-                if result.get('keyword'):
-                    keyword_manager = KeywordManager()
-                    processed_keywords = keyword_manager.process_generated_keywords(result['keyword'])
-                    if processed_keywords:
-                        result['keyword'] = '\n> '.join([f'#{kw}' for kw in processed_keywords])
-                
-                return result
+        return build_summary_result(json_data, text)
+    except ServiceUnavailableError:
+        # 再試行しても回復しない一時的な障害は呼び出し元に伝える
+        # （空の要約でノートを作ると、そのPDFは以降スキップされてしまうため）
+        raise
     except Exception as e:
         print(f"テキストの要約中にエラーが発生しました: {e}")
         return None
 
+
+def select_model_name(model_name):
+    """利用可能なモデルを確認し、使用するモデル名を決める（見つからない場合はNone）"""
+    available_models = get_available_models()
+
+    # モデル名を確認し、必要に応じて調整
+    if model_name in available_models:
+        return model_name
+    # gemini-2.5-flashが見つからない場合、代替モデルを試す
+    # （軽量モデルなど別のモデルを指定した場合は、まず通常のモデルを試す）
+    fallback_models = [GEMINI_MODEL, "gemini-1.5-flash"]
+    # fallback_models = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
+    for fallback_model in fallback_models:
+        if fallback_model != model_name and fallback_model in available_models:
+            print(f"モデル '{model_name}' が見つからないため、"
+                  f"'{fallback_model}' を使用します。")
+            return fallback_model
+    print("エラー: 利用可能なモデルが見つかりません。")
+    if available_models:
+        print(f"利用可能なモデル: {available_models}")
+    return None
+
+
+def summarize_fields(text, prompt_head, fields, model_name="gemini-2.5-flash"):
+    """
+    指定したフィールドだけを要約させる（既存ノートのフィールド再生成用）
+
+    Args:
+        text: 論文テキスト
+        prompt_head: 指定したフィールドだけを含むプロンプト（クリーニング済み）
+        fields: 出力させるフィールド名のリスト
+
+    Returns:
+        フィールド名 -> 値（build_summary_resultで正規化済み）。失敗した場合はNone
+    """
+    try:
+        text = clean_text(text)
+        if not text:
+            print("クリーニング後のテキストが空です。")
+            return None
+        model_name = select_model_name(model_name)
+        if model_name is None:
+            return None
+
+        model = genai.GenerativeModel(model_name)
+        response = generate_content(
+            model, CleanText(f"{prompt_head} {text}"), model_name, kind='fields',
+            generation_config=json_generation_config(build_object_schema(fields)))
+        json_data = parse_llm_json(response.text)
+        if not isinstance(json_data, dict):
+            print("JSON解析に失敗しました")
+            return None
+        # 指定していないフィールドが返ってきても使わない
+        # 論文テキストはkeywordを作り直す場合のみ渡す（渡すとローカルのタガーでkeywordが追加される）
+        return build_summary_result(
+            {field: json_data.get(field, '') for field in fields},
+            text if 'keyword' in fields else None)
+    except ServiceUnavailableError:
+        raise
+    except Exception as e:
+        print(f"フィールドの再生成中にエラーが発生しました: {e}")
+        return None
+
+
+# 長い論文を分割して要約するときに、各部分から要点を抜き出させる指示
+CHUNK_INSTRUCTION = (
+    "以下は長い論文の一部です。後で論文全体を要約するために、この部分に含まれる"
+    "課題・主張・手法・実験設定・結果・アブレーション・重要な用語を漏らさず簡潔に抜き出してください。"
+    "この部分に含まれない内容は書かないでください。")
+
+
+def split_text_chunks(text, chunk_chars):
+    """テキストをchunk_chars文字以下の部分に分ける（できるだけ文の区切りで分ける）"""
+    chunks = []
+    while len(text) > chunk_chars:
+        cut = text.rfind('. ', 0, chunk_chars)
+        if cut < chunk_chars // 2:
+            cut = text.rfind(' ', 0, chunk_chars)
+        if cut < chunk_chars // 2:
+            cut = chunk_chars - 1
+        chunks.append(text[:cut + 1].strip())
+        text = text[cut + 1:]
+    if text.strip():
+        chunks.append(text.strip())
+    return chunks
+
+
+def summarize_chunked(text, model_name="gemini-2.5-flash", chunk_tokens=None):
+    """
+    長い論文を分割し、部分ごとに要点を抜き出してから、要点をまとめて要約する
+
+    Args:
+        text: 論文テキスト
+        chunk_tokens: 1つの部分の推定トークン数（省略時は環境変数GEMINI_CHUNK_TOKENS）
+
+    Returns:
+        summarize_textと同じ要約データ。失敗した場合はNone
+    """
+    try:
+        text = clean_text(text)
+        if not text:
+            print("クリーニング後のテキストが空です。")
+            return None
+        model_name = select_model_name(model_name)
+        if model_name is None:
+            return None
+
+        # 1トークン約4文字として部分の文字数を決める
+        chunks = split_text_chunks(text, (chunk_tokens or GEMINI_CHUNK_TOKENS) * 4)
+        print(f"長い論文のため{len(chunks)}個に分割して要約します。")
+        model = genai.GenerativeModel(model_name)
+        digests = []
+        for index, chunk in enumerate(chunks, 1):
+            response = generate_content(
+                model, CleanText(f"{CHUNK_INSTRUCTION} ({index}/{len(chunks)}) {chunk}"),
+                model_name, kind='chunk')
+            if response.text:
+                digests.append(response.text)
+        if not digests:
+            print("分割した部分から要点を抜き出せませんでした。")
+            return None
+        # 抜き出した要点を1つのテキストとして通常どおり要約する
+        return summarize_text(' '.join(digests), model_name)
+    except ServiceUnavailableError:
+        raise
+    except Exception as e:
+        print(f"長い論文の分割要約中にエラーが発生しました: {e}")
+        return None
+
+
+# 複数の論文を1回のリクエストで要約するときにプロンプトの後ろに付ける指示
+PACK_INSTRUCTION = (
+    "以下には複数の論文が <paper id=\"...\"> と </paper> で区切られて含まれています。"
+    "各論文を独立に上記の指示どおりに要約し、論文ごとに1つのオブジェクトを持つJSON配列を返してください。"
+    "各オブジェクトの\"id\"には対応する論文のidをそのまま入れてください。")
+
+
+def build_pack_schema(object_schema=None):
+    """論文ごとの要約オブジェクト（idフィールド付き）の配列のresponse_schemaを作成"""
+    properties = {"id": {"type": "string"}}
+    required = ["id"]
+    if object_schema:
+        properties.update(object_schema["properties"])
+        required += object_schema["required"]
+    return {
+        "type": "array",
+        "items": {"type": "object", "properties": properties, "required": required},
+    }
+
+
+def is_valid_pack_entry(entry, fields):
+    """まとめて要約した結果の1件が使えるか（必須フィールドがすべて文字列で、空でない値があるか）"""
+    if not isinstance(entry, dict) or not isinstance(entry.get('id'), str):
+        return False
+    if any(not isinstance(entry.get(field), str) for field in fields):
+        return False
+    return any(value for key, value in entry.items() if key != 'id')
+
+
+def summarize_packed(texts, model_name="gemini-2.5-flash"):
+    """
+    複数の短い論文を1回のリクエストでまとめて要約する
+
+    Args:
+        texts: 論文の識別子 -> 論文テキスト
+
+    Returns:
+        識別子 -> 要約データ（build_summary_resultで正規化済み）。
+        検証に通らなかった論文や、リクエスト自体が失敗した場合はNone（1本ずつ要約し直す）
+    """
+    results = {paper_id: None for paper_id in texts}
+    try:
+        texts = {paper_id: clean_text(text) for paper_id, text in texts.items() if text}
+        if not texts:
+            return results
+        model_name = select_model_name(model_name)
+        if model_name is None:
+            return results
+
+        # キーワードセクションを絞り込む場合は、まとめた論文すべてのテキストに関連する語彙を使う
+        custom_prompt = load_custom_prompt(' '.join(texts.values()))
+        if not custom_prompt:
+            custom_prompt = "各論文を簡潔に要約してください。重要なポイントを網羅してください。"
+        prompt_head = f"{custom_prompt} {PACK_INSTRUCTION}"
+        papers = ' '.join(f'<paper id="{paper_id}"> {text} </paper>'
+                          for paper_id, text in texts.items())
+
+        model = None
+        if not KEYWORD_PROMPT_TOP_K:
+            model = get_cached_model(genai, model_name, prompt_head)
+        if model is not None:
+            prompt = papers
+        else:
+            model = genai.GenerativeModel(model_name)
+            prompt = f"{prompt_head} {papers}"
+
+        object_schema = get_summary_schema()
+        fields = object_schema["required"] if object_schema else []
+        response = generate_content(
+            model, prompt, model_name, kind='pack',
+            generation_config=json_generation_config(build_pack_schema(object_schema)))
+        json_data = parse_llm_json(response.text)
+        if not isinstance(json_data, list):
+            print("まとめた要約をJSON配列として解析できませんでした。1本ずつ要約します。")
+            return results
+
+        for entry in json_data:
+            paper_id = entry.get('id') if isinstance(entry, dict) else None
+            if paper_id not in texts or results[paper_id] is not None:
+                continue
+            if not is_valid_pack_entry(entry, fields):
+                print(f"まとめた要約のうち '{paper_id}' の結果が不完全なため、1本ずつ要約します。")
+                continue
+            summary = {key: value for key, value in entry.items() if key != 'id'}
+            results[paper_id] = build_summary_result(summary, texts[paper_id])
+        return results
+    except Exception as e:
+        # レート制限を含め、まとめたリクエストの失敗は1本ずつの要約に任せる
+        print(f"複数の論文をまとめた要約中にエラーが発生しました: {e}")
+        return results
+
+
+def get_summary_schema():
+    """テンプレートで使われているフィールドから要約のresponse_schemaを作成"""
+    template_content = load_template()
+    if not template_content:
+        return None
+    return _summary_schema_for_template(template_content, tuple(get_custom_prompt_fields()))
+
+
+def get_custom_prompt_fields():
+    """custom_prompt.mdで出力を指示しているフィールド名（読み込めない場合は空）"""
+    try:
+        return get_prompt_fields(read_custom_prompt_file())
+    except Exception as e:
+        print(f"カスタムプロンプトのフィールドの読み込み中にエラーが発生しました: {e}")
+        return []
+
+
+@functools.lru_cache(maxsize=4)
+def _summary_schema_for_template(template_content, prompt_fields=()):
+    return build_object_schema(get_template_llm_fields(template_content, prompt_fields))
+
+
+def build_summary_result(json_data, paper_text=None):
+    """解析済みのJSONから要約データを作成（正規化とキーワード処理）"""
+    # すべてのフィールドを自動抽出して正規化
+    result = {}
+    for field, value in json_data.items():
+        if value:
+            result[field] = normalize_llm_text(value) if isinstance(value, str) else value
+        else:
+            result[field] = ''
+
+    print(f"JSON解析成功 - 抽出フィールド数: {len([k for k, v in result.items() if v])}")
+    print(f"抽出されたフィールド: {list(result.keys())}")
+
+    # キーワード処理
+    if result.get('keyword'):
+        offline_keywords = None
+        if KEYWORD_TAGGER == 'merge' and paper_text:
+            offline_keywords = get_keyword_tagger().tag_keywords(
+                paper_text, KEYWORD_TAGGER_TOP_N)
+        keyword_manager = KeywordManager()
+        processed_keywords = keyword_manager.process_generated_keywords(
+            result['keyword'], offline_keywords,
+            max_added=KEYWORD_TAGGER_TOP_N if offline_keywords else 0)
+        if processed_keywords:
+            # キーワードを改行区切りの#付き形式に整形
+            result['keyword'] = format_keywords(processed_keywords)
+            print(f"処理済みキーワード: {result['keyword']}")
+    elif paper_text:
+        # LLMがキーワードを返さなかった場合はローカルのタガーで付与する
+        result['keyword'] = tag_keywords_offline(paper_text)
+
+    return result
+
+
+def format_keywords(keywords):
+    """キーワードをノートのコールアウト内の改行区切りの#付き形式に整形"""
+    return '\n> '.join([f'#{kw}' for kw in keywords])
+
+
+def tag_keywords_offline(text):
+    """LLMを使わずに語彙とのマッチングでキーワードを付与（整形済み、付与できない場合は空文字）"""
+    if KEYWORD_TAGGER == 'off' or not text:
+        return ''
+    try:
+        keywords = get_keyword_tagger().tag_keywords(text, KEYWORD_TAGGER_TOP_N)
+        if keywords:
+            print(f"ローカルのタガーでキーワードを付与しました: {keywords}")
+        return format_keywords(keywords)
+    except Exception as e:
+        print(f"ローカルのキーワード付与中にエラーが発生しました: {e}")
+        return ''
+
 # 使用例:
 # long_text = "ここに非常に長いテキストが入ります..."
 # summary = summarize_text(long_text)
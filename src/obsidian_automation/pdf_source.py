@@ -0,0 +1,121 @@
+# pdf_source.py
+# PDFファイルを開く層。ファイルを1回だけメモリマップし、重複検出のSHA-256と
+# テキスト抽出の両方に同じマッピングを渡す（ファイルの内容を2回読み込まない）。
+# 抽出器にはマッピングを読むファイルオブジェクトを渡すため、読まれなかったページは
+# ディスク（同期フォルダ）から読み込まれない。
+import hashlib
+import io
+import mmap
+import os
+
+from .config import PDF_MMAP
+
+# メモリマップしない場合にハッシュを計算するときの読み込み単位
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class _MappedStream(io.RawIOBase):
+    """メモリマップをコピーせずに読むための読み取り専用ファイルオブジェクト"""
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, offset)
+        return self._position
+
+    def readinto(self, buffer):
+        size = min(len(buffer), max(0, len(self._view) - self._position))
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            # memoryviewを解放しないとメモリマップを閉じられない
+            self._view.release()
+        super().close()
+
+
+class PDFSource:
+    def __init__(self, pdf_path: str, use_mmap: bool = None):
+        """
+        1つのPDFファイルへのアクセスを共有するクラス（最初に読むときに開く）
+
+        Args:
+            pdf_path: PDFファイルのパス
+            use_mmap: メモリマップを使うか（省略時は環境変数PDF_MMAP）
+        """
+        self.path = pdf_path
+        self.use_mmap = PDF_MMAP if use_mmap is None else use_mmap
+        self._file = None
+        self._mapping = None
+        self._streams = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open(self):
+        if self._file is not None:
+            return
+        self._file = open(self.path, 'rb')
+        # 空のファイルはメモリマップできないため、通常のファイルとして読む
+        if self.use_mmap and os.fstat(self._file.fileno()).st_size > 0:
+            self._mapping = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def stream(self):
+        """抽出器に渡すバイナリのファイルオブジェクト（先頭から読む）"""
+        self._open()
+        if self._mapping is None:
+            self._file.seek(0)
+            return self._file
+        stream = _MappedStream(self._mapping)
+        self._streams.append(stream)
+        return stream
+
+    def sha256(self) -> str:
+        """ファイル内容のSHA-256を計算（メモリマップをそのままハッシュに渡す）"""
+        self._open()
+        if self._mapping is not None:
+            return hashlib.sha256(self._mapping).hexdigest()
+        digest = hashlib.sha256()
+        self._file.seek(0)
+        for chunk in iter(lambda: self._file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        self._file.seek(0)
+        return digest.hexdigest()
+
+    def close(self):
+        """ファイルとメモリマップを閉じる"""
+        for stream in self._streams:
+            stream.close()
+        self._streams = []
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_pdf(pdf_path: str) -> PDFSource:
+    """PDFを開く（with文で使い、ハッシュと抽出で同じPDFSourceを共有する）"""
+    return PDFSource(pdf_path)
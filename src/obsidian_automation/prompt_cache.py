@@ -0,0 +1,112 @@
+# prompt_cache.py
+# プロンプトの固定部分（custom_prompt.md + キーワードセクション）を
+# Geminiのコンテキストキャッシュで再利用する。
+# バッチの最初にキャッシュを1回作成し、以降は論文本文だけを送る。
+# プロンプトファイルや語彙が変わると固定部分のハッシュが変わり、作り直される。
+import datetime
+import hashlib
+import threading
+import time
+
+from .config import GEMINI_CACHE_TTL, GEMINI_CONTEXT_CACHE
+
+# 有効期限の直前に期限切れになったキャッシュを参照しないための余裕（秒）
+EXPIRY_MARGIN_SECONDS = 60
+
+_enabled = GEMINI_CONTEXT_CACHE
+_lock = threading.Lock()
+# モデル名 -> {'key': 固定部分のハッシュ, 'cache': CachedContent or None, 'expires': 時刻}
+_caches = {}
+
+
+def set_context_cache_enabled(enabled: bool):
+    """このプロセスでコンテキストキャッシュを使うかを設定"""
+    global _enabled
+    _enabled = enabled
+
+
+def is_context_cache_enabled() -> bool:
+    return _enabled
+
+
+def prefix_key(model_name: str, prefix: str) -> str:
+    """モデル名と固定部分からキャッシュのキーを作成"""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(prefix.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_cached_model(genai, model_name, prefix, ttl_seconds=None):
+    """固定部分をキャッシュしたGenerativeModelを取得
+
+    同じモデル・同じ固定部分のキャッシュが有効期限内であれば再利用する。
+    固定部分が変わった場合は古いキャッシュを削除して作り直す。
+
+    Returns:
+        キャッシュを参照するGenerativeModel。無効化されている場合や
+        作成に失敗した場合（トークン数が最小値未満など）はNone
+    """
+    if not _enabled or not prefix:
+        return None
+
+    ttl_seconds = ttl_seconds or GEMINI_CACHE_TTL
+    key = prefix_key(model_name, prefix)
+    with _lock:
+        entry = _caches.get(model_name)
+        if entry and entry['key'] == key and time.monotonic() < entry['expires']:
+            cached = entry['cache']
+        else:
+            if entry and entry['key'] != key:
+                print("プロンプトの固定部分が変更されたため、"
+                      "コンテキストキャッシュを作り直します。")
+            _delete_cache(entry)
+            cached = _create_cache(genai, model_name, prefix, ttl_seconds)
+            # 作成に失敗した場合も記録し、同じ固定部分では再試行しない
+            _caches[model_name] = {
+                'key': key,
+                'cache': cached,
+                'expires': (time.monotonic() + ttl_seconds
+                            - EXPIRY_MARGIN_SECONDS),
+            }
+    if cached is None:
+        return None
+
+    try:
+        return genai.GenerativeModel.from_cached_content(cached_content=cached)
+    except Exception as e:
+        print(f"キャッシュからのモデル作成中にエラーが発生しました: {e}")
+        return None
+
+
+def release_context_caches():
+    """作成したコンテキストキャッシュをすべて削除（バッチの終了時に呼ぶ）"""
+    with _lock:
+        for entry in _caches.values():
+            _delete_cache(entry)
+        _caches.clear()
+
+
+def _create_cache(genai, model_name, prefix, ttl_seconds):
+    try:
+        cached = genai.caching.CachedContent.create(
+            model=f"models/{model_name}",
+            contents=[prefix],
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        )
+        print(f"コンテキストキャッシュを作成しました: {cached.name}")
+        return cached
+    except Exception as e:
+        print(f"コンテキストキャッシュの作成に失敗したため、"
+              f"通常のリクエストで要約します: {e}")
+        return None
+
+
+def _delete_cache(entry):
+    if not entry or entry['cache'] is None:
+        return
+    try:
+        entry['cache'].delete()
+    except Exception as e:
+        print(f"コンテキストキャッシュの削除中にエラーが発生しました: {e}")
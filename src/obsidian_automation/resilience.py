@@ -0,0 +1,302 @@
+# resilience.py
+# GeminiとZoteroの呼び出しを一時的なエラー（429・5xx・通信エラー）から守る共通の仕組み。
+# 指数バックオフ＋ジッターで再試行し、サーバーが指定した待ち時間（Retry-After、
+# ZoteroのBackoffヘッダー、GeminiのRetryInfo）があればそれ以上待つ。
+# 失敗が続いた場合はサービスごとのサーキットブレーカーが開き、並列に動いている
+# すべてのワーカーを一時停止させる（キューを失敗で消費しないように）。
+import email.utils
+import random
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+from .config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_MAX_PAUSE,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+)
+
+# 再試行するHTTPステータスコード
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# ステータスコードを持たないが一時的とみなす例外のクラス名
+# （google.api_core・pyzotero・httpx・requestsの例外を、インポートせずに判定する）
+RETRYABLE_ERROR_NAMES = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable',
+    'InternalServerError', 'DeadlineExceeded', 'GatewayTimeout',
+    'TooManyRequestsError', 'TooManyRetriesError', 'CouldNotReachURLError',
+    'ConnectError', 'ConnectTimeout', 'ReadTimeout', 'RemoteProtocolError',
+    'ConnectionError', 'Timeout',
+}
+
+_RETRY_IN_PATTERN = re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE)
+_RETRY_DELAY_PATTERN = re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)')
+
+
+class ServiceUnavailableError(Exception):
+    """再試行しても成功しなかった、またはサービスが停止中のため呼び出さなかったことを表す例外"""
+
+    def __init__(self, service: str, message: str):
+        super().__init__(f"{service}: {message}")
+        self.service = service
+
+
+def get_status_code(error: BaseException) -> Optional[int]:
+    """例外からHTTPステータスコードを取得（google.api_coreのcode、レスポンスのstatus_code）"""
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    for candidate in (error, error.__cause__):
+        response = getattr(candidate, 'response', None)
+        status_code = getattr(response, 'status_code', None)
+        if isinstance(status_code, int):
+            return status_code
+    return None
+
+
+def _parse_seconds(value) -> Optional[float]:
+    """ヘッダーの値（秒数またはHTTP日付）を秒数に変換"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(str(value))
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """サーバーが指定した待ち時間（秒）を例外から取得。指定がなければNone"""
+    for candidate in (error, error.__cause__):
+        response = getattr(candidate, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if headers:
+            for header in ('Retry-After', 'Backoff'):
+                seconds = _parse_seconds(headers.get(header))
+                if seconds is not None:
+                    return seconds
+
+    # GeminiのRetryInfo（detailsの要素またはメッセージ中の表記）
+    for detail in getattr(error, 'details', None) or ():
+        retry_delay = getattr(detail, 'retry_delay', None)
+        if retry_delay is not None:
+            return getattr(retry_delay, 'seconds', 0) + getattr(retry_delay, 'nanos', 0) / 1e9
+    message = str(error)
+    match = _RETRY_IN_PATTERN.search(message) or _RETRY_DELAY_PATTERN.search(message)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """再試行で回復する見込みのある一時的なエラーかどうか"""
+    if isinstance(error, ServiceUnavailableError):
+        return False
+    status_code = get_status_code(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def backoff_delay(attempt: int, base_delay: float = None, max_delay: float = None,
+                  rng: random.Random = None) -> float:
+    """attempt回目（0始まり）の再試行までの待ち時間（フルジッター付き指数バックオフ）"""
+    base_delay = RETRY_BASE_DELAY if base_delay is None else base_delay
+    max_delay = RETRY_MAX_DELAY if max_delay is None else max_delay
+    return (rng or random).uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, service: str, failure_threshold: int = None,
+                 base_pause: float = None, max_pause: float = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        サービスごとのサーキットブレーカー
+
+        一時的なエラーがfailure_threshold回続くとbase_pause秒（サーバーの指定が
+        長ければその時間）サービスを一時停止し、その間は呼び出し側（すべてのワーカー）を
+        待たせる。停止明けは1件だけ試し、失敗すれば停止時間を倍にする。
+        停止時間がmax_pauseを超える場合（1日の上限に達した場合など）は、
+        以降の呼び出しをすぐにServiceUnavailableErrorで打ち切る。
+
+        Args:
+            service: サービス名（ログ表示用）
+            failure_threshold: 一時停止するまでの連続失敗回数
+            base_pause: 最初の一時停止の長さ（秒、省略時は環境変数RETRY_MAX_DELAY）
+            max_pause: 待つ時間の上限（秒）
+        """
+        self.service = service
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.base_pause = RETRY_MAX_DELAY if base_pause is None else base_pause
+        self.max_pause = CIRCUIT_MAX_PAUSE if max_pause is None else max_pause
+        self._clock = clock
+        self._sleep = sleep
+        self._condition = threading.Condition()
+        self.consecutive_failures = 0
+        self.pause_count = 0
+        self.paused_until = 0.0
+        self.tripped = False
+        self._probing = False
+        self._next_pause = None
+        # 統計（ベンチマーク・ログ用）
+        self.retries = 0
+        self.pauses = 0
+
+    def remaining_pause(self) -> float:
+        """一時停止の残り時間（秒）"""
+        return max(0.0, self.paused_until - self._clock())
+
+    def before_call(self):
+        """呼び出し前に、一時停止中なら明けるまで待つ（停止明けの試行は1件ずつ）"""
+        with self._condition:
+            while True:
+                if self.tripped:
+                    raise ServiceUnavailableError(
+                        self.service,
+                        "待ち時間が上限を超えたため、この実行では呼び出しを中止しました")
+                remaining = self.paused_until - self._clock()
+                if remaining > 0:
+                    # 待つ間はロックを手放す（他のワーカーも同じ時刻まで待つ）
+                    self._condition.release()
+                    try:
+                        self._sleep(remaining)
+                    finally:
+                        self._condition.acquire()
+                    continue
+                if self.pause_count and self._probing:
+                    # 停止明けの試行の結果を待つ
+                    self._condition.wait(timeout=1.0)
+                    continue
+                if self.pause_count:
+                    self._probing = True
+                return
+
+    def record_success(self):
+        """呼び出しの成功を記録（一時停止の状態を解除する）"""
+        with self._condition:
+            self.consecutive_failures = 0
+            self.pause_count = 0
+            self._next_pause = None
+            self._probing = False
+            self._condition.notify_all()
+
+    def record_failure(self, retry_after: float = None):
+        """一時的なエラーを記録し、必要ならサービスを一時停止する"""
+        with self._condition:
+            self.consecutive_failures += 1
+            probe_failed = self._probing
+            self._probing = False
+            if retry_after is not None and retry_after > self.max_pause:
+                self._trip(retry_after)
+            elif self.remaining_pause() > 0:
+                # 停止前に送られていた並列のリクエストの失敗
+                # （停止時間は倍にせず、サーバーの指定が長い場合のみ延ばす）
+                if retry_after:
+                    self._pause_locked(retry_after)
+            elif probe_failed or self.consecutive_failures >= self.failure_threshold:
+                pause = max(self._next_pause or self.base_pause, retry_after or 0.0)
+                if pause > self.max_pause:
+                    self._trip(pause)
+                else:
+                    self._pause_locked(pause)
+                    self._next_pause = pause * 2
+            self._condition.notify_all()
+
+    def pause(self, seconds: float):
+        """サーバーから待つよう指示された場合（ZoteroのBackoffヘッダーなど）に一時停止する"""
+        with self._condition:
+            if seconds > self.max_pause:
+                self._trip(seconds)
+            elif seconds > 0:
+                self._pause_locked(seconds)
+
+    def _pause_locked(self, seconds: float):
+        until = self._clock() + seconds
+        if until > self.paused_until:
+            self.paused_until = until
+            self.pause_count += 1
+            self.pauses += 1
+            print(f"{self.service}: 一時的なエラーが続いたため、{seconds:.1f}秒間すべての"
+                  f"リクエストを停止します。")
+
+    def _trip(self, seconds: float):
+        if not self.tripped:
+            print(f"{self.service}: サーバーの待ち時間（{seconds:.0f}秒）が上限"
+                  f"（{self.max_pause:.0f}秒）を超えるため、この実行では以降の呼び出しを中止します。")
+        self.tripped = True
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(service: str) -> CircuitBreaker:
+    """サービス名ごとのサーキットブレーカーを取得（プロセス内で共有）"""
+    with _breakers_lock:
+        breaker = _breakers.get(service)
+        if breaker is None:
+            breaker = CircuitBreaker(service)
+            _breakers[service] = breaker
+        return breaker
+
+
+def reset_circuit_breakers():
+    """すべてのサーキットブレーカーを破棄（バッチの開始時・テスト用）"""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def call_with_retry(func: Callable, *args, service: str = 'gemini',
+                    max_attempts: int = None, breaker: CircuitBreaker = None,
+                    sleep: Callable[[float], None] = time.sleep, **kwargs):
+    """
+    一時的なエラーの場合は再試行しながらfuncを呼び出す
+
+    Args:
+        func: 呼び出す関数（残りの引数はそのまま渡す）
+        service: サーキットブレーカーを共有するサービス名
+        max_attempts: 最大試行回数（省略時は環境変数RETRY_MAX_ATTEMPTS）
+        breaker: 使用するサーキットブレーカー（省略時はserviceのもの）
+
+    Returns:
+        funcの戻り値
+
+    Raises:
+        ServiceUnavailableError: 再試行しても成功しなかった、またはサービスが停止中
+        一時的でないエラーはそのまま送出する
+    """
+    breaker = breaker or get_circuit_breaker(service)
+    max_attempts = max_attempts or RETRY_MAX_ATTEMPTS
+    for attempt in range(max_attempts):
+        breaker.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                # サービス自体は応答しているため、一時停止の状態は解除する
+                breaker.record_success()
+                raise
+            retry_after = get_retry_after(e)
+            breaker.record_failure(retry_after)
+            if attempt + 1 >= max_attempts:
+                raise ServiceUnavailableError(
+                    service, f"{max_attempts}回試行しても成功しませんでした: {e}") from e
+            delay = max(backoff_delay(attempt), retry_after or 0.0)
+            print(f"{service}: 一時的なエラーのため{delay:.1f}秒後に再試行します"
+                  f"（{attempt + 1}/{max_attempts}）: {e}")
+            breaker.retries += 1
+            # サーキットブレーカーが停止中ならbefore_callで待つため、ここでは待たない
+            if not breaker.remaining_pause() and not breaker.tripped:
+                sleep(delay)
+            continue
+        breaker.record_success()
+        return result
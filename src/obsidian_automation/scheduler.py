@@ -0,0 +1,229 @@
+# scheduler.py
+# バッチで処理するPDFの順序と、1回の実行で処理する量を決める。
+# 新しい順・ページ数の少ない順・優先リスト順などで並べ、
+# 論文数と推定トークン数の上限に収まる分だけを選ぶ（残りは次回の実行に回す）。
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .config import (
+    MAX_PAPERS_PER_RUN,
+    MAX_TOKENS_PER_RUN,
+    PDF_MAX_CHARS,
+    PDF_MAX_PAGES,
+    SCHEDULE_ORDER,
+    SCHEDULE_PRIORITY_FILE,
+)
+from .pdf_extractors import PyPDF2
+from .usage_ledger import get_remaining_quota
+
+# name: ファイル名順 / newest: 更新日時の新しい順 / oldest: 古い順
+# smallest: ページ数の少ない順 / priority: 優先リストの順（リストにないものは新しい順）
+SCHEDULE_ORDERS = ("name", "newest", "oldest", "smallest", "priority")
+DEFAULT_SCHEDULE_ORDER = "newest"
+
+# トークン数の見積もりに使う目安（論文1ページあたり約3000文字、1トークン約4文字）
+ESTIMATED_TOKENS_PER_PAGE = 800
+CHARS_PER_TOKEN = 4
+# カスタムプロンプトとキーワードセクション、出力の分
+ESTIMATED_PROMPT_TOKENS = 3000
+# ページ数を取得できなかったPDFのページ数の見積もり
+DEFAULT_PAGE_ESTIMATE = 20
+
+
+def count_pdf_pages(pdf_path: str) -> Optional[int]:
+    """PDFのページ数を取得（テキストは抽出しない）。読めない場合はNone"""
+    try:
+        with open(pdf_path, 'rb') as f:
+            return len(PyPDF2.PdfReader(f).pages)
+    except Exception as e:
+        print(f"{pdf_path} のページ数の取得中にエラーが発生しました: {e}")
+        return None
+
+
+def estimate_pdf_tokens(pages: Optional[int]) -> int:
+    """ページ数から1本の論文の要約に使う入力トークン数を見積もる
+
+    環境変数PDF_MAX_PAGES・PDF_MAX_CHARSで抽出量を制限している場合はその上限で打ち切る。
+    """
+    if pages is None:
+        pages = DEFAULT_PAGE_ESTIMATE
+    if PDF_MAX_PAGES is not None:
+        pages = min(pages, PDF_MAX_PAGES)
+    text_tokens = pages * ESTIMATED_TOKENS_PER_PAGE
+    if PDF_MAX_CHARS is not None:
+        text_tokens = min(text_tokens, PDF_MAX_CHARS // CHARS_PER_TOKEN)
+    return text_tokens + ESTIMATED_PROMPT_TOKENS
+
+
+def estimate_text_tokens(text: str) -> int:
+    """抽出済みのテキストから1本の論文の要約に使うトークン数を見積もる"""
+    return len(text or '') // CHARS_PER_TOKEN + ESTIMATED_PROMPT_TOKENS
+
+
+def clamp_to_daily_quota(max_papers: int = None,
+                         max_tokens: int = None) -> Tuple[Optional[int], Optional[int]]:
+    """論文数とトークン数の上限を、Geminiの1日の上限の今日の残りに収まるように狭める
+
+    要約は1本につき1リクエストとして数える（まとめて要約する場合は実際より少なく見積もる）。
+    """
+    remaining = get_remaining_quota()
+    if remaining['requests'] is not None:
+        max_papers = (remaining['requests'] if max_papers is None
+                      else min(max_papers, remaining['requests']))
+    if remaining['tokens'] is not None:
+        max_tokens = (remaining['tokens'] if max_tokens is None
+                      else min(max_tokens, remaining['tokens']))
+    return max_papers, max_tokens
+
+
+def load_priority_list(priority_file: str) -> List[str]:
+    """優先リストを読み込む（1行に1つのPDFファイル名。拡張子は省略可、#以降はコメント）"""
+    priority = []
+    try:
+        with open(priority_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                name = line.split('#', 1)[0].strip()
+                if not name:
+                    continue
+                name = os.path.basename(name)
+                if name.lower().endswith('.pdf'):
+                    name = name[:-len('.pdf')]
+                if name not in priority:
+                    priority.append(name)
+    except Exception as e:
+        print(f"優先リスト {priority_file} の読み込み中にエラーが発生しました: {e}")
+    return priority
+
+
+def count_pages_parallel(pdf_paths: List[str], workers: int = 1) -> Dict[str, Optional[int]]:
+    """複数のPDFのページ数をまとめて取得"""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return dict(zip(pdf_paths, executor.map(count_pdf_pages, pdf_paths), strict=True))
+
+
+def _pdf_name(pdf_path: str) -> str:
+    return os.path.splitext(os.path.basename(pdf_path))[0]
+
+
+def _mtime(pdf_path: str) -> float:
+    try:
+        return os.stat(pdf_path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def order_pdfs(pdf_paths: List[str], order: str = DEFAULT_SCHEDULE_ORDER,
+               priority: List[str] = None,
+               page_counts: Dict[str, Optional[int]] = None) -> List[str]:
+    """
+    PDFを処理する順に並べる
+
+    Args:
+        pdf_paths: PDFファイルのパス
+        order: SCHEDULE_ORDERSのいずれか
+        priority: orderがpriorityの場合の優先リスト（拡張子なしのファイル名）
+        page_counts: orderがsmallestの場合のページ数（パス -> ページ数）
+
+    Returns:
+        並べ替えたPDFファイルのパス
+    """
+    by_name = sorted(pdf_paths, key=lambda path: os.path.basename(path))
+    if order == "name":
+        return by_name
+    if order == "oldest":
+        return sorted(by_name, key=_mtime)
+    if order == "smallest":
+        page_counts = page_counts or {}
+        # ページ数が分からないPDFは最後に回す
+        return sorted(by_name, key=lambda path: (
+            page_counts.get(path) is None, page_counts.get(path) or 0))
+
+    newest = sorted(by_name, key=_mtime, reverse=True)
+    if order != "priority":
+        return newest
+    rank = {name: i for i, name in enumerate(priority or [])}
+    return sorted(newest, key=lambda path: rank.get(_pdf_name(path), len(rank)))
+
+
+def select_within_budget(pdf_paths: List[str], max_papers: int = None,
+                         max_tokens: int = None,
+                         token_estimates: Dict[str, int] = None) -> Tuple[List[str], List[str]]:
+    """
+    並べた順に、論文数と推定トークン数の上限に収まるPDFを選ぶ
+
+    上限を超える論文は飛ばして後ろの論文で残りの予算を使う（順序は保つ）。
+    1本で上限を超える論文は選ばれない。
+
+    Returns:
+        (今回処理するPDF, 次回以降に回すPDF)
+    """
+    selected = []
+    deferred = []
+    used_tokens = 0
+    for pdf_path in pdf_paths:
+        if max_papers is not None and len(selected) >= max_papers:
+            deferred.append(pdf_path)
+            continue
+        if max_tokens is not None:
+            tokens = (token_estimates or {}).get(pdf_path, estimate_pdf_tokens(None))
+            if used_tokens + tokens > max_tokens:
+                deferred.append(pdf_path)
+                continue
+            used_tokens += tokens
+        selected.append(pdf_path)
+    return selected, deferred
+
+
+def schedule_pdfs(pdf_paths: List[str], order: str = None,
+                  priority_file: str = None, max_papers: int = None,
+                  max_tokens: int = None, workers: int = 1) -> Tuple[List[str], List[str]]:
+    """
+    処理対象のPDFを並べ、今回の実行で処理する分を選ぶ
+
+    省略した引数は環境変数（SCHEDULE_ORDER, SCHEDULE_PRIORITY_FILE,
+    MAX_PAPERS_PER_RUN, MAX_TOKENS_PER_RUN）の値を使う。
+    Geminiの1日の上限を設定している場合は、今日の残りに収まる分だけを選ぶ。
+    ページ数はsmallestの並べ替えとトークン数の上限を使う場合のみ取得する。
+
+    Returns:
+        (今回処理するPDF, 次回以降に回すPDF)
+    """
+    order = (order or SCHEDULE_ORDER or DEFAULT_SCHEDULE_ORDER).lower()
+    if order not in SCHEDULE_ORDERS:
+        print(f"不明な処理順 '{order}' のため、'{DEFAULT_SCHEDULE_ORDER}' を使用します。")
+        order = DEFAULT_SCHEDULE_ORDER
+    priority_file = priority_file or SCHEDULE_PRIORITY_FILE
+    max_papers = max_papers if max_papers is not None else MAX_PAPERS_PER_RUN
+    max_tokens = max_tokens if max_tokens is not None else MAX_TOKENS_PER_RUN
+    # 1日の上限（GEMINI_DAILY_TOKEN_LIMIT・GEMINI_DAILY_REQUEST_LIMIT）の残りも超えない
+    max_papers, max_tokens = clamp_to_daily_quota(max_papers, max_tokens)
+
+    priority = None
+    if order == "priority":
+        if priority_file:
+            priority = load_priority_list(priority_file)
+        else:
+            print("優先リストが指定されていないため、新しい順に処理します。")
+
+    page_counts = None
+    if pdf_paths and (order == "smallest" or max_tokens is not None):
+        page_counts = count_pages_parallel(pdf_paths, workers)
+
+    ordered = order_pdfs(pdf_paths, order, priority, page_counts)
+    token_estimates = None
+    if max_tokens is not None:
+        token_estimates = {path: estimate_pdf_tokens(page_counts.get(path))
+                           for path in ordered}
+    selected, deferred = select_within_budget(ordered, max_papers, max_tokens,
+                                              token_estimates)
+
+    print(f"処理順: {order}")
+    if deferred:
+        estimated = ""
+        if token_estimates is not None:
+            estimated = (f"、推定入力トークン数: "
+                         f"{sum(token_estimates[path] for path in selected)}")
+        print(f"今回の実行で処理するPDF: {len(selected)}件{estimated}"
+              f"（上限を超えた {len(deferred)}件は次回以降に処理します）")
+    return selected, deferred
@@ -0,0 +1,90 @@
+# summary_packer.py
+# 短い論文（ワークショップ論文・短いプレプリント）を1回のGeminiリクエストにまとめて要約する。
+# 短い論文ではトークン数よりもリクエストごとのオーバーヘッドとRPMの上限が律速になるため、
+# 要約の前に短い論文のテキストを抽出し、数本ずつまとめて要約しておく。
+# まとめた要約で検証に通らなかった論文は、main.process_pdfで通常どおり1本ずつ要約する。
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .config import SUMMARY_PACK_MAX_TOKENS, SUMMARY_PACK_SIZE
+from .pdf_processor import extract_text_from_pdf, summarize_packed
+from .scheduler import CHARS_PER_TOKEN, ESTIMATED_TOKENS_PER_PAGE, count_pages_parallel
+from .usage_ledger import usage_paper
+
+
+def group_packs(pdf_paths: List[str], pack_size: int) -> List[List[str]]:
+    """PDFをpack_size本ずつのグループに分ける（1本だけのグループはまとめる意味がないため除く）"""
+    packs = [pdf_paths[start:start + pack_size]
+             for start in range(0, len(pdf_paths), pack_size)]
+    return [pack for pack in packs if len(pack) > 1]
+
+
+def _summarize_pack(pack: List[str], texts: Dict[str, str]) -> Dict[str, Optional[Dict]]:
+    # 識別子にはファイル名ではなく連番を使う（引用符などを含むファイル名でも崩れないように）
+    paper_ids = {f"paper{index}": pdf_path for index, pdf_path in enumerate(pack, 1)}
+    names = [os.path.splitext(os.path.basename(pdf_path))[0] for pdf_path in pack]
+    with usage_paper(', '.join(names)):
+        summaries = summarize_packed({paper_id: texts[pdf_path]
+                                      for paper_id, pdf_path in paper_ids.items()})
+    return {pdf_path: summaries.get(paper_id) for paper_id, pdf_path in paper_ids.items()}
+
+
+def prepare_packed_summaries(pdf_paths: List[str], workers: int = 1, fingerprints=None,
+                             max_tokens: int = None, pack_size: int = None) -> Dict[str, Dict]:
+    """
+    短い論文を抽出し、まとめて要約しておく
+
+    Args:
+        pdf_paths: これから処理するPDFのパス
+        workers: ページ数の取得・抽出・要約を並列に行う数
+        fingerprints: 重複検出に使うFingerprintStore（既知の重複はまとめない）
+        max_tokens: まとめる対象にする論文の推定トークン数の上限
+            （省略時は環境変数SUMMARY_PACK_MAX_TOKENS）
+        pack_size: 1回のリクエストにまとめる論文数（省略時は環境変数SUMMARY_PACK_SIZE）
+
+    Returns:
+        PDFのパス -> {'text': 抽出したテキスト, 'summary': 要約データ or None}
+        （summaryがNoneの論文は1本ずつ要約する）
+    """
+    max_tokens = max_tokens or SUMMARY_PACK_MAX_TOKENS
+    pack_size = pack_size or SUMMARY_PACK_SIZE
+    if pack_size < 2 or len(pdf_paths) < 2:
+        return {}
+    workers = max(1, workers)
+
+    # ページ数から明らかに長い論文を除き、残りだけを抽出する
+    page_counts = count_pages_parallel(pdf_paths, workers)
+    candidates = [pdf_path for pdf_path in pdf_paths
+                  if page_counts.get(pdf_path) is not None
+                  and page_counts[pdf_path] * ESTIMATED_TOKENS_PER_PAGE <= max_tokens * 2]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        texts = dict(zip(candidates, executor.map(extract_text_from_pdf, candidates),
+                         strict=True))
+
+    prepared = {pdf_path: {'text': text, 'summary': None}
+                for pdf_path, text in texts.items() if text}
+    short_papers = []
+    for pdf_path, entry in prepared.items():
+        if len(entry['text']) // CHARS_PER_TOKEN > max_tokens:
+            continue
+        # 既存のノートと重複しているPDFは要約しないため、まとめる対象にしない
+        if fingerprints is not None and fingerprints.find_duplicate(
+                fingerprints.fingerprint(pdf_path, entry['text']),
+                exclude=os.path.splitext(os.path.basename(pdf_path))[0]):
+            continue
+        short_papers.append(pdf_path)
+
+    packs = group_packs(short_papers, pack_size)
+    if not packs:
+        return prepared
+    print(f"短い論文{sum(len(pack) for pack in packs)}本を"
+          f"{len(packs)}回のリクエストにまとめて要約します。")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for summaries in executor.map(lambda pack: _summarize_pack(pack, texts), packs):
+            for pdf_path, summary in summaries.items():
+                prepared[pdf_path]['summary'] = summary
+
+    packed_count = sum(1 for entry in prepared.values() if entry['summary'])
+    print(f"まとめた要約: {packed_count}本（残りは1本ずつ要約します）")
+    return prepared
@@ -0,0 +1,65 @@
+# text_cache.py
+# PDFから抽出したクリーニング済みテキストをDATA_DIR/text_cacheにgzipで保存する。
+# ノートの一部のフィールドを作り直すときに、PDFを開いて抽出し直さずに済む。
+# キャッシュはPDFより新しい場合のみ使う（PDFを差し替えた場合は抽出し直す）。
+import gzip
+import os
+from typing import Optional
+
+from .config import DATA_DIR, TEXT_CACHE
+from .pdf_processor import CleanText, extract_text_from_pdf
+
+TEXT_CACHE_DIR_NAME = "text_cache"
+
+
+def get_cache_path(pdf_path: str) -> str:
+    """PDFに対応するキャッシュファイルのパス（ノート名と同じファイル名）"""
+    note_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(DATA_DIR, TEXT_CACHE_DIR_NAME, f"{note_name}.txt.gz")
+
+
+def save_cached_text(pdf_path: str, text: str) -> bool:
+    """抽出したテキストを保存（環境変数TEXT_CACHEで無効化できる）"""
+    if not TEXT_CACHE or not text:
+        return False
+    cache_path = get_cache_path(pdf_path)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.tmp"
+        with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            f.write(text)
+        os.replace(temp_path, cache_path)
+        return True
+    except Exception as e:
+        print(f"抽出テキストのキャッシュ保存中にエラーが発生しました: {e}")
+        return False
+
+
+def load_cached_text(pdf_path: str) -> Optional[CleanText]:
+    """保存済みのテキストを読み込む（キャッシュがない・PDFの方が新しい場合はNone）"""
+    cache_path = get_cache_path(pdf_path)
+    try:
+        if not os.path.exists(cache_path):
+            return None
+        if (os.path.exists(pdf_path)
+                and os.path.getmtime(pdf_path) > os.path.getmtime(cache_path)):
+            return None
+        with gzip.open(cache_path, 'rt', encoding='utf-8') as f:
+            # 保存したのはクリーニング済みのテキスト
+            return CleanText(f.read())
+    except Exception as e:
+        print(f"抽出テキストのキャッシュ読み込み中にエラーが発生しました: {e}")
+        return None
+
+
+def get_paper_text(pdf_path: str) -> Optional[CleanText]:
+    """キャッシュがあればそれを、なければPDFから抽出して保存したテキストを返す"""
+    text = load_cached_text(pdf_path)
+    if text:
+        return text
+    if not pdf_path or not os.path.exists(pdf_path):
+        return None
+    text = extract_text_from_pdf(pdf_path)
+    if text:
+        save_cached_text(pdf_path, text)
+    return text
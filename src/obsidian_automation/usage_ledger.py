@@ -0,0 +1,210 @@
+# usage_ledger.py
+# Geminiの呼び出しごとのトークン使用量をDATA_DIR/gemini_usage.jsonlに1行ずつ記録する。
+# （入力・出力・キャッシュから読んだトークン数、モデル、所要時間、論文、モデルの選択ルート）
+# 実行の終わりに今回の使用量を表示し、1日の上限（GEMINI_DAILY_TOKEN_LIMIT・
+# GEMINI_DAILY_REQUEST_LIMIT）に近づいたら新しい論文の要約を始めないようにする。
+import datetime
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .config import (
+    DATA_DIR,
+    GEMINI_DAILY_REQUEST_LIMIT,
+    GEMINI_DAILY_TOKEN_LIMIT,
+    GEMINI_QUOTA_TIMEZONE,
+    GEMINI_USAGE_LEDGER,
+)
+from .resilience import call_with_retry
+
+LEDGER_FILE_NAME = "gemini_usage.jsonl"
+USAGE_FIELDS = ('requests', 'input_tokens', 'output_tokens', 'cached_tokens')
+
+_lock = threading.Lock()
+# 今回の実行の使用量（合計とモデルごと）
+_run_usage = {'total': dict.fromkeys(USAGE_FIELDS, 0), 'models': {}}
+# 今日（GEMINI_QUOTA_TIMEZONEの日付）の使用量。最初に参照したときに台帳から集計する
+_today_usage = None
+# 呼び出し元の論文名とルート（スレッドごと。並列に処理している論文を取り違えないように）
+_context = threading.local()
+
+
+def get_ledger_path() -> str:
+    return os.path.join(DATA_DIR, LEDGER_FILE_NAME)
+
+
+def quota_date(now: datetime.datetime = None) -> str:
+    """1日の上限を数える日付（Geminiの無料枠は太平洋時間の0時にリセットされる）"""
+    try:
+        tz = ZoneInfo(GEMINI_QUOTA_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        # タイムゾーンのデータがない環境ではローカルの日付を使う
+        tz = None
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return now.astimezone(tz).date().isoformat()
+
+
+@contextmanager
+def _context_value(name: str, value):
+    previous = getattr(_context, name, None)
+    setattr(_context, name, value)
+    try:
+        yield
+    finally:
+        setattr(_context, name, previous)
+
+
+def usage_paper(paper: str):
+    """このブロック内のGeminiの呼び出しを指定した論文の使用量として記録する"""
+    return _context_value('paper', paper)
+
+
+def usage_route(route: str):
+    """このブロック内のGeminiの呼び出しに、モデルを選んだルート（model_router.ROUTES）を記録する"""
+    return _context_value('route', route)
+
+
+def _token_count(usage_metadata, name: str) -> int:
+    try:
+        return int(getattr(usage_metadata, name, 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _load_today_usage(date: str) -> Dict[str, int]:
+    """台帳から指定した日付の使用量を集計（台帳がない・読めない行は無視する）"""
+    usage = dict.fromkeys(USAGE_FIELDS, 0)
+    try:
+        with open(get_ledger_path(), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(entry, dict) or entry.get('date') != date:
+                    continue
+                usage['requests'] += 1
+                for field in USAGE_FIELDS[1:]:
+                    usage[field] += int(entry.get(field) or 0)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Geminiの使用量の台帳の読み込み中にエラーが発生しました: {e}")
+    usage['date'] = date
+    return usage
+
+
+def _today_locked(date: str) -> Dict[str, int]:
+    global _today_usage
+    if _today_usage is None or _today_usage['date'] != date:
+        _today_usage = _load_today_usage(date)
+    return _today_usage
+
+
+def record_usage(response, model_name: str, latency: float,
+                 kind: str = 'summary', paper: str = None) -> Optional[Dict]:
+    """
+    1回の呼び出しの使用量を集計し、台帳に追記する
+
+    Args:
+        response: generate_contentのレスポンス（usage_metadataを読む）
+        model_name: 呼び出したモデル
+        latency: 再試行を含めた所要時間（秒）
+        kind: 呼び出しの種類（summary / pack / fields / keywords）
+        paper: 論文名（省略時はusage_paperで指定した論文）
+
+    Returns:
+        記録した内容（usage_metadataがない場合はNone）
+    """
+    usage_metadata = getattr(response, 'usage_metadata', None)
+    if usage_metadata is None:
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    # prompt_token_countはキャッシュから読んだ分を含む
+    entry = {
+        'timestamp': now.isoformat(timespec='seconds'),
+        'date': quota_date(now),
+        'model': model_name,
+        'kind': kind,
+        'paper': paper or getattr(_context, 'paper', None),
+        'route': getattr(_context, 'route', None),
+        'input_tokens': _token_count(usage_metadata, 'prompt_token_count'),
+        'output_tokens': _token_count(usage_metadata, 'candidates_token_count'),
+        'cached_tokens': _token_count(usage_metadata, 'cached_content_token_count'),
+        'latency': round(latency, 3),
+    }
+    with _lock:
+        model_usage = _run_usage['models'].setdefault(
+            model_name, dict.fromkeys(USAGE_FIELDS, 0))
+        today = _today_locked(entry['date'])
+        for usage in (_run_usage['total'], model_usage, today):
+            usage['requests'] += 1
+            for field in USAGE_FIELDS[1:]:
+                usage[field] += entry[field]
+        # モデルの選択に使うため、モデルごとの所要時間も集計する
+        model_usage['latency'] = model_usage.get('latency', 0.0) + latency
+        if GEMINI_USAGE_LEDGER:
+            try:
+                os.makedirs(DATA_DIR, exist_ok=True)
+                with open(get_ledger_path(), 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            except Exception as e:
+                print(f"Geminiの使用量の台帳への書き込み中にエラーが発生しました: {e}")
+    return entry
+
+
+def generate_content(model, prompt, model_name: str, kind: str = 'summary', **kwargs):
+    """call_with_retryでmodel.generate_contentを呼び出し、使用量を記録する"""
+    start = time.perf_counter()
+    response = call_with_retry(model.generate_content, prompt, service='gemini', **kwargs)
+    record_usage(response, model_name, time.perf_counter() - start, kind)
+    return response
+
+
+def get_run_usage() -> Dict:
+    """今回の実行の使用量（'total'とモデルごとの'models'。モデルごとには所要時間の合計'latency'も含む）"""
+    with _lock:
+        return {'total': dict(_run_usage['total']),
+                'models': {name: dict(usage)
+                           for name, usage in _run_usage['models'].items()}}
+
+
+def get_today_usage() -> Dict[str, int]:
+    """今日の使用量（以前の実行の分を含む）"""
+    with _lock:
+        return dict(_today_locked(quota_date()))
+
+
+def reset_run_usage():
+    """今回の実行の使用量をリセットし、今日の使用量を台帳から読み直す（実行の開始時・テスト用）"""
+    global _today_usage
+    with _lock:
+        _run_usage['total'] = dict.fromkeys(USAGE_FIELDS, 0)
+        _run_usage['models'] = {}
+        _today_usage = None
+
+
+def get_remaining_quota() -> Dict[str, Optional[int]]:
+    """今日の残りのトークン数とリクエスト数（上限を設定していない場合はNone）"""
+    today = get_today_usage()
+    remaining = {'tokens': None, 'requests': None}
+    if GEMINI_DAILY_TOKEN_LIMIT is not None:
+        used = today['input_tokens'] + today['output_tokens']
+        remaining['tokens'] = max(0, GEMINI_DAILY_TOKEN_LIMIT - used)
+    if GEMINI_DAILY_REQUEST_LIMIT is not None:
+        remaining['requests'] = max(0, GEMINI_DAILY_REQUEST_LIMIT - today['requests'])
+    return remaining
+
+
+def has_daily_quota(estimated_tokens: int = 0) -> bool:
+    """推定トークン数の要約を1回行っても今日の上限を超えないか"""
+    remaining = get_remaining_quota()
+    if remaining['tokens'] is not None and remaining['tokens'] < max(1, estimated_tokens):
+        return False
+    if remaining['requests'] is not None and remaining['requests'] < 1:
+        return False
+    return True
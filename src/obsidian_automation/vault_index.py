@@ -0,0 +1,282 @@
+# vault_index.py
+# Dataviewのダッシュボード用に、Vault内の論文ノートのメタデータ
+# （フロントマター・評価・コメントの1行目・タグ）をまとめたJSONを管理する。
+# ダッシュボードはこのJSONを1回読むだけで済み、ノートを1つずつ開く必要がない。
+# 更新時は更新日時とサイズが変わったノートだけを読み直す。
+# インデックスはノートのルート（NOTE_FOLDERとNOTE_FOLDERSの各フォルダ）ごとに作り、
+# キーと'path'はそのルートからの相対パスにする。
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .config import NOTE_FOLDER, NOTE_FOLDERS, VAULT_INDEX_FILE
+from .file_scanner import merge_roots, scan_files
+
+INDEX_FILE_NAME = "paper_index.json"
+INDEX_VERSION = 1
+COMMENTS_HEADING = "# Comments"
+
+_TAG_PATTERN = re.compile(r'(?<![\w#/&])#([A-Za-z][A-Za-z0-9_\-/]*)')
+_index_lock = threading.Lock()
+
+
+def get_index_path(note_folder: str) -> str:
+    """インデックスJSONのパスを取得（ノートフォルダ直下。NOTE_FOLDERは環境変数VAULT_INDEX_FILEを優先）"""
+    if VAULT_INDEX_FILE and (not NOTE_FOLDER or _same_path(note_folder, NOTE_FOLDER)):
+        return VAULT_INDEX_FILE
+    return os.path.join(note_folder, INDEX_FILE_NAME)
+
+
+def _same_path(path_a: str, path_b: str) -> bool:
+    return os.path.abspath(path_a) == os.path.abspath(path_b)
+
+
+def _is_under(path: str, root: str) -> bool:
+    root = os.path.abspath(root)
+    return os.path.commonpath([os.path.abspath(path), root]) == root
+
+
+def find_note_root(note_path: str, roots: List[str]) -> Optional[str]:
+    """ノートを含むルートを取得（ルートが入れ子の場合は先に指定したルート、どれにも含まれなければNone）"""
+    for root in roots:
+        if _is_under(note_path, root):
+            return root
+    return None
+
+
+def parse_frontmatter(content: str) -> Dict:
+    """ノート先頭のYAMLフロントマターを解析（文字列・数値・リストのみ対応）"""
+    if not content.startswith('---'):
+        return {}
+    end = content.find('\n---', 3)
+    if end == -1:
+        return {}
+
+    frontmatter = {}
+    current_key = None
+    for line in content[3:end].splitlines():
+        if not line.strip():
+            continue
+        stripped = line.strip()
+        if stripped.startswith('- ') and current_key:
+            # 直前のキーに続くリスト項目
+            if not isinstance(frontmatter[current_key], list):
+                frontmatter[current_key] = []
+            item = _parse_scalar(stripped[2:])
+            if item != '':
+                frontmatter[current_key].append(item)
+            continue
+        if ':' not in line or line.startswith(' '):
+            continue
+        key, value = line.split(':', 1)
+        current_key = key.strip()
+        frontmatter[current_key] = _parse_scalar(value.strip())
+    return frontmatter
+
+
+def _parse_scalar(value: str):
+    """YAMLのスカラー値を文字列または整数に変換"""
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        return value[1:-1]
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def first_section_line(content: str, heading: str = COMMENTS_HEADING) -> str:
+    """指定した見出しのセクションにある最初の空でない行を取得"""
+    in_section = False
+    for line in content.splitlines():
+        if line.startswith(heading):
+            in_section = True
+            continue
+        if in_section:
+            if line.startswith('# '):
+                break
+            if line.strip():
+                return line.strip()
+    return ''
+
+
+def extract_tags(content: str) -> List[str]:
+    """本文中の#タグを出現順に重複なく取得"""
+    tags = []
+    for tag in _TAG_PATTERN.findall(content):
+        if tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def build_note_entry(note_folder: str, note_path: str, content: str = None) -> Dict:
+    """1つのノートのインデックスエントリを作成"""
+    stat = os.stat(note_path)
+    if content is None:
+        with open(note_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+    frontmatter = parse_frontmatter(content)
+    rating = frontmatter.get('rating', 0)
+    name = os.path.splitext(os.path.basename(note_path))[0]
+    return {
+        'name': name,
+        'path': os.path.relpath(note_path, note_folder).replace(os.sep, '/'),
+        'title': frontmatter.get('title') or name,
+        'rating': rating if isinstance(rating, int) else 0,
+        'comment': first_section_line(content),
+        'tags': extract_tags(content),
+        'frontmatter': frontmatter,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+    }
+
+
+def load_vault_index(index_path: str) -> Dict:
+    """インデックスJSONを読み込む（存在しない・形式が古い場合は空のインデックス）"""
+    try:
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                return index
+    except Exception as e:
+        print(f"インデックスファイルの読み込み中にエラーが発生しました: {e}")
+    return {'version': INDEX_VERSION, 'notes': {}}
+
+
+def save_vault_index(index: Dict, index_path: str):
+    """インデックスJSONを一時ファイル経由で書き込む（ダッシュボードが書きかけを読まないように）"""
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, index_path)
+
+
+def _iter_note_paths(note_folder: str) -> Iterable[str]:
+    return scan_files([note_folder], '.md')
+
+
+def update_vault_index(note_folder: str = None, note_paths: List[str] = None) -> Dict:
+    """
+    インデックスを更新して保存する
+
+    Args:
+        note_folder: ノートフォルダ（省略時は環境変数NOTE_FOLDER）
+        note_paths: 書き込んだノートのパス。指定した場合はそのノートだけを読み直す。
+            省略時はVault全体を走査し、更新日時かサイズが変わったノートだけを読み直す
+
+    Returns:
+        更新後のインデックス
+    """
+    note_folder = note_folder or NOTE_FOLDER
+    if not note_folder or not os.path.isdir(note_folder):
+        print(f"ノートフォルダ '{note_folder}' が見つからないため、インデックスを更新しません。")
+        return {}
+
+    index_path = get_index_path(note_folder)
+    with _index_lock:
+        index = load_vault_index(index_path)
+        notes = index['notes']
+        reparsed = 0
+
+        if note_paths is not None:
+            for note_path in note_paths:
+                key = os.path.relpath(note_path, note_folder).replace(os.sep, '/')
+                if not os.path.exists(note_path):
+                    notes.pop(key, None)
+                    continue
+                try:
+                    notes[key] = build_note_entry(note_folder, note_path)
+                    reparsed += 1
+                except Exception as e:
+                    print(f"ノート {key} のインデックス作成中にエラーが発生しました: {e}")
+        else:
+            seen = set()
+            for note_path in _iter_note_paths(note_folder):
+                key = os.path.relpath(note_path, note_folder).replace(os.sep, '/')
+                seen.add(key)
+                entry = notes.get(key)
+                stat = os.stat(note_path)
+                if (entry and entry.get('mtime_ns') == stat.st_mtime_ns
+                        and entry.get('size') == stat.st_size):
+                    continue
+                try:
+                    notes[key] = build_note_entry(note_folder, note_path)
+                    reparsed += 1
+                except Exception as e:
+                    print(f"ノート {key} のインデックス作成中にエラーが発生しました: {e}")
+            for key in set(notes) - seen:
+                del notes[key]
+
+        try:
+            save_vault_index(index, index_path)
+        except Exception as e:
+            print(f"インデックスファイルの保存中にエラーが発生しました: {e}")
+            return index
+
+    print(f"インデックスを更新しました: {len(notes)}件（読み直し: {reparsed}件）")
+    return index
+
+
+def update_vault_indexes(note_paths: List[str] = None,
+                         roots: List[str] = None) -> Dict[str, Dict]:
+    """
+    ノートのルートごとにインデックスを更新して保存する
+
+    Args:
+        note_paths: 書き込んだノートのパス。指定した場合はそれぞれのルートのインデックスで
+            そのノートだけを読み直す。省略時は各ルート全体を走査する
+        roots: ノートのルート（省略時はNOTE_FOLDERとNOTE_FOLDERS）
+
+    Returns:
+        ルート -> 更新後のインデックス
+    """
+    if roots is None:
+        roots = merge_roots(NOTE_FOLDER, NOTE_FOLDERS)
+
+    if note_paths is None:
+        # 他のルートの中にあるルートは、外側のルートの走査に含まれる
+        targets = {root: None for index, root in enumerate(roots)
+                   if find_note_root(root, roots[:index]) is None}
+    else:
+        targets = {}
+        for note_path in note_paths:
+            root = find_note_root(note_path, roots)
+            if root is None:
+                print(f"ノート {note_path} はノートフォルダの外にあるため、"
+                      f"インデックスに追加しません。")
+                continue
+            targets.setdefault(root, []).append(note_path)
+
+    indexes = {}
+    for root, paths in targets.items():
+        index = update_vault_index(root, paths)
+        if index:
+            indexes[root] = index
+    return indexes
+
+
+def main(argv=None):
+    """単体実行用のメイン関数: Vault全体のインデックスを更新"""
+    parser = argparse.ArgumentParser(
+        description='ダッシュボード用の論文メタデータインデックスを更新する')
+    parser.add_argument('--note-folder', default=None,
+                        help='ノートフォルダ'
+                             '（デフォルト: 環境変数NOTE_FOLDERとNOTE_FOLDERSの各フォルダ）')
+    args = parser.parse_args(argv)
+
+    if args.note_folder:
+        updated = update_vault_index(args.note_folder)
+    else:
+        updated = update_vault_indexes()
+    if not updated:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
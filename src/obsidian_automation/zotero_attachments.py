@@ -0,0 +1,133 @@
+# zotero_attachments.py
+# Zoteroの添付ファイル（PDF）のパス・ファイル名 -> 親アイテムのキーの索引。
+# ZotMoovはZoteroの添付ファイルそのものをPDF_FOLDERに移動するため、PDFのパスや
+# ファイル名から添付ファイルを特定できれば、タイトル検索をせずに親アイテムが分かる。
+# Web APIの場合はライブラリのバージョンと一緒にDATA_DIRに保存し、次回は差分だけを取得する。
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+ATTACHMENT_INDEX_FILE_NAME = "zotero_attachments.json"
+# Zoteroの「リンクファイルの基準フォルダ」からの相対パスの接頭辞
+RELATIVE_PATH_PREFIX = "attachments:"
+
+
+def _name_key(path: str) -> str:
+    """ファイル名で照合するためのキー（大文字小文字は区別しない）"""
+    # "attachments:sub/file.pdf"（基準フォルダからの相対パス）のような形式も扱う
+    if path.startswith(RELATIVE_PATH_PREFIX):
+        path = path[len(RELATIVE_PATH_PREFIX):]
+    return path.replace('\\', '/').rsplit('/', 1)[-1].strip().lower()
+
+
+def _path_key(path: str) -> str:
+    """パスで照合するためのキー"""
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
+
+
+class AttachmentIndex:
+    def __init__(self, index_file: str = None):
+        """
+        添付ファイルの索引を管理するクラス
+
+        Args:
+            index_file: 保存先のJSONファイル（Noneの場合は保存しない）
+        """
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self.version = 0
+        # 添付ファイルのキー -> {'parent': 親アイテムのキー, 'path'/'filename': ...}
+        self.attachments: Dict[str, Dict] = {}
+        self._load()
+        self._rebuild()
+
+    def _load(self):
+        if not self.index_file or not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.version = int(data.get('version', 0))
+            self.attachments = dict(data.get('attachments', {}))
+        except Exception as e:
+            print(f"添付ファイルの索引の読み込み中にエラーが発生しました: {e}")
+            self.version = 0
+            self.attachments = {}
+
+    def save(self) -> bool:
+        """索引を保存（index_fileを指定した場合のみ）"""
+        if not self.index_file:
+            return False
+        with self._lock:
+            data = {'version': self.version, 'attachments': self.attachments}
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            temp_path = f"{self.index_file}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_file)
+            return True
+        except Exception as e:
+            print(f"添付ファイルの索引の保存中にエラーが発生しました: {e}")
+            return False
+
+    def _rebuild(self):
+        """ファイル名とパスから親アイテムを引く辞書を作り直す"""
+        by_name = {}
+        by_path = {}
+        for entry in self.attachments.values():
+            parent = entry.get('parent')
+            if not parent:
+                continue
+            for value in (entry.get('path'), entry.get('filename')):
+                if not value:
+                    continue
+                by_name.setdefault(_name_key(value), set()).add(parent)
+                if os.path.isabs(value):
+                    by_path[_path_key(value)] = parent
+        self._by_name = by_name
+        self._by_path = by_path
+
+    def update(self, attachments: Iterable[Dict], deleted_keys: Iterable[str] = (),
+               version: int = None):
+        """
+        添付アイテムを追加・更新する
+
+        Args:
+            attachments: 添付アイテムのdata（key・parentItem・path/filenameを使う）
+            deleted_keys: 削除されたアイテムのキー
+            version: 取得時点のライブラリのバージョン
+        """
+        with self._lock:
+            for data in attachments:
+                key = data.get('key')
+                if not key:
+                    continue
+                self.attachments[key] = {
+                    field: value for field, value in (
+                        ('parent', data.get('parentItem')), ('path', data.get('path')),
+                        ('filename', data.get('filename'))) if value}
+            for key in deleted_keys:
+                self.attachments.pop(key, None)
+            if version is not None:
+                self.version = version
+            self._rebuild()
+
+    def find_parent(self, pdf_path: str) -> Optional[str]:
+        """
+        PDFに対応する添付ファイルの親アイテムのキーを取得
+
+        リンクファイルのパスが一致するものを優先し、なければファイル名で照合する。
+        同じファイル名の添付ファイルが別々の論文にある場合は特定できないためNone。
+        """
+        parent = self._by_path.get(_path_key(pdf_path))
+        if parent:
+            return parent
+        parents = self._by_name.get(_name_key(pdf_path), set())
+        if len(parents) == 1:
+            return next(iter(parents))
+        if parents:
+            print(f"同じファイル名の添付ファイルが{len(parents)}件あるため、"
+                  f"添付ファイルからは特定できません: {os.path.basename(pdf_path)}")
+        return None
@@ -1,6 +1,25 @@
-from pyzotero import zotero
-from .config import ZOTERO_USER_ID, ZOTERO_API_KEY
+from .config import (ZOTERO_USER_ID, ZOTERO_API_KEY, ZOTERO_BACKEND,
+                     ZOTERO_ATTACHMENT_LOOKUP, DATA_DIR)
+from .lazy_import import lazy_import
+from .resilience import (ServiceUnavailableError, call_with_retry,
+                         get_circuit_breaker)
+from .zotero_attachments import ATTACHMENT_INDEX_FILE_NAME, AttachmentIndex
+from .zotero_local import get_local_library
+from .zotero_record import attach_record
+import os
 import re
+import threading
+import time
+
+# pyzoteroはZoteroステージが実行されるまでインポートしない
+zotero = lazy_import("pyzotero.zotero")
+
+# pyzoteroのクライアントはスレッドセーフではないため、スレッドごとに1つを使い回す
+_clients = threading.local()
+
+# 添付ファイルの索引（最初に使うときに1回だけ作る）
+_attachment_index = None
+_attachment_index_lock = threading.Lock()
 
 
 def normalize_filename(filename):
@@ -16,14 +35,131 @@ def normalize_filename(filename):
     return normalized
 
 
-def get_zotero_item_info(file_name_without_ext):
-    z = zotero.Zotero(ZOTERO_USER_ID, 'user', ZOTERO_API_KEY)
+def get_zotero_client():
+    """このスレッドのZoteroクライアントを取得（設定が変わった場合は作り直す）"""
+    key = (zotero, ZOTERO_USER_ID, ZOTERO_API_KEY)
+    if getattr(_clients, 'key', None) != key:
+        _clients.client = zotero.Zotero(ZOTERO_USER_ID, 'user', ZOTERO_API_KEY)
+        _clients.key = key
+    return _clients.client
+
+
+def zotero_request(z, method, *args, **kwargs):
+    """Zotero APIを再試行付きで呼び出し、サーバーのBackoff指示を全ワーカーに適用する"""
+    result = call_with_retry(method, *args, service='zotero', **kwargs)
+    # pyzoteroはBackoff/Retry-Afterヘッダーの期限をクライアントに記録する
+    backoff_until = getattr(z, 'backoff_until', 0)
+    if isinstance(backoff_until, (int, float)) and backoff_until > time.time():
+        get_circuit_breaker('zotero').pause(backoff_until - time.time())
+    return result
+
+
+def search_zotero_items(query):
+    """設定されたバックエンド（ZOTERO_BACKEND）でアイテムを検索"""
+    if ZOTERO_BACKEND == 'local':
+        return get_local_library().search_items(query)
+    z = get_zotero_client()
+    return zotero_request(z, z.items, q=query)
+
+
+def fetch_zotero_item(key):
+    """設定されたバックエンド（ZOTERO_BACKEND）でキーからアイテムを取得"""
+    if ZOTERO_BACKEND == 'local':
+        return get_local_library().item(key)
+    z = get_zotero_client()
+    return zotero_request(z, z.item, key)
+
+
+def load_attachment_index():
+    """設定されたバックエンドから添付ファイルの索引を作る
+
+    Web APIの場合は保存済みの索引を読み込み、ライブラリのバージョンが変わっていれば
+    前回以降に変更・削除された添付ファイルだけを取得する。
+    """
+    if ZOTERO_BACKEND == 'local':
+        index = AttachmentIndex()
+        index.update(get_local_library().attachments())
+        return index
+
+    index = AttachmentIndex(os.path.join(DATA_DIR, ATTACHMENT_INDEX_FILE_NAME))
+    z = get_zotero_client()
+    version = zotero_request(z, z.last_modified_version)
+    if version == index.version:
+        return index
+    since = index.version or None
+    params = {'itemType': 'attachment', 'limit': 100}
+    if since:
+        params['since'] = since
+    first_page = zotero_request(z, z.items, **params)
+    items = zotero_request(z, z.everything, first_page)
+    deleted = zotero_request(z, z.deleted, since=since).get('items', []) if since else []
+    index.update([item.get('data', {}) for item in items], deleted, version)
+    index.save()
+    print(f"Zoteroの添付ファイルの索引を更新しました（{len(index.attachments)}件）")
+    return index
+
+
+def get_attachment_index():
+    """添付ファイルの索引を取得（作成に失敗した場合は空の索引を使い、タイトル検索に任せる）"""
+    global _attachment_index
+    with _attachment_index_lock:
+        if _attachment_index is None:
+            try:
+                _attachment_index = load_attachment_index()
+            except ServiceUnavailableError:
+                raise
+            except Exception as e:
+                print(f"Zoteroの添付ファイルの索引の作成中にエラーが発生しました: {e}")
+                _attachment_index = AttachmentIndex()
+        return _attachment_index
+
+
+def reset_attachment_index():
+    """添付ファイルの索引を破棄（次に使うときに作り直す）"""
+    global _attachment_index
+    with _attachment_index_lock:
+        _attachment_index = None
+
+
+def find_item_by_attachment(pdf_path):
+    """PDFのパス・ファイル名から添付ファイルを特定し、その親アイテムのdataを返す（見つからなければNone）"""
+    parent_key = get_attachment_index().find_parent(pdf_path)
+    if not parent_key:
+        return None
+    parent_item = fetch_zotero_item(parent_key)
+    if parent_item and 'data' in parent_item:
+        print(f"添付ファイルから親アイテムを特定しました: "
+              f"{parent_item['data'].get('title', parent_key)}")
+        return parent_item['data']
+    return None
+
+
+def get_zotero_item_info(file_name_without_ext, pdf_path=None):
+    """PDFに対応するZoteroのアイテムのdataを取得（ノートの作成で使う値を正規化したレコード付き）"""
+    item_data = find_zotero_item(file_name_without_ext, pdf_path)
+    if item_data:
+        attach_record(item_data)
+    return item_data
+
+
+def find_zotero_item(file_name_without_ext, pdf_path=None):
+    # PDFがZoteroの添付ファイルそのものであれば、検索せずに親アイテムが分かる
+    if pdf_path and ZOTERO_ATTACHMENT_LOOKUP:
+        try:
+            item_data = find_item_by_attachment(pdf_path)
+            if item_data:
+                return item_data
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            print(f"添付ファイルからの検索でエラー: {e}")
+
     search_title = file_name_without_ext.strip()
     normalized_search_title = normalize_filename(search_title)
     print(f"Zoteroタイトル検索: '{search_title}' (正規化: '{normalized_search_title}')")
 
     # タイトルで部分一致検索
-    items = z.items(q=search_title)
+    items = search_zotero_items(search_title)
     print(f"Zotero検索ヒット件数: {len(items)}")
 
     # 検索結果のタイトルを表示（デバッグ用）
@@ -98,7 +234,7 @@ def get_zotero_item_info(file_name_without_ext):
             if (item_data.get('itemType') == 'attachment' and
                     'parentItem' in item_data):
                 parent_id = item_data['parentItem']
-                parent_item = z.item(parent_id)
+                parent_item = fetch_zotero_item(parent_id)
                 if parent_item and 'data' in parent_item:
                     print('親アイテム（論文本体）を取得しました')
                     return parent_item['data']
@@ -106,6 +242,9 @@ def get_zotero_item_info(file_name_without_ext):
             # それ以外はそのまま返す
             return item_data
 
+        except ServiceUnavailableError:
+            # 一時的な障害は呼び出し元で扱う（メタデータなしのノートを作らないように）
+            raise
         except Exception as e:
             print(f"アイテム処理でエラー: {e}")
             return None
@@ -0,0 +1,247 @@
+# zotero_local.py
+# Zoteroデスクトップのデータベース（zotero.sqlite）から直接メタデータを読む。
+# Web APIと違って通信の待ち時間やレート制限がない。
+# Zoteroの起動中はデータベースがロックされているため、コピー（スナップショット）を
+# immutableモードの読み取り専用で開く
+# （ZOTERO_SQLITE_SNAPSHOTを無効にすると元のファイルを直接開く）。
+# 返すアイテムはWeb API（pyzotero）と同じ {'key': ..., 'data': {...}} の形。
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from .config import DATA_DIR, ZOTERO_SQLITE_PATH, ZOTERO_SQLITE_SNAPSHOT
+
+SNAPSHOT_FILE_NAME = "zotero_snapshot.sqlite"
+
+# itemAttachments.linkModeの値 -> Web APIのlinkMode
+LINK_MODES = {0: 'imported_file', 1: 'imported_url', 2: 'linked_file', 3: 'linked_url',
+              4: 'embedded_image'}
+
+# dateはSQLの日付と元の文字列を並べた形式（例: "2024-05-00 May 2024"）で保存されている
+_MULTIPART_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2} (.*)$', re.S)
+_WORD_PATTERN = re.compile(r'\w+')
+
+# 削除済み（ゴミ箱）のアイテムとノート・注釈は対象外
+_LIVE_ITEMS_SQL = """
+    SELECT items.itemID FROM items
+    JOIN itemTypes USING (itemTypeID)
+    WHERE items.itemID NOT IN (SELECT itemID FROM deletedItems)
+      AND itemTypes.typeName NOT IN ('note', 'annotation')
+"""
+
+
+def _convert_date(value: str) -> str:
+    """保存形式の日付を元の文字列に戻す"""
+    match = _MULTIPART_DATE_PATTERN.match(value or '')
+    return match.group(1) if match else value
+
+
+def _convert_timestamp(value: str) -> str:
+    """'YYYY-MM-DD HH:MM:SS'（UTC）をWeb APIと同じ'YYYY-MM-DDTHH:MM:SSZ'に変換"""
+    if value and ' ' in value and not value.endswith('Z'):
+        return value.replace(' ', 'T') + 'Z'
+    return value or ''
+
+
+class ZoteroLocalLibrary:
+    def __init__(self, sqlite_path: str = None, use_snapshot: bool = None,
+                 snapshot_dir: str = None):
+        """
+        zotero.sqliteを読み取り専用で開いてアイテムを検索するクラス
+
+        Args:
+            sqlite_path: zotero.sqliteのパス（省略時は環境変数ZOTERO_SQLITE_PATH）
+            use_snapshot: コピーを開くか（省略時は環境変数ZOTERO_SQLITE_SNAPSHOT）
+            snapshot_dir: コピーの保存先（省略時はDATA_DIR）
+        """
+        self.sqlite_path = sqlite_path or ZOTERO_SQLITE_PATH
+        self.use_snapshot = ZOTERO_SQLITE_SNAPSHOT if use_snapshot is None else use_snapshot
+        self.snapshot_dir = snapshot_dir or DATA_DIR
+        self._lock = threading.Lock()
+        self._database_path = None
+        # sqlite3の接続はスレッドをまたいで使えないため、スレッドごとに開く
+        self._local = threading.local()
+
+    def _prepare(self) -> str:
+        """開くデータベースのパスを決める（必要ならスナップショットを作り直す）"""
+        with self._lock:
+            if self._database_path:
+                return self._database_path
+            if not os.path.exists(self.sqlite_path):
+                raise FileNotFoundError(f"zotero.sqliteが見つかりません: {self.sqlite_path}")
+            path = self.sqlite_path
+            if self.use_snapshot:
+                path = os.path.join(self.snapshot_dir, SNAPSHOT_FILE_NAME)
+                source = os.stat(self.sqlite_path)
+                # 元のファイルが更新されていなければ前回のコピーを使う
+                if (not os.path.exists(path)
+                        or os.path.getmtime(path) != source.st_mtime
+                        or os.path.getsize(path) != source.st_size):
+                    os.makedirs(self.snapshot_dir, exist_ok=True)
+                    temp_path = f"{path}.tmp"
+                    shutil.copy2(self.sqlite_path, temp_path)
+                    os.replace(temp_path, path)
+            self._database_path = path
+            return path
+
+    def connection(self) -> sqlite3.Connection:
+        """このスレッドの読み取り専用の接続を取得"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            path = self._prepare()
+            # immutable=1: ロックを取らず、ファイルが変更されない前提で読む
+            uri = f"file:{quote(os.path.abspath(path))}?mode=ro&immutable=1"
+            conn = sqlite3.connect(uri, uri=True)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _item_data(self, item_id: int) -> Optional[Dict]:
+        """アイテムIDからWeb APIと同じ形のdataを作る"""
+        conn = self.connection()
+        row = conn.execute(
+            "SELECT items.key, items.version, items.dateAdded, items.dateModified, "
+            "itemTypes.typeName FROM items JOIN itemTypes USING (itemTypeID) "
+            "WHERE items.itemID = ?", (item_id,)).fetchone()
+        if row is None:
+            return None
+        data = {'key': row['key'], 'version': row['version'],
+                'itemType': row['typeName']}
+
+        for field in conn.execute(
+                "SELECT fields.fieldName, itemDataValues.value FROM itemData "
+                "JOIN fields USING (fieldID) JOIN itemDataValues USING (valueID) "
+                "WHERE itemData.itemID = ?", (item_id,)):
+            value = field['value']
+            data[field['fieldName']] = (_convert_date(value) if field['fieldName'] == 'date'
+                                        else value)
+
+        creators = []
+        for creator in conn.execute(
+                "SELECT creatorTypes.creatorType, creators.firstName, creators.lastName, "
+                "creators.fieldMode FROM itemCreators JOIN creators USING (creatorID) "
+                "JOIN creatorTypes USING (creatorTypeID) WHERE itemCreators.itemID = ? "
+                "ORDER BY itemCreators.orderIndex", (item_id,)):
+            if creator['fieldMode'] == 1:
+                creators.append({'creatorType': creator['creatorType'],
+                                 'name': creator['lastName']})
+            else:
+                creators.append({'creatorType': creator['creatorType'],
+                                 'firstName': creator['firstName'] or '',
+                                 'lastName': creator['lastName'] or ''})
+        if row['typeName'] != 'attachment':
+            data['creators'] = creators
+
+        attachment = conn.execute(
+            "SELECT parent.key AS parentKey, itemAttachments.linkMode, "
+            "itemAttachments.contentType, itemAttachments.path FROM itemAttachments "
+            "LEFT JOIN items AS parent ON parent.itemID = itemAttachments.parentItemID "
+            "WHERE itemAttachments.itemID = ?", (item_id,)).fetchone()
+        if attachment is not None:
+            if attachment['parentKey']:
+                data['parentItem'] = attachment['parentKey']
+            data['linkMode'] = LINK_MODES.get(attachment['linkMode'], '')
+            data['contentType'] = attachment['contentType'] or ''
+            path = attachment['path'] or ''
+            if path.startswith('storage:'):
+                data['filename'] = path[len('storage:'):]
+            elif path:
+                data['path'] = path
+
+        data['tags'] = [
+            {'tag': tag['name'], 'type': tag['type']} if tag['type']
+            else {'tag': tag['name']}
+            for tag in conn.execute(
+                "SELECT tags.name, itemTags.type FROM itemTags JOIN tags USING (tagID) "
+                "WHERE itemTags.itemID = ? ORDER BY tags.name", (item_id,))]
+        data['collections'] = [
+            collection['key'] for collection in conn.execute(
+                "SELECT collections.key FROM collectionItems JOIN collections "
+                "USING (collectionID) WHERE collectionItems.itemID = ?", (item_id,))]
+        data['relations'] = {}
+        data['dateAdded'] = _convert_timestamp(row['dateAdded'])
+        data['dateModified'] = _convert_timestamp(row['dateModified'])
+        return data
+
+    def item(self, key: str) -> Optional[Dict]:
+        """キーでアイテムを取得（pyzoteroのZotero.itemと同じ形）"""
+        row = self.connection().execute(
+            "SELECT itemID FROM items WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        data = self._item_data(row['itemID'])
+        return {'key': key, 'data': data} if data else None
+
+    def attachments(self) -> List[Dict]:
+        """ファイルの添付アイテムの一覧（key・parentItem・path/filenameだけを持つdata）"""
+        attachments = []
+        for row in self.connection().execute(
+                "SELECT attachment.key, parent.key AS parentKey, itemAttachments.path "
+                "FROM itemAttachments "
+                "JOIN items AS attachment ON attachment.itemID = itemAttachments.itemID "
+                "LEFT JOIN items AS parent ON parent.itemID = itemAttachments.parentItemID "
+                "WHERE itemAttachments.path IS NOT NULL "
+                "AND itemAttachments.itemID NOT IN (SELECT itemID FROM deletedItems)"):
+            data = {'key': row['key']}
+            if row['parentKey']:
+                data['parentItem'] = row['parentKey']
+            if row['path'].startswith('storage:'):
+                data['filename'] = row['path'][len('storage:'):]
+            else:
+                data['path'] = row['path']
+            attachments.append(data)
+        return attachments
+
+    def search_items(self, query: str, limit: int = 25) -> List[Dict]:
+        """
+        タイトル・著者名・年で検索（Web APIのq=と同じく、すべての単語を含むアイテム）
+
+        Returns:
+            [{'key': ..., 'data': {...}}, ...]（追加日時の新しい順）
+        """
+        words = [word.lower() for word in _WORD_PATTERN.findall(query or '')]
+        if not words:
+            return []
+        conn = self.connection()
+        # タイトル・日付・著者名を1つの文字列にまとめて照合し、一致したものだけdataを作る
+        rows = conn.execute(
+            "SELECT items.itemID, "
+            "coalesce((SELECT group_concat(itemDataValues.value, ' ') FROM itemData "
+            "JOIN fields USING (fieldID) JOIN itemDataValues USING (valueID) "
+            "WHERE itemData.itemID = items.itemID "
+            "AND fields.fieldName IN ('title', 'date')), '') || ' ' || "
+            "coalesce((SELECT group_concat(coalesce(creators.firstName, '') || ' ' || "
+            "coalesce(creators.lastName, ''), ' ') FROM itemCreators "
+            "JOIN creators USING (creatorID) "
+            "WHERE itemCreators.itemID = items.itemID), '') AS searchable "
+            f"FROM items WHERE items.itemID IN ({_LIVE_ITEMS_SQL}) "
+            "ORDER BY items.dateAdded DESC")
+
+        results = []
+        for row in rows:
+            searchable = row['searchable'].lower()
+            if not all(word in searchable for word in words):
+                continue
+            data = self._item_data(row['itemID'])
+            if data is not None:
+                results.append({'key': data['key'], 'data': data})
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def get_local_library() -> ZoteroLocalLibrary:
+    """プロセス内で共有するZoteroLocalLibraryを取得"""
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = ZoteroLocalLibrary()
+        return _library
@@ -0,0 +1,260 @@
+# zotero_record.py
+# Zoteroのアイテムを取得したときに1回だけ正規化し、ノートの作成で使う値
+# （解析済みの日付・著者名の各形式・引用文字列・年）をまとめたレコードを作る。
+# レコードはアイテムのdataに入れて渡し、ノートの作成データ（note_artifacts）と一緒に保存されるため、
+# ノートを作るときもテンプレートの変更で作り直すときも日付や著者を解析し直さない。
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# アイテムのdataの中でレコードを入れるキー
+RECORD_KEY = "_record"
+# レコードの形式を変えたときに上げる（古い形式のレコードは作り直す）
+RECORD_FORMAT = 1
+# 解析しておく日付のフィールド（{{date | format(...)}} と {{importDate | format(...)}}）
+DATE_FIELDS = ('date', 'dateAdded')
+
+# Zoteroの日付として受け付ける形式
+DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%SZ',
+    '%Y-%m-%dT%H:%M:%S.%fZ',
+    '%Y',
+    '%Y-%m',
+]
+
+
+def parse_date(date_string: str) -> Optional[datetime]:
+    """Zoteroの日付文字列を解析（どの形式にも当てはまらない場合はNone）"""
+    if not date_string:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_string, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def make_citation(zotero_data):
+    """Zoteroデータから引用形式を生成"""
+    if not zotero_data:
+        return "<!-- 参考文献は手動で追加してください -->"
+
+    # 著者名を取得（姓、名の順）
+    creators = zotero_data.get('creators', [])
+    author_names = []
+    for creator in creators:
+        if creator.get('creatorType') == 'author':
+            first = creator.get('firstName', '')
+            last = creator.get('lastName', '')
+            if first and last:
+                author_names.append(f"{last}, {first}")
+            elif last:
+                author_names.append(last)
+            elif first:
+                author_names.append(first)
+
+    # 基本情報を取得
+    title = zotero_data.get('title', '')
+    date = zotero_data.get('date', '')
+    year = date[:4] if date else ''
+    doi = zotero_data.get('DOI', '')
+    url = zotero_data.get('url', '')
+    item_type = zotero_data.get('itemType', '')
+
+    # 引用形式を構築（実際のノートの形式に合わせる）
+    citation_parts = []
+
+    # 著者名（最初の著者のみ）
+    if author_names:
+        first_author = author_names[0]
+        if len(author_names) > 1:
+            # 他の著者名を取得
+            other_authors = []
+            for i in range(1, len(author_names)):
+                name_parts = author_names[i].split(', ')
+                if len(name_parts) == 2:
+                    other_authors.append(name_parts[1] + ' ' + name_parts[0])
+                else:
+                    other_authors.append(author_names[i])
+
+            authors_str = first_author + ', ' + ', '.join(other_authors)
+        else:
+            authors_str = first_author
+
+        citation_parts.append(authors_str)
+
+    # タイトル（引用符付き）
+    if title:
+        citation_parts.append(f"'{title}'")
+
+    # 出版情報
+    if item_type == 'preprint':
+        citation_parts.append('arXiv')
+        if date:
+            month_names = ['', 'January', 'February', 'March', 'April', 'May',
+                           'June', 'July', 'August', 'September', 'October',
+                           'November', 'December']
+            date_parts = date.split('-')
+            day = date_parts[2]
+            month = month_names[int(date_parts[1])]
+            citation_parts.append(f"{day} {month} {year}")
+
+    # DOIまたはURL
+    if doi:
+        citation_parts.append(
+            f"[https://doi.org/{doi}](https://doi.org/{doi})")
+    elif url:
+        citation_parts.append(f"[{url}]({url})")
+
+    if citation_parts:
+        return '. '.join(citation_parts) + '.'
+    else:
+        return "<!-- 参考文献は手動で追加してください -->"
+
+
+def make_authors_block(creators):
+    if not creators:
+        return "  - ''"
+    lines = []
+    for creator in creators:
+        if creator.get('creatorType') == 'author':
+            last = creator.get('lastName', '')
+            first = creator.get('firstName', '')
+            if last or first:
+                lines.append(f'  - {last}, {first}')
+    return '\n'.join(lines) if lines else "  - ''"
+
+
+def make_info_block(zotero_data):
+    creators = zotero_data.get('creators', [])
+    lines = []
+
+    # 著者を処理（FirstAuthor:: と Author:: の形式）
+    first_author = True
+    for creator in creators:
+        if creator.get('creatorType') == 'author':
+            last = creator.get('lastName', '')
+            first = creator.get('firstName', '')
+            name = creator.get('name', '')
+
+            if name:
+                author_name = name
+            elif last and first:
+                author_name = f"{last}, {first}"
+            elif last:
+                author_name = last
+            elif first:
+                author_name = first
+            else:
+                continue
+
+            if first_author:
+                lines.append(f'> **FirstAuthor**: {author_name}')
+                first_author = False
+            else:
+                lines.append(f'> **Author**: {author_name}')
+
+    # その他の情報
+    lines.append(f'> **Title**: {zotero_data.get("title", "")}')
+    year = zotero_data.get("date", "")
+    if year:
+        lines.append(f'> **Year**: {year[:4]}')
+    if zotero_data.get("citekey"):
+        lines.append(f'> **Citekey**: {zotero_data.get("citekey", "")}')
+    if zotero_data.get("itemType"):
+        lines.append(f'> **itemType**: {zotero_data.get("itemType", "")}')
+
+    return '\n'.join(lines)
+
+
+def make_author_names(creators: List[Dict]) -> List[str]:
+    """{{authors}} に使う著者名（"名 姓"）の一覧"""
+    author_names = []
+    for creator in creators:
+        if creator.get('creatorType') == 'author':
+            first_name = creator.get('firstName', '')
+            last_name = creator.get('lastName', '')
+            if first_name and last_name:
+                author_names.append(f"{first_name} {last_name}")
+            elif last_name:
+                author_names.append(last_name)
+            elif first_name:
+                author_names.append(first_name)
+    return author_names
+
+
+def make_creator_lines(creators: List[Dict]) -> List[str]:
+    """作成者の種類ごとの行（"> **Author**: 姓, 名"）の一覧"""
+    creator_info = []
+    for creator in creators:
+        creator_type = creator.get('creatorType', 'unknown')
+        first_name = creator.get('firstName', '')
+        last_name = creator.get('lastName', '')
+        name = creator.get('name', '')
+
+        if name:
+            creator_info.append(f'> **{creator_type.capitalize()}**: {name}')
+        elif last_name and first_name:
+            creator_info.append(
+                f'> **{creator_type.capitalize()}**: {last_name}, {first_name}')
+        elif last_name:
+            creator_info.append(f'> **{creator_type.capitalize()}**: {last_name}')
+        elif first_name:
+            creator_info.append(f'> **{creator_type.capitalize()}**: {first_name}')
+    return creator_info
+
+
+def normalize_item(zotero_data: Dict) -> Dict:
+    """
+    アイテムのdataからノートの作成で使う値を計算したレコードを作る
+
+    Returns:
+        dates: 解析できた日付のフィールド -> [年, 月, 日, 時, 分, 秒]
+        year / author_names / authors / creator_lines / authors_block / info_block / citation
+    """
+    creators = zotero_data.get('creators', [])
+    dates = {}
+    for field in DATE_FIELDS:
+        parsed_date = parse_date(zotero_data.get(field, ''))
+        if parsed_date:
+            dates[field] = list(parsed_date.timetuple()[:6])
+
+    record = {
+        'format': RECORD_FORMAT,
+        'version': zotero_data.get('version'),
+        'dates': dates,
+        'year': zotero_data.get('date', '')[:4] if zotero_data.get('date') else '',
+        'author_names': make_author_names(creators),
+        # Liquidの creators のループ（"姓, 名"）に使う
+        'authors': [[creator.get('lastName', ''), creator.get('firstName', '')]
+                    for creator in creators if creator.get('creatorType') == 'author'],
+        'creator_lines': make_creator_lines(creators),
+        'authors_block': make_authors_block(creators),
+        'info_block': make_info_block(zotero_data),
+    }
+    try:
+        record['citation'] = make_citation(zotero_data)
+    except Exception as e:
+        # 作れない場合はレコードに入れず、ノートの作成時にエラーとして扱う
+        print(f"引用形式の作成中にエラーが発生しました: {e}")
+    return record
+
+
+def get_record(zotero_data: Dict) -> Dict:
+    """アイテムのレコードを取得（付いていない・古い場合はその場で作る）"""
+    record = zotero_data.get(RECORD_KEY)
+    if (isinstance(record, dict) and record.get('format') == RECORD_FORMAT
+            and record.get('version') == zotero_data.get('version')):
+        return record
+    return normalize_item(zotero_data)
+
+
+def attach_record(zotero_data: Dict) -> Dict:
+    """アイテムのdataにレコードを付ける（Zoteroから取得した直後に1回だけ呼ぶ）"""
+    zotero_data[RECORD_KEY] = normalize_item(zotero_data)
+    return zotero_data
@@ -0,0 +1,12 @@
+import pytest
+
+from src.obsidian_automation import usage_ledger
+
+
+@pytest.fixture(autouse=True)
+def isolate_usage_ledger(tmp_path, monkeypatch):
+    """Geminiの使用量の台帳をテストごとの一時フォルダに書き込む（プロジェクトのdata/を汚さない）"""
+    monkeypatch.setattr(usage_ledger, 'DATA_DIR', str(tmp_path))
+    usage_ledger.reset_run_usage()
+    yield
+    usage_ledger.reset_run_usage()
@@ -0,0 +1,43 @@
+import tempfile
+
+import PyPDF2
+import pytest
+
+from benchmarks.bench_pipeline import main as bench_main
+from benchmarks.fakes import FakeGenAI, ResourceExhausted
+from benchmarks.synthetic_pdf import generate_corpus
+
+
+class TestBenchmarks:
+    """ベンチマーク用の合成コーパスとフェイクのテスト"""
+
+    def test_generate_corpus_readable_by_pypdf2(self):
+        """生成したPDFがPyPDF2で読めてページ数が一致するかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            corpus = generate_corpus(temp_dir, 3, min_pages=2, max_pages=5)
+
+            assert len(corpus) == 3
+            for pdf_path, page_count in corpus:
+                reader = PyPDF2.PdfReader(pdf_path)
+                assert len(reader.pages) == page_count
+                assert "Synthetic Paper" in reader.pages[0].extract_text()
+
+    def test_fake_genai_rate_limit_injection(self):
+        """429注入が決定的に行われるかのテスト"""
+        fake = FakeGenAI(rate_limit_ratio=1.0)
+        model = fake.GenerativeModel("gemini-2.5-flash")
+
+        with pytest.raises(ResourceExhausted):
+            model.generate_content("prompt")
+        assert fake.rate_limited_calls == 1
+
+    def test_bench_pipeline_smoke(self, capsys):
+        """フェイク環境でパイプライン全体が直列・並列とも完走するかのテスト"""
+        bench_main(['--papers', '2', '--min-pages', '1', '--max-pages', '2',
+                    '--workers', '1', '2', '--gemini-latency', '0',
+                    '--zotero-latency', '0', '--no-trace-memory'])
+
+        output = capsys.readouterr().out
+        assert "=== serial ===" in output
+        assert "=== parallel x2 ===" in output
+        assert output.count("notes written: 2") == 2
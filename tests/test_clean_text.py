@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+from benchmarks.bench_clean_text import legacy_clean_text
+from benchmarks.fakes import FakeGenAI
+from src.obsidian_automation import pdf_processor
+from src.obsidian_automation.pdf_processor import CleanText, clean_text
+
+
+class TestCleanText:
+    """clean_textとCleanTextのテスト"""
+
+    def test_clean_text_matches_legacy_behavior(self):
+        """従来の実装と同じ結果になるかのテスト"""
+        samples = [
+            "  Hello \n\n World\t! ",
+            "a\x00b\x0bc\x0cd\x1fe\x7ff",
+            "surrogate\ud800 removed\udfff",
+            "全角　スペース と改行\r\n",
+            "",
+        ]
+        for sample in samples:
+            assert clean_text(sample) == legacy_clean_text(sample)
+
+    def test_clean_text_returns_clean_text_type(self):
+        """戻り値がCleanText型になるかのテスト"""
+        assert isinstance(clean_text(" a  b "), CleanText)
+        assert isinstance(clean_text(None), CleanText)
+
+    def test_clean_text_skips_already_cleaned(self):
+        """CleanTextはそのまま返され再処理されないかのテスト"""
+        cleaned = CleanText("already  cleaned")
+        assert clean_text(cleaned) is cleaned
+
+    def test_summarize_text_builds_cleaned_prompt_once(self):
+        """要約プロンプトが1回のクリーニング結果と同じになるかのテスト"""
+        fake_genai = FakeGenAI()
+        with patch.object(pdf_processor, 'genai', fake_genai), \
+                patch.object(pdf_processor, 'load_custom_prompt',
+                             return_value=clean_text("Prompt\n\n  body")), \
+                patch.object(pdf_processor, 'KeywordManager'):
+            result = pdf_processor.summarize_text(clean_text("Paper\ntext"))
+
+        assert result is not None
+        prompt = fake_genai.calls[0]['contents']
+        assert prompt == "Prompt body 以下が要約対象のテキストです： Paper text"
+        assert prompt == legacy_clean_text(
+            "Prompt\n\n  body\n\n以下が要約対象のテキストです：\n\nPaper\ntext")
@@ -0,0 +1,24 @@
+from unittest.mock import patch
+
+from src.obsidian_automation import config
+
+
+class TestConfig:
+    """config.pyのテスト"""
+
+    def test_validate_config_success(self):
+        """必要な環境変数が揃っている場合のテスト"""
+        with patch.object(config, 'GEMINI_API_KEY', 'key'), \
+                patch.object(config, 'NOTE_FOLDER', '/notes'):
+            assert config.validate_config(config.KEYWORDS_REQUIRED_VARS)
+
+    def test_validate_config_reports_missing(self, capsys):
+        """不足している環境変数のみが報告されるかのテスト"""
+        with patch.object(config, 'GEMINI_API_KEY', 'key'), \
+                patch.object(config, 'NOTE_FOLDER', None), \
+                patch.object(config, 'ZOTERO_API_KEY', None):
+            assert not config.validate_config(config.KEYWORDS_REQUIRED_VARS)
+
+        output = capsys.readouterr().out
+        assert "NOTE_FOLDER" in output
+        assert "ZOTERO_API_KEY" not in output
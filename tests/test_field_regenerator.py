@@ -0,0 +1,177 @@
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from src.obsidian_automation import field_regenerator, text_cache
+from src.obsidian_automation.field_regenerator import (
+    build_field_prompt,
+    regenerate_note_fields,
+    replace_note_fields,
+    split_prompt_fields,
+)
+from src.obsidian_automation.obsidian_note_creator import replace_llm_placeholders
+
+RAW_PROMPT = """以下のフォーマットで要約してください。
+・出力はJSON形式にしてください。
+
+{
+"abstract": "
+- Abstractを要約してください
+",
+"result": "
+## Experiment
+- 結果について記述してください
+",
+"publication": "conference名
+- カンファレンス名のみにしてください
+",
+"keyword": "
+- 既存キーワード：
+{KEYWORDS_SECTION}
+"
+}"""
+
+TEMPLATE = """---
+title: "{{title}}"
+field: "{{field}}"
+---
+
+> [!Glossary]
+{{glossary}}
+
+# Result
+{{result}}
+
+# Ablation
+{{ablation}}
+
+# Memo
+
+# Comments
+
+> [!Keyword]-
+> Field: #{{field}}
+> {{keyword}}"""
+
+
+def render_note(values):
+    content = TEMPLATE.replace('{{title}}', 'Paper')
+    return replace_llm_placeholders(content, values)
+
+
+class TestFieldRegenerator:
+    """field_regenerator.pyのテスト"""
+
+    def test_split_prompt_fields(self):
+        """custom_prompt.mdを前置きとフィールドごとの指示に分けられるかのテスト"""
+        preamble, blocks = split_prompt_fields(RAW_PROMPT)
+        assert preamble.endswith("・出力はJSON形式にしてください。")
+        assert list(blocks) == ['abstract', 'result', 'publication', 'keyword']
+        assert blocks['result'] == '"result": "\n## Experiment\n- 結果について記述してください\n"'
+        assert blocks['publication'].startswith('"publication": "conference名')
+
+    def test_build_field_prompt_only_selected_fields(self):
+        """指定したフィールドの指示だけがプロンプトに含まれるかのテスト"""
+        prompt = build_field_prompt(['result'], raw_prompt=RAW_PROMPT)
+        assert '結果について記述してください' in prompt
+        assert 'Abstract' not in prompt
+        assert 'conference' not in prompt
+        assert prompt.endswith('" }')
+        assert build_field_prompt(['unknown'], raw_prompt=RAW_PROMPT) is None
+
+    def test_replace_note_fields_keeps_user_sections(self):
+        """指定したフィールドだけを書き換え、Memoなどの書き込みは残すかのテスト"""
+        note = render_note({
+            'field': 'CV', 'glossary': '- term: old', 'result': 'old result\n\nmore',
+            'ablation': 'old ablation', 'keyword': '#Old\n> #Tag'})
+        note = note.replace('# Memo\n', '# Memo\n自分のメモ\n')
+
+        updated = replace_note_fields(note, TEMPLATE, {
+            'result': 'new result', 'glossary': '- term: new', 'field': 'NLP'})
+
+        assert 'new result\n\n# Ablation\nold ablation' in updated
+        assert '> [!Glossary]\n> - term: new\n\n# Result' in updated
+        assert 'field: "NLP"' in updated
+        # keywordは指定していないため変わらない
+        assert updated.split('> Field: #NLP\n')[1] == note.split('> Field: #CV\n')[1]
+        assert '# Memo\n自分のメモ\n' in updated
+        assert 'old result' not in updated
+
+    def test_replace_note_fields_last_field(self):
+        """テンプレートの末尾のフィールドを置き換えられるかのテスト"""
+        note = render_note({'field': 'CV', 'keyword': '#Old'}) + '\n'
+        updated = replace_note_fields(note, TEMPLATE, {'keyword': '#New\n> #Other'})
+        # 新しく作成した場合と同じ形式で書き込まれる
+        assert updated == render_note({'field': 'CV', 'keyword': '#New\n> #Other'}) + '\n'
+
+    def test_replace_note_fields_missing_section(self):
+        """見出しが消されたノートは書き換えないかのテスト"""
+        note = render_note({'ablation': 'old'}).replace('# Ablation\n', '')
+        assert replace_note_fields(note, TEMPLATE, {'ablation': 'new'}) is None
+
+    def test_text_cache_roundtrip(self):
+        """抽出テキストを保存・読み込みでき、PDFが更新されたら使わないかのテスト"""
+        with tempfile.TemporaryDirectory() as folder, \
+                patch.object(text_cache, 'DATA_DIR', folder):
+            pdf_path = os.path.join(folder, "Paper.pdf")
+            with open(pdf_path, 'wb') as f:
+                f.write(b"%PDF-1.4 dummy")
+            assert text_cache.load_cached_text(pdf_path) is None
+            assert text_cache.save_cached_text(pdf_path, "paper text")
+            assert text_cache.load_cached_text(pdf_path) == "paper text"
+            # PDFが見つからなくてもノート名でキャッシュを使える
+            assert text_cache.load_cached_text("Paper.pdf") == "paper text"
+
+            future = time.time() + 10
+            os.utime(pdf_path, (future, future))
+            assert text_cache.load_cached_text(pdf_path) is None
+
+    def test_regenerate_note_fields_uses_cached_text(self):
+        """キャッシュしたテキストから指定したフィールドだけを作り直すかのテスト"""
+        with tempfile.TemporaryDirectory() as folder, \
+                patch.object(text_cache, 'DATA_DIR', folder):
+            note_path = os.path.join(folder, "Paper.md")
+            with open(note_path, 'w', encoding='utf-8') as f:
+                f.write(render_note({'result': 'old', 'ablation': 'old ablation'}))
+            text_cache.save_cached_text("Paper.pdf", "cached paper text")
+
+            with patch.object(field_regenerator, 'read_custom_prompt_file',
+                              return_value=RAW_PROMPT), \
+                    patch.object(text_cache, 'extract_text_from_pdf') as mock_extract, \
+                    patch.object(field_regenerator, 'summarize_fields',
+                                 return_value={'result': 'new'}) as mock_summarize:
+                assert regenerate_note_fields(note_path, "Paper.pdf", ['result'],
+                                              TEMPLATE)
+
+            mock_extract.assert_not_called()
+            text, prompt, fields = mock_summarize.call_args[0]
+            assert text == "cached paper text"
+            assert fields == ['result']
+            with open(note_path, 'r', encoding='utf-8') as f:
+                assert '# Result\nnew\n\n# Ablation\nold ablation' in f.read()
+
+    def test_regenerate_fields_accepts_prompt_fields(self):
+        """Zoteroと同名でもプロンプトで指示しているフィールド（issue）は作り直せるかのテスト"""
+        template = TEMPLATE.replace('# Result\n', '# Issue\n{{issue}}\n\n# Result\n')
+        raw_prompt = RAW_PROMPT.replace(
+            '"publication"', '"issue": "\n- 課題を記述してください\n",\n"publication"')
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, "Paper.md"), 'w', encoding='utf-8') as f:
+                f.write(replace_llm_placeholders(template, {'issue': 'old issue'}))
+
+            with patch.object(field_regenerator, 'load_template', return_value=template), \
+                    patch.object(field_regenerator, 'read_custom_prompt_file',
+                                 return_value=raw_prompt), \
+                    patch.object(field_regenerator, 'NOTE_FOLDER', folder), \
+                    patch.object(field_regenerator, 'NOTE_FOLDERS', []), \
+                    patch.object(field_regenerator, 'PDF_FOLDER', folder), \
+                    patch.object(field_regenerator, 'PDF_FOLDERS', []), \
+                    patch.object(field_regenerator, 'update_vault_indexes'), \
+                    patch.object(field_regenerator, 'regenerate_note_fields',
+                                 return_value=True) as mock_regenerate:
+                assert field_regenerator.regenerate_fields(['issue']) == 1
+                assert mock_regenerate.call_args[0][2] == ['issue']
+                # テンプレートにあってもLLMに指示していないZoteroのフィールドは作り直さない
+                assert field_regenerator.regenerate_fields(['title']) == 0
+                assert mock_regenerate.call_count == 1
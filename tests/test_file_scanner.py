@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from src.obsidian_automation.file_scanner import build_name_index, merge_roots, scan_files
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b"")
+
+
+class TestFileScanner:
+    """file_scanner.pyのテスト"""
+
+    def test_scan_files_recursive_multiple_roots(self):
+        """複数のフォルダをサブフォルダまで走査し、隠しフォルダを除外するかのテスト"""
+        with tempfile.TemporaryDirectory() as first, \
+                tempfile.TemporaryDirectory() as second:
+            touch(os.path.join(first, "b.pdf"))
+            touch(os.path.join(first, "2024", "cvpr", "a.PDF"))
+            touch(os.path.join(first, "notes.txt"))
+            touch(os.path.join(first, ".cache", "hidden.pdf"))
+            touch(os.path.join(second, "c.pdf"))
+
+            paths = scan_files([first, second, first, "/nonexistent"], '.pdf',
+                               workers=4)
+
+            assert paths == [os.path.join(first, "2024", "cvpr", "a.PDF"),
+                             os.path.join(first, "b.pdf"),
+                             os.path.join(second, "c.pdf")]
+
+    def test_scan_files_does_not_follow_directory_symlinks(self):
+        """フォルダへのシンボリックリンクをたどらない（循環しない）かのテスト"""
+        with tempfile.TemporaryDirectory() as root:
+            touch(os.path.join(root, "sub", "a.md"))
+            os.symlink(root, os.path.join(root, "sub", "loop"))
+            assert scan_files([root], '.md') == [os.path.join(root, "sub", "a.md")]
+
+    def test_build_name_index(self):
+        """同名のファイルは最初に見つかったものを使うかのテスト"""
+        index = build_name_index(["/a/paper.pdf", "/b/paper.pdf", "/b/other.pdf"])
+        assert index == {"paper": "/a/paper.pdf", "other": "/b/other.pdf"}
+
+    def test_merge_roots(self):
+        """主フォルダを先頭に重複なく並べるかのテスト"""
+        assert merge_roots("/vault", ["/extra", "/vault"]) == ["/vault", "/extra"]
+        assert merge_roots(None, ["/extra"]) == ["/extra"]
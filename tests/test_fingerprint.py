@@ -0,0 +1,126 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+import main
+from src.obsidian_automation import obsidian_note_creator
+from src.obsidian_automation.fingerprint import (
+    DUPLICATE_THRESHOLD,
+    FingerprintStore,
+    estimate_similarity,
+    minhash_signature,
+)
+from src.obsidian_automation.obsidian_note_creator import link_duplicate_pdf
+
+PAPER = " ".join(
+    f"We study sparse attention for long documents in section {i} and report "
+    f"results on benchmark {i % 7} with model size {i * 3}." for i in range(200))
+OTHER = " ".join(
+    f"This survey reviews graph neural networks for molecules in chapter {i} "
+    f"using dataset {i % 5} and baseline {i * 2}." for i in range(200))
+
+
+def write_pdf(folder, name, content=b"%PDF-1.4 dummy"):
+    path = os.path.join(folder, f"{name}.pdf")
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+class TestFingerprint:
+    """fingerprint.pyのテスト"""
+
+    def test_similarity(self):
+        """版違い（ヘッダーの追加）は閾値以上、別の論文は低い類似度になるかのテスト"""
+        signature = minhash_signature(PAPER)
+        preprint = minhash_signature("arXiv:2401.00001v2 [cs.CL] Preprint. " + PAPER)
+        assert estimate_similarity(signature, signature) == 1.0
+        assert estimate_similarity(signature, preprint) >= DUPLICATE_THRESHOLD
+        assert estimate_similarity(signature, minhash_signature(OTHER)) < 0.1
+        assert estimate_similarity(signature, []) == 0.0
+
+    def test_claim_detects_duplicate(self):
+        """登録済みの論文と同じ内容のPDFを重複として検出するかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            store = FingerprintStore(os.path.join(folder, "fingerprints.json"))
+            original = write_pdf(folder, "Original", b"%PDF original")
+            camera_ready = write_pdf(folder, "CameraReady", b"%PDF camera ready")
+            copy = write_pdf(folder, "Copy", b"%PDF original")
+            unrelated = write_pdf(folder, "Unrelated", b"%PDF unrelated")
+
+            assert store.claim(original, PAPER) is None
+            assert store.claim(copy, "") == ("Original", 1.0)
+            note_name, similarity = store.claim(camera_ready, PAPER + " Acknowledgments.")
+            assert note_name == "Original" and similarity >= DUPLICATE_THRESHOLD
+            assert store.claim(unrelated, OTHER) is None
+            assert set(store.data['papers']) == {"Original", "Unrelated"}
+
+    def test_save_and_load(self):
+        """保存したフィンガープリントを次回の実行で読み込めるかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            store_file = os.path.join(folder, "data", "fingerprints.json")
+            pdf_path = write_pdf(folder, "Original")
+            store = FingerprintStore(store_file)
+            with patch('src.obsidian_automation.fingerprint.extract_text_from_pdf',
+                       return_value=PAPER) as mock_extract:
+                store.register(pdf_path)
+            mock_extract.assert_called_once()
+            store.mark_duplicate(os.path.join(folder, "Copy.pdf"), "Original")
+            store.save()
+
+            reloaded = FingerprintStore(store_file)
+            assert reloaded.data['papers']["Original"]['signature'] == minhash_signature(PAPER)
+            assert reloaded.is_duplicate("Copy.pdf")
+            assert not reloaded.is_duplicate(pdf_path)
+
+    def test_link_duplicate_pdf(self):
+        """既存のPDFリンクの次の行に重複PDFのリンクを1度だけ追加するかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            note_path = os.path.join(folder, "Original.md")
+            with open(note_path, 'w', encoding='utf-8') as f:
+                f.write("# Paper\n\n> [!Data]\n> [[Original.pdf]]\n\n# Memo\n")
+            with patch.object(obsidian_note_creator, 'NOTE_FOLDER', folder):
+                assert link_duplicate_pdf("Original", "/pdfs/Copy.pdf")
+                assert link_duplicate_pdf("Original", "/pdfs/Copy.pdf")
+            with open(note_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            assert content == ("# Paper\n\n> [!Data]\n> [[Original.pdf]]\n"
+                               "> [[Copy.pdf]]\n\n# Memo\n")
+
+    def test_process_pdf_skips_summary_for_duplicate(self):
+        """重複したPDFではGeminiの要約を呼ばずにリンクだけ追加するかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            store = FingerprintStore(os.path.join(folder, "fingerprints.json"))
+            write_pdf(folder, "Original", b"%PDF same")
+            store.claim(os.path.join(folder, "Original.pdf"), PAPER)
+            copy = write_pdf(folder, "Copy", b"%PDF same")
+
+            with patch('main.extract_text_from_pdf', return_value=PAPER), \
+                    patch('main.save_cached_text'), \
+                    patch('main.summarize_routed') as mock_summarize, \
+                    patch('main.link_duplicate_pdf', return_value=True) as mock_link:
+                result = main.process_pdf(copy, fingerprints=store)
+
+            assert result == main.DUPLICATE
+            mock_summarize.assert_not_called()
+            mock_link.assert_called_once_with("Original", copy, None)
+            assert store.is_duplicate(copy)
+
+    def test_process_pdf_releases_claim_when_note_write_fails(self):
+        """ノートを書き込めなかったPDFは登録を取り消し、次回の実行で処理し直せるかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            store = FingerprintStore(os.path.join(folder, "fingerprints.json"))
+            pdf_path = write_pdf(folder, "Paper")
+
+            with patch('main.extract_text_from_pdf', return_value=PAPER), \
+                    patch('main.save_cached_text'), \
+                    patch('main.summarize_routed', return_value={'abstract': "要約"}), \
+                    patch('main.get_zotero_item_info', return_value=None), \
+                    patch.object(obsidian_note_creator, 'load_template', return_value=None), \
+                    patch.object(obsidian_note_creator, 'NOTE_FOLDER', folder), \
+                    patch.object(obsidian_note_creator, 'write_note',
+                                 side_effect=OSError("disk full")):
+                assert main.process_pdf(pdf_path, fingerprints=store) is False
+
+            assert "Paper" not in store.data['papers']
+            assert store.claim(pdf_path, PAPER) is None
@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+
+from src.obsidian_automation.keyword_manager import (
+    KeywordManager,
+    count_words,
+    score_keywords,
+    split_keyword,
+)
+
+PAPER_TEXT = ("We propose a vision transformer (ViT) for semantic segmentation. "
+              "Unlike CNN baselines, our segmentation head uses self-supervised "
+              "pre-training. Semantic segmentation results on ADE20K ...")
+
+
+def make_manager(temp_dir, extra_terms=0):
+    """テスト用のkeywords.jsonを持つKeywordManagerを作成"""
+    manager = KeywordManager(os.path.join(temp_dir, "missing.json"))
+    data = manager.keywords_data
+    data["categories"]["theme"] = ["SelfSupervised", "Robustness"]
+    data["categories"]["task"].extend(
+        f"SyntheticTask{i}" for i in range(extra_terms))
+    keywords_file = os.path.join(temp_dir, "keywords.json")
+    with open(keywords_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return KeywordManager(keywords_file)
+
+
+class TestKeywordRelevance:
+    """関連度によるキーワードセクションの絞り込みのテスト"""
+
+    def test_split_keyword(self):
+        """CamelCaseのキーワードを単語に分割できるかのテスト"""
+        assert split_keyword("SemanticSegmentation") == ["semantic", "segmentation"]
+        assert split_keyword("CNN") == ["cnn"]
+
+    def test_score_keywords_prefers_relevant_terms(self):
+        """本文に出現するキーワードほど高いスコアになるかのテスト"""
+        scores = score_keywords(
+            ["SemanticSegmentation", "InstanceSegmentation", "PoseEstimation"],
+            count_words(PAPER_TEXT))
+
+        assert scores["SemanticSegmentation"] > scores["InstanceSegmentation"]
+        assert scores["InstanceSegmentation"] > scores["PoseEstimation"]
+        assert scores["PoseEstimation"] == 0
+
+    def test_select_relevant_keywords(self):
+        """fieldは全件、他のカテゴリは関連する上位K件のみになるかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = make_manager(temp_dir)
+            selected = manager.select_relevant_keywords(PAPER_TEXT, top_k=2)
+
+        assert selected["field"] == manager.keywords_data["categories"]["field"]
+        assert selected["task"][0] == "SemanticSegmentation"
+        assert len(selected["task"]) <= 2
+        assert selected["architecture"][0] == "VisionTransformer"
+        assert "LSTM" not in selected["architecture"]
+        assert selected["theme"] == ["SelfSupervised"]
+
+    def test_prompt_bounded_regardless_of_vocabulary_size(self):
+        """語彙が増えてもプロンプトの長さが増えないかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            small = make_manager(temp_dir).create_keyword_prompt(
+                PAPER_TEXT, top_k=3)
+            large_manager = make_manager(temp_dir, extra_terms=5000)
+            large = large_manager.create_keyword_prompt(PAPER_TEXT, top_k=3)
+            full = large_manager.create_keyword_prompt()
+
+        assert large == small
+        assert "SyntheticTask4999" in full
+        assert len(full) > 10 * len(large)
+
+    def test_create_keyword_prompt_without_text(self):
+        """テキストを渡さない場合は従来通り全語彙を含めるかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = make_manager(temp_dir)
+            prompt = manager.create_keyword_prompt(top_k=2)
+
+        assert "PoseEstimation" in prompt
+        assert "LSTM" in prompt
@@ -0,0 +1,102 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from src.obsidian_automation import keyword_tagger, pdf_processor
+from src.obsidian_automation.keyword_manager import KeywordManager
+from src.obsidian_automation.keyword_tagger import KeywordTagger
+
+KEYWORDS_DATA = {
+    "categories": {
+        "field": ["CV", "NLP"],
+        "task": ["SemanticSegmentation", "Segmentation", "ObjectDetection"],
+        "method": ["SelfSupervisedLearning", "KnowledgeDistillation"],
+        "architecture": ["ViT", "Transformer", "CNN"],
+    },
+    "custom_keywords": ["ADE20K"],
+    "aliases": {"VisionTransformer": "ViT", "ComputerVision": "CV",
+                "DeepLearning": "DeepLearning"},
+    "prohibited_keywords": ["DeepLearning", "Model"],
+}
+
+PAPER_TEXT = ("We train a Vision Transformer with self-supervised learning for "
+              "semantic segmentation on ADE20K. Our ViT outperforms CNN and "
+              "deep learning baselines in computer vision. Semantic "
+              "segmentation masks are refined by a transformer decoder.")
+
+
+class TestKeywordTagger:
+    """keyword_tagger.pyのテスト"""
+
+    def test_count_matches_surface_forms_and_aliases(self):
+        """表記揺れ・エイリアスを正規のキーワードとして数えるかのテスト"""
+        counts = KeywordTagger(KEYWORDS_DATA).count_matches(PAPER_TEXT)
+
+        assert counts["ViT"] == 2  # "Vision Transformer" と "ViT"
+        assert counts["SelfSupervisedLearning"] == 1
+        assert counts["CV"] == 1
+        assert counts["ADE20K"] == 1
+        # 最長一致のため "semantic segmentation" は Segmentation として数えない
+        assert counts["SemanticSegmentation"] == 2
+        assert "Segmentation" not in counts
+        assert counts["Transformer"] == 1
+
+    def test_prohibited_keywords_not_matched(self):
+        """禁止キーワードは付与しないかのテスト"""
+        counts = KeywordTagger(KEYWORDS_DATA).count_matches(PAPER_TEXT)
+        assert "DeepLearning" not in counts
+
+    def test_vault_idf_demotes_common_keywords(self):
+        """Vault内の多くのノートに出現するキーワードの順位が下がるかのテスト"""
+        text = "semantic segmentation with a cnn. cnn cnn"
+        tagger = KeywordTagger(KEYWORDS_DATA)
+        assert tagger.tag_keywords(text)[0] == "CNN"
+
+        with tempfile.TemporaryDirectory() as note_folder:
+            for i in range(5):
+                with open(os.path.join(note_folder, f"note{i}.md"), 'w',
+                          encoding='utf-8') as f:
+                    f.write("> #CNN\n> #CV")
+            tagger.fit_vault(note_folder)
+
+        assert tagger.document_count == 5
+        assert tagger.tag_keywords(text)[0] == "SemanticSegmentation"
+
+    def test_process_generated_keywords_cross_check(self):
+        """ローカルのタガーの結果でLLMのキーワードを補完できるかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = KeywordManager(os.path.join(temp_dir, "keywords.json"))
+            offline = KeywordTagger(manager.keywords_data).tag_keywords(PAPER_TEXT)
+            keywords = manager.process_generated_keywords(
+                "#ViT #CNN", offline, max_added=1)
+
+        assert keywords[:2] == ["ViT", "CNN"]
+        assert len(keywords) == 3
+        assert keywords[2] in offline
+
+    def test_summary_without_keyword_uses_tagger(self):
+        """LLMがキーワードを返さない場合にローカルのタガーで付与するかのテスト"""
+        tagger = KeywordTagger(KEYWORDS_DATA)
+        with patch.object(pdf_processor, 'get_keyword_tagger',
+                          return_value=tagger), \
+                patch.object(pdf_processor, 'KEYWORD_TAGGER', 'fallback'):
+            result = pdf_processor.build_summary_result(
+                {'abstract': 'text', 'keyword': ''}, PAPER_TEXT)
+
+        assert result['keyword'].startswith('#')
+        assert '#ViT' in result['keyword']
+        assert '\n> ' in result['keyword']
+
+    def test_tagger_disabled(self):
+        """KEYWORD_TAGGER=offの場合は付与しないかのテスト"""
+        with patch.object(pdf_processor, 'KEYWORD_TAGGER', 'off'):
+            assert pdf_processor.tag_keywords_offline(PAPER_TEXT) == ''
+
+    def test_get_keyword_tagger_cached(self):
+        """同じ語彙ファイルとVaultではタガーを再構築しないかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            keywords_file = os.path.join(temp_dir, "keywords.json")
+            first = keyword_tagger.get_keyword_tagger(keywords_file, temp_dir)
+            second = keyword_tagger.get_keyword_tagger(keywords_file, temp_dir)
+
+        assert first is second
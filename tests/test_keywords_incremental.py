@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from src.obsidian_automation.keywords_reconstructor import KeywordsReconstructor
+
+KEYWORDS = {
+    "categories": {
+        "field": ["CV", "NLP"],
+        "theme": ["Self-supervised"],
+        "task": ["SemanticSegmentation", "ObjectDetection"],
+        "method": ["KnowledgeDistillation"],
+        "architecture": ["Transformer", "CNN"],
+    },
+    "custom_keywords": ["MaskedImageModeling"],
+    "aliases": {"ComputerVision": "CV"},
+    "prohibited_keywords": ["Model"],
+}
+
+
+class FakeReviewer:
+    """プロンプト中のJSONに決定的なルールで精査結果を返すフェイク
+
+    - X で始まる custom_keywords は削除
+    - Net で終わる custom_keywords は architecture へ移動（field への移動も試みる）
+    - Seg で始まる custom_keywords には aliases を追加
+    """
+
+    def __init__(self, delay_for=None):
+        self.payloads = []
+        self.delay_for = delay_for or {}
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, model_name="gemini-2.5-flash"):
+        payload = json.loads(prompt)
+        with self._lock:
+            self.payloads.append(payload)
+        result = json.loads(json.dumps(payload))
+        result["deleted"] = []
+        kept = []
+        for term in payload["custom_keywords"]:
+            if term.startswith("X"):
+                result["deleted"].append(term)
+            elif term.endswith("Net"):
+                result["categories"]["architecture"].append(term)
+                result["categories"]["field"].append(term)
+            else:
+                kept.append(term)
+            if term.startswith("Seg"):
+                result["aliases"][term] = "SEG"
+            for key, seconds in self.delay_for.items():
+                if term.startswith(key):
+                    time.sleep(seconds)
+        result["custom_keywords"] = kept
+        return json.dumps(result)
+
+
+def make_reconstructor(temp_dir, keywords=KEYWORDS):
+    keywords_file = os.path.join(temp_dir, "keywords.json")
+    with open(keywords_file, 'w', encoding='utf-8') as f:
+        json.dump(keywords, f)
+    prompt_file = os.path.join(temp_dir, "prompt.md")
+    with open(prompt_file, 'w', encoding='utf-8') as f:
+        f.write("{JSON_SECTION}")
+    reconstructor = KeywordsReconstructor(keywords_file, prompt_file)
+    reconstructor.note_folder = os.path.join(temp_dir, "notes")
+    os.makedirs(reconstructor.note_folder)
+    return reconstructor
+
+
+def add_custom_keywords(reconstructor, terms):
+    data = reconstructor.load_keywords()
+    data["custom_keywords"].extend(terms)
+    reconstructor.update_keywords_file(data)
+
+
+class TestIncrementalReconstruction:
+    """差分・シャード分割によるキーワード再構成のテスト"""
+
+    def test_incremental_submits_only_new_keywords(self):
+        """前回以降に追加されたキーワードのみを精査するかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            reconstructor = make_reconstructor(temp_dir)
+            reconstructor.call_gemini_api = FakeReviewer()
+            assert reconstructor.reconstruct_keywords(incremental=True)
+
+            add_custom_keywords(reconstructor, ["ResNeXtNet", "XYZ"])
+            reviewer = FakeReviewer()
+            reconstructor.call_gemini_api = reviewer
+            assert reconstructor.reconstruct_keywords(incremental=True)
+            data = reconstructor.load_keywords()
+
+            # 追加のない状態ではAPIを呼ばない
+            reconstructor.call_gemini_api = FakeReviewer()
+            assert reconstructor.reconstruct_keywords(incremental=True)
+            assert reconstructor.call_gemini_api.payloads == []
+
+        assert len(reviewer.payloads) == 1
+        assert reviewer.payloads[0]["custom_keywords"] == ["ResNeXtNet", "XYZ"]
+        # 既存のキーワードは判断材料として含まれる
+        assert "Transformer" in reviewer.payloads[0]["categories"]["architecture"]
+        assert "ResNeXtNet" in data["categories"]["architecture"]
+        assert "ResNeXtNet" not in data["categories"]["field"]
+        assert "XYZ" not in data["custom_keywords"]
+        assert data["custom_keywords"] == ["MaskedImageModeling"]
+
+    def test_large_vocabulary_sharded(self):
+        """語彙が大きい場合にshard_size件ごとのシャードに分けるかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            keywords = json.loads(json.dumps(KEYWORDS))
+            keywords["custom_keywords"] = [f"Term{i:03d}" for i in range(25)]
+            reconstructor = make_reconstructor(temp_dir, keywords)
+            reconstructor.shard_size = 10
+            reviewer = FakeReviewer()
+            reconstructor.call_gemini_api = reviewer
+            assert reconstructor.reconstruct_keywords()
+
+        custom_shards = [payload["custom_keywords"] for payload in reviewer.payloads
+                         if payload["custom_keywords"]]
+        assert sorted(len(shard) for shard in custom_shards) == [5, 10, 10]
+        assert all(len(payload["categories"]["task"]) <= 12
+                   for payload in reviewer.payloads)
+
+    def test_merge_is_deterministic_regardless_of_completion_order(self):
+        """シャードの完了順が変わってもマージ結果が同じになるかのテスト"""
+        terms = ["SegA", "SegB", "XDrop", "LiteNet", "Plain"]
+        outputs = []
+        for delay_for in ({"SegA": 0.05}, {"LiteNet": 0.05}):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                keywords = json.loads(json.dumps(KEYWORDS))
+                keywords["custom_keywords"] = terms
+                reconstructor = make_reconstructor(temp_dir, keywords)
+                reconstructor.shard_size = 1
+                reconstructor.max_workers = 5
+                reconstructor.call_gemini_api = FakeReviewer(delay_for)
+                assert reconstructor.reconstruct_keywords()
+                with open(reconstructor.keywords_file, encoding='utf-8') as f:
+                    outputs.append(f.read())
+
+        assert outputs[0] == outputs[1]
+        data = json.loads(outputs[0])
+        assert data["custom_keywords"] == ["SegA", "SegB", "Plain"]
+        assert data["categories"]["architecture"][-1] == "LiteNet"
+        assert data["aliases"]["SegA"] == "SEG"
+        assert data["aliases"]["ComputerVision"] == "CV"
+
+    def test_failed_shard_retried_next_time(self):
+        """精査に失敗したシャードのキーワードは次回も精査対象に残るかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            reconstructor = make_reconstructor(temp_dir)
+            reconstructor.call_gemini_api = FakeReviewer()
+            assert reconstructor.reconstruct_keywords(incremental=True)
+
+            add_custom_keywords(reconstructor, ["NewTerm"])
+            reconstructor.call_gemini_api = lambda prompt: ""
+            assert not reconstructor.reconstruct_keywords(incremental=True)
+
+            reviewer = FakeReviewer()
+            reconstructor.call_gemini_api = reviewer
+            assert reconstructor.reconstruct_keywords(incremental=True)
+
+        assert reviewer.payloads[0]["custom_keywords"] == ["NewTerm"]
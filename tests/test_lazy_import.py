@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+from src.obsidian_automation.lazy_import import lazy_import
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestLazyImport:
+    """lazy_import.pyのテスト"""
+
+    def test_module_loaded_on_first_attribute_access(self):
+        """最初の属性アクセスでインポートと初期化が一度だけ行われるかのテスト"""
+        loaded = []
+        module = lazy_import("json", on_import=loaded.append)
+
+        assert loaded == []
+        assert module.dumps({"a": 1}) == '{"a": 1}'
+        assert module.loads("[]") == []
+        assert len(loaded) == 1
+
+    def test_import_main_does_not_load_heavy_libraries(self):
+        """main.pyのインポートでGemini SDK・PyPDF2・pyzoteroが読み込まれないかのテスト"""
+        code = ("import sys, main; "
+                "heavy = ['google.generativeai', 'PyPDF2', 'pyzotero']; "
+                "print([m for m in heavy if m in sys.modules])")
+        env = {k: v for k, v in os.environ.items()
+               if k not in ("ZOTERO_API_KEY", "GEMINI_API_KEY")}
+        result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, env=env)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
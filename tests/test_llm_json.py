@@ -0,0 +1,119 @@
+import os
+from unittest.mock import patch
+
+from src.obsidian_automation import obsidian_note_creator
+from src.obsidian_automation.llm_json import (
+    build_object_schema,
+    get_prompt_fields,
+    get_template_llm_fields,
+    json_generation_config,
+    parse_llm_json,
+)
+from src.obsidian_automation.pdf_processor import get_summary_schema
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestLLMJson:
+    """llm_json.pyのテスト"""
+
+    def test_get_template_llm_fields(self):
+        """テンプレートからZotero以外のフィールドだけを取り出すかのテスト"""
+        template = ("title: {{title}}\nyear: {{date | format('YYYY')}}\n"
+                    "{{abstract}}\n{{method}}\n{{abstract}}\n"
+                    "{{bibliography.slice(4)}}\n{{info_block}}")
+        assert get_template_llm_fields(template) == [
+            'abstract', 'method', 'publication']
+
+    def test_get_template_llm_fields_repository_template(self):
+        """同梱のテンプレートから要約フィールドを取り出せるかのテスト"""
+        with open(os.path.join(PROJECT_ROOT, "template", "template.md"),
+                  encoding='utf-8') as f:
+            fields = get_template_llm_fields(f.read())
+
+        for field in ('field', 'abstract', 'glossary', 'ablation', 'theme',
+                      'keyword', 'publication'):
+            assert field in fields
+        assert 'title' not in fields
+        assert 'citekey' not in fields
+
+    def test_prompt_fields_override_zotero_placeholders(self):
+        """プロンプトで出力を指示しているフィールドはZoteroと同名でも含めるかのテスト"""
+        raw_prompt = '{\n"issue": "\n課題\n",\n"method": "\n手法\n"\n}'
+        assert get_prompt_fields(raw_prompt) == ['issue', 'method']
+        template = "{{title}}\n{{issue}}\n{{volume}}\n{{method}}"
+        assert get_template_llm_fields(template) == ['method', 'publication']
+        assert get_template_llm_fields(template, get_prompt_fields(raw_prompt)) == [
+            'issue', 'method', 'publication']
+
+    def test_summary_schema_includes_issue(self):
+        """同梱のテンプレートとプロンプトの要約スキーマにissueが含まれるかのテスト"""
+        template_path = os.path.join(PROJECT_ROOT, "template", "template.md")
+        with patch.object(obsidian_note_creator, 'TEMPLATE_PATH', template_path):
+            schema = get_summary_schema()
+        assert 'issue' in schema['properties']
+        assert 'issue' in schema['required']
+        assert 'title' not in schema['properties']
+
+    def test_build_object_schema(self):
+        """全フィールドが必須の文字列スキーマになるかのテスト"""
+        schema = build_object_schema(['a', 'b'])
+        assert schema['type'] == 'object'
+        assert schema['properties']['a'] == {'type': 'string'}
+        assert schema['required'] == ['a', 'b']
+        config = json_generation_config(schema)
+        assert config['response_mime_type'] == 'application/json'
+        assert config['response_schema'] is schema
+
+    def test_parse_llm_json_plain(self):
+        """JSONモードの出力をそのまま解析できるかのテスト"""
+        assert parse_llm_json('{"a": "x", "b": ["y"]}') == {'a': 'x', 'b': ['y']}
+
+    def test_parse_llm_json_fenced_with_text(self):
+        """コードフェンスと前後の説明文を除去して解析できるかのテスト"""
+        text = 'Here:\n```json\n{"a": "x"}\n```\nThanks'
+        assert parse_llm_json(text) == {'a': 'x'}
+
+    def test_parse_llm_json_invalid_backslash(self):
+        """LaTeXの無効なバックスラッシュを修正して解析できるかのテスト"""
+        assert parse_llm_json('{"a": "$\\alpha$"}') == {'a': '$\\alpha$'}
+
+    def test_parse_llm_json_field_fallback(self):
+        """壊れたJSONからフィールドごとに抽出できるかのテスト"""
+        text = '{"a": "x", "b": "y", "c": [broken'
+        assert parse_llm_json(text) == {'a': 'x', 'b': 'y'}
+
+    def test_parse_llm_json_not_json(self):
+        """JSONでないテキストではNoneを返すかのテスト"""
+        assert parse_llm_json("This is not JSON at all") is None
+        assert parse_llm_json("") is None
+
+
+class TestSummarizeJsonMode:
+    """summarize_textがJSONモードで要約を依頼するかのテスト"""
+
+    def test_summarize_text_requests_schema(self):
+        """テンプレートから作ったresponse_schemaが渡されるかのテスト"""
+        from unittest.mock import patch
+
+        from benchmarks.fakes import FakeGenAI
+        from src.obsidian_automation import pdf_processor
+
+        with open(os.path.join(PROJECT_ROOT, "template", "template.md"),
+                  encoding='utf-8') as f:
+            template_content = f.read()
+
+        fake_genai = FakeGenAI()
+        with patch.object(pdf_processor, 'genai', fake_genai), \
+                patch.object(pdf_processor, 'load_template',
+                             return_value=template_content), \
+                patch.object(pdf_processor, 'load_custom_prompt',
+                             return_value=None), \
+                patch.object(pdf_processor, 'KeywordManager'):
+            result = pdf_processor.summarize_text("Paper text")
+
+        assert result is not None
+        config = fake_genai.calls[0]['kwargs']['generation_config']
+        assert config['response_mime_type'] == 'application/json'
+        assert 'abstract' in config['response_schema']['properties']
+        assert 'title' not in config['response_schema']['properties']
@@ -1,4 +1,4 @@
-from main import get_existing_notes, process_pdf, main
+from main import get_existing_notes, get_note_index, process_pdf, main
 import pytest
 import os
 import tempfile
@@ -12,6 +12,12 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 class TestMain:
     """main.pyのテスト"""
 
+    @pytest.fixture(autouse=True)
+    def no_text_cache(self):
+        """抽出テキストをプロジェクトのdata/にキャッシュしない"""
+        with patch('main.save_cached_text'):
+            yield
+
     @pytest.fixture
     def temp_note_folder(self):
         """テスト用の一時ノートフォルダ"""
@@ -63,7 +69,7 @@ class TestMain:
 
     @patch('main.create_obsidian_note')
     @patch('main.get_zotero_item_info')
-    @patch('main.summarize_text')
+    @patch('main.summarize_routed')
     @patch('main.extract_text_from_pdf')
     def test_process_pdf_success(self, mock_extract, mock_summarize,
                                  mock_zotero, mock_create_note):
@@ -79,9 +85,10 @@ class TestMain:
 
         # アサーション
         assert result is True
-        mock_extract.assert_called_once_with("test.pdf")
+        mock_extract.assert_called_once()
+        assert mock_extract.call_args[0][0].path == "test.pdf"
         mock_summarize.assert_called_once_with("Test PDF content")
-        mock_zotero.assert_called_once_with("test")
+        mock_zotero.assert_called_once_with("test", "test.pdf")
         mock_create_note.assert_called_once()
 
     @patch('main.extract_text_from_pdf')
@@ -92,11 +99,12 @@ class TestMain:
         result = process_pdf("test.pdf")
 
         assert result is False
-        mock_extract.assert_called_once_with("test.pdf")
+        mock_extract.assert_called_once()
+        assert mock_extract.call_args[0][0].path == "test.pdf"
 
     @patch('main.create_obsidian_note')
     @patch('main.get_zotero_item_info')
-    @patch('main.summarize_text')
+    @patch('main.summarize_routed')
     @patch('main.extract_text_from_pdf')
     def test_process_pdf_summarize_failure(self, mock_extract, mock_summarize,
                                            mock_zotero, mock_create_note):
@@ -114,7 +122,7 @@ class TestMain:
 
     @patch('main.create_obsidian_note')
     @patch('main.get_zotero_item_info')
-    @patch('main.summarize_text')
+    @patch('main.summarize_routed')
     @patch('main.extract_text_from_pdf')
     def test_process_pdf_zotero_failure(self, mock_extract, mock_summarize,
                                         mock_zotero, mock_create_note):
@@ -132,7 +140,7 @@ class TestMain:
 
     @patch('main.create_obsidian_note')
     @patch('main.get_zotero_item_info')
-    @patch('main.summarize_text')
+    @patch('main.summarize_routed')
     @patch('main.extract_text_from_pdf')
     def test_process_pdf_note_creation_failure(self, mock_extract, mock_summarize,
                                                mock_zotero, mock_create_note):
@@ -146,37 +154,77 @@ class TestMain:
 
         assert result is False
 
+    @patch('main.update_vault_indexes')
+    @patch('main.validate_config', return_value=True)
+    @patch('main.DUPLICATE_DETECTION', False)
+    @patch('main.PDF_FOLDER', '/path/to')
     @patch('main.process_pdf')
-    @patch('main.get_existing_notes')
+    @patch('main.get_note_index')
     @patch('main.os.path.exists')
-    @patch('main.glob.glob')
-    def test_main_function(self, mock_glob, mock_exists, mock_get_notes,
-                           mock_process):
+    @patch('main.scan_files')
+    def test_main_function(self, mock_scan, mock_exists, mock_get_notes,
+                           mock_process, mock_validate, mock_update_index):
         """main関数のテスト"""
         # モックの設定
         mock_exists.return_value = True
-        mock_get_notes.return_value = {"existing_note"}
-        mock_glob.return_value = ["/path/to/test1.pdf",
+        mock_get_notes.return_value = {"existing_note": "/vault/existing_note.md"}
+        mock_scan.return_value = ["/path/to/test1.pdf",
                                   "/path/to/existing_note.pdf"]
         mock_process.return_value = True
 
         with patch('builtins.print'):  # print文をモック
-            main()
+            main([])
 
         # 既存ノートと同名のPDFはスキップされ、新しいPDFのみ処理される
-        mock_process.assert_called_once_with("/path/to/test1.pdf")
+        mock_process.assert_called_once_with(
+            "/path/to/test1.pdf", fingerprints=None,
+            note_index={"existing_note": "/vault/existing_note.md"},
+            prepared_papers={})
 
+    @patch('main.validate_config', return_value=True)
     @patch('main.os.path.exists')
-    def test_main_pdf_folder_not_exists(self, mock_exists):
+    def test_main_pdf_folder_not_exists(self, mock_exists, mock_validate):
         """PDFフォルダが存在しない場合のテスト"""
         mock_exists.return_value = False
 
         with patch('builtins.print') as mock_print:
-            main()
+            main([])
 
         # エラーメッセージが出力されることを確認
         mock_print.assert_called()
 
+    def test_get_existing_notes_recursive(self, temp_note_folder):
+        """サブフォルダとNOTE_FOLDERSのノートも既存のノートとして扱うかのテスト"""
+        with tempfile.TemporaryDirectory() as other_vault:
+            nested = os.path.join(temp_note_folder, "2024", "vision")
+            os.makedirs(nested)
+            os.makedirs(os.path.join(temp_note_folder, ".trash"))
+            for folder, name in ((nested, "nested_paper"),
+                                 (os.path.join(temp_note_folder, ".trash"), "deleted"),
+                                 (other_vault, "other_paper")):
+                with open(os.path.join(folder, f"{name}.md"), 'w', encoding='utf-8') as f:
+                    f.write("# Test Note")
+
+            with patch('main.NOTE_FOLDER', temp_note_folder), \
+                    patch('main.NOTE_FOLDERS', [other_vault]):
+                note_index = get_note_index()
+
+            assert note_index["nested_paper"] == os.path.join(nested, "nested_paper.md")
+            assert "other_paper" in note_index
+            assert "deleted" not in note_index
+            assert len(note_index) == 5
+
+    @patch('main.process_pdf')
+    @patch('main.regenerate_fields')
+    @patch('main.validate_config', return_value=True)
+    def test_main_fields_only(self, mock_validate, mock_regenerate, mock_process):
+        """--fieldsを指定した場合はPDFを処理せずフィールドだけを作り直すかのテスト"""
+        main(['--fields', 'ablation, result', '--notes', 'Attention*', '-w', '2'])
+
+        mock_regenerate.assert_called_once_with(['ablation', 'result'], ['Attention*'],
+                                                workers=2)
+        mock_process.assert_not_called()
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,115 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.fakes import FakeGenAI, FakeResponse, FakeUsageMetadata
+from src.obsidian_automation import model_router, pdf_processor
+from src.obsidian_automation.model_router import (
+    choose_route,
+    get_route_counts,
+    reset_route_counts,
+    summarize_routed,
+)
+from src.obsidian_automation.pdf_processor import (
+    clean_text,
+    select_model_name,
+    split_text_chunks,
+    summarize_chunked,
+)
+from src.obsidian_automation.usage_ledger import get_ledger_path, record_usage
+
+
+def read_ledger():
+    with open(get_ledger_path(), 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def summarize_patches(fake):
+    return [patch.object(pdf_processor, 'genai', fake),
+            patch.object(pdf_processor, 'load_custom_prompt',
+                         return_value=clean_text("Static prompt")),
+            patch.object(pdf_processor, 'KeywordManager')]
+
+
+class TestModelRouter:
+    """model_router.pyのテスト"""
+
+    @pytest.fixture(autouse=True)
+    def routing_enabled(self):
+        reset_route_counts()
+        with patch.object(model_router, '_enabled', True), \
+                patch.object(model_router, 'GEMINI_LITE_MAX_TOKENS', 10000), \
+                patch.object(model_router, 'GEMINI_CHUNK_MIN_TOKENS', 200000):
+            yield
+        reset_route_counts()
+
+    def run_summarize(self, fake, func, *args):
+        patches = summarize_patches(fake)
+        for p in patches:
+            p.start()
+        try:
+            return func(*args)
+        finally:
+            for p in patches:
+                p.stop()
+
+    def test_choose_route(self):
+        """推定トークン数でルートを選ぶかのテスト"""
+        assert choose_route(6000) == "lite"
+        assert choose_route(40000) == "standard"
+        assert choose_route(250000) == "chunked"
+        with patch.object(model_router, '_enabled', False):
+            assert choose_route(6000) == "standard"
+            assert choose_route(250000) == "standard"
+
+    def test_latency_target(self):
+        """観測した速度で目標時間を超えそうな論文は軽量モデルに回すかのテスト"""
+        with patch.object(model_router, 'GEMINI_LATENCY_TARGET', 20.0):
+            # 観測前は見積もれないため通常のモデルを使う
+            assert choose_route(40000) == "standard"
+            # 1万トークンに10秒 -> 4万トークンは40秒かかる見込み
+            record_usage(FakeResponse("{}", FakeUsageMetadata(10000, 100)),
+                         model_router.GEMINI_MODEL, 10.0)
+            assert choose_route(40000) == "lite"
+            assert choose_route(15000) == "standard"
+
+    def test_summarize_routed_records_route(self):
+        """短い論文は軽量モデルで要約し、ルートを台帳と集計に記録するかのテスト"""
+        fake = FakeGenAI()
+        summary = self.run_summarize(fake, summarize_routed, "Synthetic Paper 0001 short")
+
+        assert summary['abstract'] == "abstract of paper 0001"
+        assert fake.calls[0]['model'] == model_router.GEMINI_LITE_MODEL
+        entry, = read_ledger()
+        assert entry['route'] == "lite"
+        assert entry['model'] == model_router.GEMINI_LITE_MODEL
+        assert get_route_counts() == {'lite': 1, 'standard': 0, 'chunked': 0}
+
+    def test_lite_model_unavailable(self):
+        """軽量モデルが使えない場合は通常のモデルで要約するかのテスト"""
+        fake = FakeGenAI(models=("gemini-2.5-flash", "gemini-1.5-flash"))
+        with patch.object(pdf_processor, 'genai', fake):
+            assert select_model_name("gemini-2.5-flash-lite") == "gemini-2.5-flash"
+
+    def test_split_text_chunks(self):
+        """テキストを文の区切りで上限以下の部分に分けるかのテスト"""
+        text = " ".join(f"Sentence number {i} of the paper." for i in range(200))
+        chunks = split_text_chunks(text, 500)
+        assert all(len(chunk) <= 500 for chunk in chunks)
+        assert all(chunk.endswith('.') for chunk in chunks)
+        assert " ".join(chunks) == text
+
+    def test_summarize_chunked(self):
+        """長い論文は部分ごとに要点を抜き出してから要約するかのテスト"""
+        fake = FakeGenAI()
+        text = "Synthetic Paper 0007 " + "long thesis text. " * 400
+        summary = self.run_summarize(fake, summarize_chunked, text, "gemini-2.5-flash", 500)
+
+        chunk_calls = [call for call in fake.calls if 'generation_config' not in call['kwargs']]
+        assert len(chunk_calls) == len(split_text_chunks(clean_text(text), 2000))
+        assert len(fake.calls) == len(chunk_calls) + 1
+        # 最後の要約には論文本文ではなく抜き出した要点だけを送る
+        assert "long thesis text" not in fake.calls[-1]['contents']
+        assert summary['abstract'] == "abstract of paper 0007"
+        assert [entry['kind'] for entry in read_ledger()][-1] == 'summary'
@@ -0,0 +1,112 @@
+import os
+import tempfile
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from src.obsidian_automation import note_artifacts, note_rerenderer, obsidian_note_creator
+from src.obsidian_automation.note_rerenderer import (
+    NO_ARTIFACTS,
+    RERENDERED,
+    UP_TO_DATE,
+    get_user_sections,
+    rerender_notes,
+)
+from src.obsidian_automation.obsidian_note_creator import create_obsidian_note, link_duplicate_pdf
+
+TEMPLATE = """---
+title: "{{title}}"
+year: "{{date | format('YYYY')}}"
+dateread: '{{importDate | format("YYYY-MM-DD")}}'
+rating: 0
+---
+
+> [!Data]
+> [[{{title}}.pdf]]
+
+# Result
+{{result}}
+
+# Ablation
+{{ablation}}
+
+# Memo
+
+# Comments
+
+# Citation
+> [!Keyword]-
+> {{keyword}}"""
+
+ZOTERO_DATA = {'title': 'Paper', 'date': '2024-05-01', 'creators': []}
+SUMMARY = {'result': '## Experiment\nbetter', 'ablation': 'old ablation', 'keyword': '#Tag'}
+
+
+class TestNoteRerenderer:
+    """note_rerenderer.pyのテスト"""
+
+    def setup_vault(self, stack, folder):
+        notes = os.path.join(folder, "notes")
+        os.makedirs(notes)
+        template_path = os.path.join(folder, "template.md")
+        with open(template_path, 'w', encoding='utf-8') as f:
+            f.write(TEMPLATE)
+        for module in (obsidian_note_creator, note_rerenderer):
+            stack.enter_context(patch.object(module, 'NOTE_FOLDER', notes))
+        stack.enter_context(patch.object(note_rerenderer, 'update_vault_indexes'))
+        stack.enter_context(patch.object(note_rerenderer, 'NOTE_FOLDERS', []))
+        stack.enter_context(patch.object(obsidian_note_creator, 'TEMPLATE_PATH', template_path))
+        stack.enter_context(patch.object(note_artifacts, 'DATA_DIR', folder))
+        return notes, template_path
+
+    def test_get_user_sections(self):
+        """本文にプレースホルダーがない見出しだけをユーザーの見出しとみなすかのテスト"""
+        assert get_user_sections(TEMPLATE) == ['# Memo', '# Comments']
+
+    def test_rerender_after_template_change(self):
+        """テンプレートの変更を反映し、ユーザーが書き込んだ部分は残すかのテスト"""
+        with tempfile.TemporaryDirectory() as folder, ExitStack() as stack:
+            notes, template_path = self.setup_vault(stack, folder)
+            create_obsidian_note("/pdfs/Paper.pdf", dict(ZOTERO_DATA), dict(SUMMARY))
+            note_path = os.path.join(notes, "Paper.md")
+            with open(note_path, 'r', encoding='utf-8') as f:
+                original = f.read()
+            dateread = original.split("dateread: ")[1].split("\n")[0]
+
+            # Obsidianでの編集（評価・メモ・重複PDFのリンク）
+            edited = (original.replace("rating: 0", "rating: 4")
+                      .replace("# Memo\n", "# Memo\n自分のメモ\n## 疑問点\n- なぜ?\n"))
+            with open(note_path, 'w', encoding='utf-8') as f:
+                f.write(edited)
+            link_duplicate_pdf("Paper", "/pdfs/Paper v2.pdf", note_path)
+
+            with open(template_path, 'w', encoding='utf-8') as f:
+                f.write(TEMPLATE.replace("# Ablation\n", "# Ablation Study\n"))
+            with patch('src.obsidian_automation.zotero_integrator.get_zotero_item_info') \
+                    as mock_zotero:
+                counts = rerender_notes()
+
+            assert counts[RERENDERED] == 1
+            mock_zotero.assert_not_called()
+            with open(note_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            assert "# Ablation Study\nold ablation\n" in content
+            assert "rating: 4" in content
+            assert f"dateread: {dateread}\n" in content
+            assert "# Memo\n自分のメモ\n## 疑問点\n- なぜ?\n\n# Comments" in content
+            assert "> [[Paper.pdf]]\n> [[Paper v2.pdf]]" in content
+            assert "## Experiment\nbetter" in content
+
+            # 同じテンプレートのままなら作り直さない
+            assert rerender_notes()[UP_TO_DATE] == 1
+
+    def test_rerender_without_artifacts(self):
+        """作成時のデータがないノートは書き換えないかのテスト"""
+        with tempfile.TemporaryDirectory() as folder, ExitStack() as stack:
+            notes, _ = self.setup_vault(stack, folder)
+            note_path = os.path.join(notes, "Manual.md")
+            with open(note_path, 'w', encoding='utf-8') as f:
+                f.write("# 手書きのノート\n")
+
+            assert rerender_notes()[NO_ARTIFACTS] == 1
+            with open(note_path, 'r', encoding='utf-8') as f:
+                assert f.read() == "# 手書きのノート\n"
@@ -0,0 +1,67 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+import pytest
+
+from src.obsidian_automation import note_writer, obsidian_note_creator
+from src.obsidian_automation.note_writer import get_write_counts, reset_write_counts, write_note
+
+
+class TestNoteWriter:
+    """note_writer.pyのテスト"""
+
+    @pytest.fixture(autouse=True)
+    def reset_counts(self):
+        reset_write_counts()
+        yield
+        reset_write_counts()
+
+    def test_skip_identical_content(self):
+        """内容が同じ場合は書き込まず、省略した数を数えるかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            note_path = os.path.join(folder, "Paper.md")
+            assert write_note(note_path, "# Paper\n日本語のノート\n")
+            mtime = os.stat(note_path).st_mtime_ns
+
+            assert not write_note(note_path, "# Paper\n日本語のノート\n")
+            assert os.stat(note_path).st_mtime_ns == mtime
+            assert write_note(note_path, "# Paper\n")
+            assert get_write_counts() == {'written': 2, 'unchanged': 1}
+            with open(note_path, 'r', encoding='utf-8') as f:
+                assert f.read() == "# Paper\n"
+            assert os.listdir(folder) == ["Paper.md"]
+
+    def test_failed_write_keeps_original(self):
+        """置き換えに失敗しても元のノートが残り、一時ファイルを消すかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            note_path = os.path.join(folder, "Paper.md")
+            write_note(note_path, "元の内容")
+            with patch.object(note_writer.os, 'replace', side_effect=OSError("disk full")):
+                with pytest.raises(OSError):
+                    write_note(note_path, "新しい内容")
+
+            with open(note_path, 'r', encoding='utf-8') as f:
+                assert f.read() == "元の内容"
+            assert os.listdir(folder) == ["Paper.md"]
+
+    def test_keep_permissions(self):
+        """既存のノートのパーミッションを引き継ぐかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            note_path = os.path.join(folder, "Paper.md")
+            write_note(note_path, "元の内容")
+            os.chmod(note_path, 0o640)
+            write_note(note_path, "新しい内容")
+            assert os.stat(note_path).st_mode & 0o777 == 0o640
+
+    def test_create_note_twice(self):
+        """同じノートを作り直しても書き込まないかのテスト"""
+        with tempfile.TemporaryDirectory() as folder, \
+                patch.object(obsidian_note_creator, 'NOTE_FOLDER', folder), \
+                patch.object(obsidian_note_creator, 'load_template', return_value=None):
+            obsidian_note_creator.create_obsidian_note(
+                "/pdfs/Paper.pdf", None, {'abstract': '要約'})
+            obsidian_note_creator.create_obsidian_note(
+                "/pdfs/Paper.pdf", None, {'abstract': '要約'})
+
+        assert get_write_counts() == {'written': 1, 'unchanged': 1}
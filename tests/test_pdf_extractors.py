@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+import pytest
+
+from benchmarks.synthetic_pdf import write_pdf
+from src.obsidian_automation.pdf_extractors import (
+    EXTRACTORS,
+    PDFExtractor,
+    PyPDF2Extractor,
+    get_extractor,
+)
+from src.obsidian_automation.pdf_processor import extract_text_from_pdf
+
+
+class TestPDFExtractors:
+    """pdf_extractors.pyのテスト"""
+
+    @pytest.fixture
+    def sample_pdf(self):
+        """2ページのテスト用PDF"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = os.path.join(temp_dir, "sample.pdf")
+            write_pdf(pdf_path, ["First page text", "Second page text"])
+            yield pdf_path
+
+    def test_get_extractor_default(self):
+        """デフォルトでPyPDF2が使われるかのテスト"""
+        assert isinstance(get_extractor(), PyPDF2Extractor)
+
+    def test_get_extractor_unknown_falls_back(self):
+        """未知のバックエンド名ではPyPDF2にフォールバックするかのテスト"""
+        assert isinstance(get_extractor("unknown"), PyPDF2Extractor)
+
+    def test_get_extractor_not_installed_falls_back(self):
+        """未インストールのバックエンドではPyPDF2にフォールバックするかのテスト"""
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(EXTRACTORS["pdfminer"], "required_module",
+                       "not_installed_module_for_test")
+            assert isinstance(get_extractor("pdfminer"), PyPDF2Extractor)
+
+    def test_incomplete_backend_fails_on_creation(self):
+        """iter_page_textsを実装していないバックエンドは作成時にエラーになるかのテスト"""
+        class IncompleteExtractor(PDFExtractor):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            IncompleteExtractor()
+
+    @pytest.mark.parametrize("backend", sorted(EXTRACTORS))
+    def test_backends_extract_each_page(self, backend, sample_pdf):
+        """各バックエンドがページごとのテキストを返すかのテスト"""
+        extractor = EXTRACTORS[backend]()
+        if not extractor.is_available():
+            pytest.skip(f"{backend} is not installed")
+
+        pages = list(extractor.iter_page_texts(sample_pdf))
+
+        assert len(pages) == 2
+        assert "First page text" in pages[0]
+        assert "Second page text" in pages[1]
+
+    def test_extract_text_from_pdf_with_backend(self, sample_pdf):
+        """extract_text_from_pdfでバックエンドを指定できるかのテスト"""
+        text = extract_text_from_pdf(sample_pdf, extractor="pypdf2")
+        assert text == "First page textSecond page text"
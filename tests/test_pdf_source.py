@@ -0,0 +1,71 @@
+import hashlib
+import os
+import tempfile
+
+import pytest
+
+from benchmarks.synthetic_pdf import write_pdf
+from src.obsidian_automation.fingerprint import FingerprintStore
+from src.obsidian_automation.pdf_extractors import EXTRACTORS
+from src.obsidian_automation.pdf_processor import extract_text_from_pdf
+from src.obsidian_automation.pdf_source import PDFSource, open_pdf
+
+
+class TestPDFSource:
+    """pdf_source.pyのテスト"""
+
+    @pytest.fixture
+    def sample_pdf(self):
+        """3ページのテスト用PDF"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = os.path.join(temp_dir, "sample.pdf")
+            write_pdf(pdf_path, [f"Page {n} body" for n in range(1, 4)])
+            yield pdf_path
+
+    @pytest.mark.parametrize("use_mmap", [True, False])
+    def test_hash_and_extract_share_source(self, sample_pdf, use_mmap):
+        """同じPDFSourceからハッシュと抽出の両方ができるかのテスト"""
+        with open(sample_pdf, 'rb') as f:
+            expected = hashlib.sha256(f.read()).hexdigest()
+        with PDFSource(sample_pdf, use_mmap=use_mmap) as pdf:
+            assert pdf.sha256() == expected
+            assert extract_text_from_pdf(pdf) == "Page 1 bodyPage 2 bodyPage 3 body"
+            # 抽出の後でも先頭からハッシュを計算する
+            assert pdf.sha256() == expected
+            assert (pdf._mapping is not None) == use_mmap
+
+    @pytest.mark.parametrize("name", [name for name, extractor in EXTRACTORS.items()
+                                      if extractor().is_available()])
+    def test_extractors_read_mapping(self, sample_pdf, name):
+        """すべての抽出器がメモリマップから読めるかのテスト"""
+        with open_pdf(sample_pdf) as pdf:
+            text = extract_text_from_pdf(pdf, extractor=name)
+        assert "Page 3 body" in text
+
+    def test_close_releases_mapping(self, sample_pdf):
+        """抽出器に渡したストリームが残っていても閉じられるかのテスト"""
+        pdf = open_pdf(sample_pdf)
+        stream = pdf.stream()
+        assert stream.read(5) == b"%PDF-"
+        pdf.close()
+        assert stream.closed
+        assert pdf._mapping is None
+
+    def test_empty_file(self):
+        """空のファイルはメモリマップせずに読むかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = os.path.join(temp_dir, "empty.pdf")
+            open(pdf_path, 'wb').close()
+            with open_pdf(pdf_path) as pdf:
+                assert pdf.sha256() == hashlib.sha256(b'').hexdigest()
+                assert pdf.stream().read() == b''
+
+    def test_claim_hashes_shared_source(self, sample_pdf):
+        """重複検出が抽出に使ったPDFSourceからハッシュを計算するかのテスト"""
+        store = FingerprintStore(os.path.join(os.path.dirname(sample_pdf), "fp.json"))
+        with open_pdf(sample_pdf) as pdf:
+            text = extract_text_from_pdf(pdf)
+            assert store.claim(sample_pdf, text, pdf) is None
+        with open(sample_pdf, 'rb') as f:
+            expected = hashlib.sha256(f.read()).hexdigest()
+        assert store.data['papers']['sample']['sha256'] == expected
@@ -0,0 +1,44 @@
+import os
+import tempfile
+
+import pytest
+
+from benchmarks.synthetic_pdf import write_pdf
+from src.obsidian_automation.pdf_processor import extract_text_from_pdf, iter_pdf_pages
+
+
+class TestPDFStreaming:
+    """ページ単位のストリーミング抽出のテスト"""
+
+    @pytest.fixture
+    def sample_pdf(self):
+        """5ページのテスト用PDF"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = os.path.join(temp_dir, "sample.pdf")
+            write_pdf(pdf_path, [f"Page {n} body" for n in range(1, 6)])
+            yield pdf_path
+
+    def test_iter_pdf_pages_yields_cleaned_pages(self, sample_pdf):
+        """ページごとにクリーニング済みテキストが返るかのテスト"""
+        pages = list(iter_pdf_pages(sample_pdf))
+        assert pages == [f"Page {n} body" for n in range(1, 6)]
+
+    def test_iter_pdf_pages_max_pages(self, sample_pdf):
+        """max_pagesで読み込むページ数を制限できるかのテスト"""
+        pages = list(iter_pdf_pages(sample_pdf, max_pages=2))
+        assert pages == ["Page 1 body", "Page 2 body"]
+
+    def test_iter_pdf_pages_max_chars(self, sample_pdf):
+        """max_charsで合計文字数を制限できるかのテスト"""
+        text = ''.join(iter_pdf_pages(sample_pdf, max_chars=15))
+        assert text == "Page 1 bodyPage"
+        assert len(text) == 15
+
+    def test_extract_text_from_pdf_joins_pages(self, sample_pdf):
+        """extract_text_from_pdfが全ページを結合して返すかのテスト"""
+        text = extract_text_from_pdf(sample_pdf, max_pages=3)
+        assert text == "Page 1 bodyPage 2 bodyPage 3 body"
+
+    def test_extract_text_from_pdf_missing_file(self):
+        """存在しないファイルではNoneを返すかのテスト"""
+        assert extract_text_from_pdf("/nonexistent/file.pdf") is None
@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.fakes import FakeGenAI
+from src.obsidian_automation import pdf_processor, prompt_cache
+from src.obsidian_automation.pdf_processor import clean_text
+
+
+@pytest.fixture(autouse=True)
+def enable_cache():
+    """テストごとにキャッシュを有効化し、終了後に状態を元に戻す"""
+    with patch.object(prompt_cache, '_enabled', True):
+        yield
+    prompt_cache.release_context_caches()
+
+
+class TestPromptCache:
+    """prompt_cache.pyのテスト"""
+
+    def test_cache_reused_for_same_prefix(self):
+        """同じ固定部分ではキャッシュを1回だけ作成して再利用するかのテスト"""
+        fake = FakeGenAI()
+        first = prompt_cache.get_cached_model(fake, "gemini-2.5-flash", "prefix")
+        second = prompt_cache.get_cached_model(fake, "gemini-2.5-flash", "prefix")
+
+        assert len(fake.cached_contents) == 1
+        assert first.cached_content is second.cached_content
+        assert fake.cached_contents[0].model == "models/gemini-2.5-flash"
+        assert fake.cached_contents[0].contents == ["prefix"]
+
+    def test_cache_refreshed_when_prefix_changes(self):
+        """固定部分が変わると古いキャッシュを削除して作り直すかのテスト"""
+        fake = FakeGenAI()
+        prompt_cache.get_cached_model(fake, "gemini-2.5-flash", "prefix v1")
+        prompt_cache.get_cached_model(fake, "gemini-2.5-flash", "prefix v2")
+
+        assert len(fake.cached_contents) == 2
+        assert fake.cached_contents[0].deleted
+        assert not fake.cached_contents[1].deleted
+
+    def test_cache_creation_failure_falls_back(self):
+        """作成に失敗した場合はNoneを返し、同じ固定部分では再試行しないかのテスト"""
+        fake = FakeGenAI(min_cache_tokens=10_000)
+
+        assert prompt_cache.get_cached_model(fake, "gemini-2.5-flash", "short") is None
+        assert prompt_cache.get_cached_model(fake, "gemini-2.5-flash", "short") is None
+        assert fake.cached_contents == []
+
+    def test_disabled(self):
+        """無効化されている場合はキャッシュを作成しないかのテスト"""
+        fake = FakeGenAI()
+        with patch.object(prompt_cache, '_enabled', False):
+            assert prompt_cache.get_cached_model(
+                fake, "gemini-2.5-flash", "prefix") is None
+        assert fake.cached_contents == []
+
+    def test_release_deletes_caches(self):
+        """バッチ終了時にキャッシュがすべて削除されるかのテスト"""
+        fake = FakeGenAI()
+        prompt_cache.get_cached_model(fake, "gemini-2.5-flash", "prefix")
+        prompt_cache.release_context_caches()
+
+        assert fake.cached_contents[0].deleted
+
+    def test_summarize_text_sends_only_paper_text(self):
+        """キャッシュ利用時は論文本文だけを送るかのテスト"""
+        fake = FakeGenAI()
+        with patch.object(pdf_processor, 'genai', fake), \
+                patch.object(pdf_processor, 'load_custom_prompt',
+                             return_value=clean_text("Static prompt")), \
+                patch.object(pdf_processor, 'KeywordManager'):
+            assert pdf_processor.summarize_text("Paper one") is not None
+            assert pdf_processor.summarize_text("Paper two") is not None
+
+        assert len(fake.cached_contents) == 1
+        assert fake.cached_contents[0].contents == [
+            "Static prompt 以下が要約対象のテキストです："]
+        assert [call['contents'] for call in fake.calls] == [
+            "Paper one", "Paper two"]
+        assert all(call['cached_content'] == fake.cached_contents[0].name
+                   for call in fake.calls)
+        assert fake.cached_input_tokens > 0
@@ -0,0 +1,187 @@
+from unittest.mock import patch
+
+import pytest
+
+import main
+from src.obsidian_automation import resilience, zotero_integrator
+from src.obsidian_automation.resilience import (
+    CircuitBreaker,
+    ServiceUnavailableError,
+    call_with_retry,
+    get_retry_after,
+    is_retryable,
+)
+
+
+class ResourceExhausted(Exception):
+    """google.api_coreの429と同じ形のテスト用例外"""
+    code = 429
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code, headers)
+
+
+class FakeClock:
+    """sleepで時刻が進むテスト用の時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Flaky:
+    """指定した例外を順に送出し、その後は成功する関数"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, value):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return value
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("gemini", failure_threshold=3, base_pause=10,
+                          max_pause=100, clock=clock, sleep=clock.sleep)
+
+
+class TestResilience:
+    """resilience.pyのテスト"""
+
+    def test_is_retryable(self):
+        """429・5xx・通信エラーだけを一時的なエラーとみなすかのテスト"""
+        assert is_retryable(ResourceExhausted("429 quota"))
+        assert is_retryable(HTTPError(503))
+        assert is_retryable(ConnectionError("reset"))
+        assert not is_retryable(HTTPError(400))
+        assert not is_retryable(ValueError("bad request"))
+        assert not is_retryable(ServiceUnavailableError("gemini", "stopped"))
+
+    def test_get_retry_after(self):
+        """Retry-After・Backoffヘッダー・GeminiのRetryInfoから待ち時間を取得できるかのテスト"""
+        assert get_retry_after(HTTPError(429, {'Retry-After': '7'})) == 7.0
+        assert get_retry_after(HTTPError(200, {'Backoff': '30'})) == 30.0
+        assert get_retry_after(ResourceExhausted(
+            "429 Quota exceeded. Please retry in 12.5s.")) == 12.5
+        assert get_retry_after(ResourceExhausted(
+            "429 [violations {...}, retry_delay {\n  seconds: 41\n}]")) == 41.0
+        assert get_retry_after(HTTPError(500)) is None
+
+    def test_call_with_retry_recovers(self, breaker, clock):
+        """一時的なエラーの後に成功すれば結果を返し、指定された待ち時間以上待つかのテスト"""
+        func = Flaky(ResourceExhausted("429"),
+                     HTTPError(429, {'Retry-After': '5'}))
+        with patch.object(resilience, 'RETRY_BASE_DELAY', 1.0):
+            result = call_with_retry(func, "ok", breaker=breaker,
+                                     max_attempts=5, sleep=clock.sleep)
+        assert result == "ok"
+        assert func.calls == 3
+        assert 0 <= clock.sleeps[0] <= 1.0
+        assert clock.sleeps[1] >= 5.0
+        assert breaker.consecutive_failures == 0
+
+    def test_call_with_retry_gives_up(self, breaker, clock):
+        """試行回数を使い切るとServiceUnavailableErrorになるかのテスト"""
+        func = Flaky(*[HTTPError(503)] * 2)
+        with pytest.raises(ServiceUnavailableError):
+            call_with_retry(func, "ok", breaker=breaker, max_attempts=2,
+                            sleep=clock.sleep)
+        assert func.calls == 2
+
+    def test_non_retryable_error_is_raised_immediately(self, breaker, clock):
+        """一時的でないエラーは再試行せずにそのまま送出するかのテスト"""
+        func = Flaky(ValueError("invalid argument"))
+        with pytest.raises(ValueError):
+            call_with_retry(func, "ok", breaker=breaker, sleep=clock.sleep)
+        assert func.calls == 1
+        assert clock.sleeps == []
+
+    def test_circuit_breaker_pauses_and_probes(self, breaker, clock):
+        """連続失敗で一時停止し、停止明けの試行が失敗すると停止時間が倍になるかのテスト"""
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_failure()
+        assert breaker.remaining_pause() == 10
+
+        breaker.before_call()  # 停止明けまで待ってから試行する
+        assert clock.sleeps == [10]
+        breaker.record_failure()
+        assert breaker.remaining_pause() == 20
+
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.remaining_pause() == 0
+        assert breaker.pause_count == 0
+
+    def test_circuit_breaker_trips_on_long_retry_after(self, breaker):
+        """待ち時間が上限を超える場合は以降の呼び出しを中止するかのテスト"""
+        breaker.record_failure(retry_after=3600)
+        with pytest.raises(ServiceUnavailableError):
+            breaker.before_call()
+
+    def test_zotero_backoff_pauses_all_workers(self, clock):
+        """pyzoteroが記録したBackoffの期限をサーキットブレーカーに反映するかのテスト"""
+        zotero_breaker = CircuitBreaker("zotero", clock=clock, sleep=clock.sleep)
+
+        class Client:
+            backoff_until = 0
+
+            def items(self, q=None):
+                self.backoff_until = resilience.time.time() + 30
+                return []
+
+        client = Client()
+        with patch.object(zotero_integrator, 'get_circuit_breaker',
+                          return_value=zotero_breaker), \
+                patch.object(resilience, 'get_circuit_breaker',
+                             return_value=zotero_breaker):
+            assert zotero_integrator.zotero_request(client, client.items, q="x") == []
+        assert 29 < zotero_breaker.remaining_pause() <= 30
+
+    def test_process_pdf_does_not_write_note_when_throttled(self):
+        """Geminiの障害が続いた場合は空の要約でノートを作らないかのテスト"""
+        with patch('main.extract_text_from_pdf', return_value="paper text"), \
+                patch('main.save_cached_text'), \
+                patch('main.summarize_routed',
+                      side_effect=ServiceUnavailableError("gemini", "429")), \
+                patch('main.get_zotero_item_info') as mock_zotero, \
+                patch('main.create_obsidian_note') as mock_create:
+            assert main.process_pdf("/pdfs/paper.pdf") is False
+        mock_zotero.assert_not_called()
+        mock_create.assert_not_called()
+
+    def test_process_pdf_does_not_write_note_without_zotero(self):
+        """Zoteroの障害が続いた場合はメタデータなしのノートを作らないかのテスト"""
+        with patch('main.extract_text_from_pdf', return_value="paper text"), \
+                patch('main.save_cached_text'), \
+                patch('main.summarize_routed', return_value={'keyword': '#A'}), \
+                patch('main.get_zotero_item_info',
+                      side_effect=ServiceUnavailableError("zotero", "503")), \
+                patch('main.create_obsidian_note') as mock_create:
+            assert main.process_pdf("/pdfs/paper.pdf") is False
+        mock_create.assert_not_called()
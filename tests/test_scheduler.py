@@ -0,0 +1,85 @@
+import os
+import tempfile
+
+import pytest
+
+from benchmarks.synthetic_pdf import write_pdf
+from src.obsidian_automation import scheduler
+from src.obsidian_automation.scheduler import (
+    ESTIMATED_PROMPT_TOKENS,
+    ESTIMATED_TOKENS_PER_PAGE,
+    count_pdf_pages,
+    load_priority_list,
+    order_pdfs,
+    schedule_pdfs,
+    select_within_budget,
+)
+
+
+class TestScheduler:
+    """scheduler.pyのテスト"""
+
+    @pytest.fixture
+    def pdf_folder(self):
+        """ページ数と更新日時の異なる3本のテスト用PDF（Cが最も新しい）"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i, (name, pages) in enumerate((("A", 12), ("B", 3), ("C", 7))):
+                pdf_path = os.path.join(temp_dir, f"{name}.pdf")
+                write_pdf(pdf_path, [f"{name} page {n}" for n in range(pages)])
+                os.utime(pdf_path, (1000 + i, 1000 + i))
+            yield temp_dir
+
+    @staticmethod
+    def names(pdf_paths):
+        return [os.path.splitext(os.path.basename(path))[0] for path in pdf_paths]
+
+    def test_count_pdf_pages(self, pdf_folder):
+        """ページ数を取得でき、読めないファイルはNoneになるかのテスト"""
+        assert count_pdf_pages(os.path.join(pdf_folder, "A.pdf")) == 12
+        assert count_pdf_pages(os.path.join(pdf_folder, "missing.pdf")) is None
+
+    def test_order_pdfs(self, pdf_folder):
+        """各処理順で並べ替えられるかのテスト"""
+        paths = [os.path.join(pdf_folder, f"{name}.pdf") for name in "BCA"]
+        pages = {path: count_pdf_pages(path) for path in paths}
+        assert self.names(order_pdfs(paths, "name")) == ["A", "B", "C"]
+        assert self.names(order_pdfs(paths, "newest")) == ["C", "B", "A"]
+        assert self.names(order_pdfs(paths, "oldest")) == ["A", "B", "C"]
+        assert self.names(order_pdfs(paths, "smallest", page_counts=pages)) == ["B", "C", "A"]
+        assert self.names(order_pdfs(paths, "priority", priority=["A"])) == ["A", "C", "B"]
+
+    def test_load_priority_list(self):
+        """優先リストの拡張子・コメント・空行を扱えるかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            priority_file = os.path.join(temp_dir, "priority.txt")
+            with open(priority_file, 'w', encoding='utf-8') as f:
+                f.write("# 今週読む\nPaper B.pdf\n\nPaper A  # 締切前\nPaper B\n")
+            assert load_priority_list(priority_file) == ["Paper B", "Paper A"]
+
+    def test_select_within_budget(self):
+        """論文数とトークン数の上限に収まる分を順序を保って選ぶかのテスト"""
+        paths = ["a.pdf", "b.pdf", "c.pdf", "d.pdf"]
+        tokens = {"a.pdf": 40, "b.pdf": 80, "c.pdf": 30, "d.pdf": 20}
+        assert select_within_budget(paths, max_papers=2) == (
+            ["a.pdf", "b.pdf"], ["c.pdf", "d.pdf"])
+        # bは予算を超えるため飛ばし、後ろのc・dで残りの予算を使う
+        assert select_within_budget(paths, max_tokens=100, token_estimates=tokens) == (
+            ["a.pdf", "c.pdf", "d.pdf"], ["b.pdf"])
+        assert select_within_budget(paths) == (paths, [])
+
+    def test_schedule_pdfs_token_budget(self, pdf_folder):
+        """ページ数から見積もったトークン数の上限で今回の処理分を選ぶかのテスト"""
+        paths = [os.path.join(pdf_folder, f"{name}.pdf") for name in "ABC"]
+        budget = (3 + 7) * ESTIMATED_TOKENS_PER_PAGE + 2 * ESTIMATED_PROMPT_TOKENS
+        selected, deferred = schedule_pdfs(paths, order="smallest", max_tokens=budget)
+        assert self.names(selected) == ["B", "C"]
+        assert self.names(deferred) == ["A"]
+
+    def test_schedule_pdfs_skips_page_count_when_unneeded(self, pdf_folder, monkeypatch):
+        """ページ数が不要な場合はPDFを開かないかのテスト"""
+        monkeypatch.setattr(scheduler, 'count_pdf_pages',
+                            lambda path: pytest.fail("ページ数を取得した"))
+        paths = [os.path.join(pdf_folder, f"{name}.pdf") for name in "ABC"]
+        selected, deferred = schedule_pdfs(paths, order="newest", max_papers=1)
+        assert self.names(selected) == ["C"]
+        assert self.names(deferred) == ["B", "A"]
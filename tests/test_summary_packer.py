@@ -0,0 +1,118 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from benchmarks.fakes import FakeGenAI
+from benchmarks.synthetic_pdf import write_pdf
+from src.obsidian_automation import pdf_processor
+from src.obsidian_automation.llm_json import build_object_schema
+from src.obsidian_automation.pdf_processor import clean_text, summarize_packed
+from src.obsidian_automation.summary_packer import group_packs, prepare_packed_summaries
+
+SCHEMA = build_object_schema(['abstract', 'result'])
+
+
+class IncompleteFakeGenAI(FakeGenAI):
+    """論文0002の要約だけabstractを返さないフェイク"""
+
+    def make_summary(self, prompt):
+        summary = super().make_summary(prompt)
+        if 'Synthetic Paper 0002' in prompt:
+            del summary['abstract']
+        return summary
+
+
+def summarize_patches(fake):
+    return [patch.object(pdf_processor, 'genai', fake),
+            patch.object(pdf_processor, 'load_custom_prompt',
+                         return_value=clean_text("Static prompt")),
+            patch.object(pdf_processor, 'get_summary_schema', return_value=SCHEMA),
+            patch.object(pdf_processor, 'KeywordManager')]
+
+
+class TestSummaryPacker:
+    """summary_packer.pyとpdf_processor.summarize_packedのテスト"""
+
+    def run_packed(self, fake, texts):
+        patches = summarize_patches(fake)
+        for p in patches:
+            p.start()
+        try:
+            return summarize_packed(texts)
+        finally:
+            for p in patches:
+                p.stop()
+
+    def test_summarize_packed(self):
+        """1回のリクエストで論文ごとの要約を識別子で対応付けるかのテスト"""
+        fake = FakeGenAI()
+        results = self.run_packed(fake, {'paper1': "Synthetic Paper 0001 body",
+                                         'paper2': "Synthetic Paper 0002 body"})
+
+        assert len(fake.calls) == 1
+        schema = fake.calls[0]['kwargs']['generation_config']['response_schema']
+        assert schema['type'] == 'array'
+        assert schema['items']['required'] == ['id', 'abstract', 'result']
+        assert results['paper1']['abstract'] == "abstract of paper 0001"
+        assert results['paper2']['result'] == "result of paper 0002"
+
+    def test_invalid_entry_is_not_used(self):
+        """検証に通らなかった論文はNoneにして1本ずつの要約に回すかのテスト"""
+        results = self.run_packed(IncompleteFakeGenAI(), {
+            'paper1': "Synthetic Paper 0001 body", 'paper2': "Synthetic Paper 0002 body"})
+
+        assert results['paper1']['abstract'] == "abstract of paper 0001"
+        assert results['paper2'] is None
+
+    def test_group_packs(self):
+        """まとめる論文数ごとに分け、1本だけのグループは除くかのテスト"""
+        assert group_packs(['a', 'b', 'c', 'd', 'e'], 2) == [['a', 'b'], ['c', 'd']]
+        assert group_packs(['a'], 4) == []
+
+    def test_prepare_packed_summaries(self):
+        """短い論文だけを抽出してまとめて要約するかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            paths = []
+            for index in range(1, 4):
+                path = os.path.join(folder, f"short{index}.pdf")
+                write_pdf(path, [f"Synthetic Paper 000{index} short workshop paper"])
+                paths.append(path)
+            long_text = os.path.join(folder, "long_text.pdf")
+            write_pdf(long_text, ["Synthetic Paper 0009 " + "dense text " * 200])
+            many_pages = os.path.join(folder, "many_pages.pdf")
+            write_pdf(many_pages, [f"Synthetic Paper 0008 page {n}" for n in range(5)])
+
+            fake = FakeGenAI()
+            patches = summarize_patches(fake)
+            for p in patches:
+                p.start()
+            try:
+                prepared = prepare_packed_summaries(
+                    paths + [long_text, many_pages], max_tokens=400, pack_size=2)
+            finally:
+                for p in patches:
+                    p.stop()
+
+        assert len(fake.calls) == 1
+        assert prepared[paths[0]]['summary']['abstract'] == "abstract of paper 0001"
+        assert prepared[paths[1]]['summary']['abstract'] == "abstract of paper 0002"
+        # 3本目は1本だけ残るためまとめず、長い論文も1本ずつ要約する（抽出したテキストは使い回す）
+        assert prepared[paths[2]]['summary'] is None
+        assert "Synthetic Paper 0003" in prepared[paths[2]]['text']
+        assert prepared[long_text]['summary'] is None
+        assert many_pages not in prepared
+
+    def test_process_pdf_uses_prepared(self):
+        """まとめて要約した論文は抽出も要約もし直さないかのテスト"""
+        import main
+        prepared = {"paper.pdf": {'text': "Paper text", 'summary': {'abstract': "packed"}}}
+        with patch('main.extract_text_from_pdf') as mock_extract, \
+                patch('main.summarize_routed') as mock_summarize, \
+                patch('main.get_zotero_item_info', return_value=None), \
+                patch('main.create_obsidian_note') as mock_create, \
+                patch('main.save_cached_text'):
+            assert main.process_pdf("paper.pdf", prepared_papers=prepared) is True
+
+        mock_extract.assert_not_called()
+        mock_summarize.assert_not_called()
+        assert mock_create.call_args[0][2]['abstract'] == "packed"
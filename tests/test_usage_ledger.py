@@ -0,0 +1,109 @@
+import json
+import os
+from unittest.mock import patch
+
+from benchmarks.fakes import FakeGenAI, FakeResponse, FakeUsageMetadata
+from src.obsidian_automation import pdf_processor, scheduler, usage_ledger
+from src.obsidian_automation.pdf_processor import clean_text, summarize_text
+from src.obsidian_automation.usage_ledger import (
+    get_ledger_path,
+    get_run_usage,
+    get_today_usage,
+    has_daily_quota,
+    quota_date,
+    record_usage,
+    usage_paper,
+)
+
+
+def read_ledger():
+    with open(get_ledger_path(), 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+class TestUsageLedger:
+    """usage_ledger.pyのテスト"""
+
+    def test_record_usage(self):
+        """呼び出しごとの使用量を台帳に追記し、実行の合計を集計するかのテスト"""
+        response = FakeResponse("{}", FakeUsageMetadata(1200, 300, 1000))
+        with usage_paper("Attention Is All You Need"):
+            record_usage(response, "gemini-2.5-flash", 1.23456)
+        record_usage(response, "gemini-1.5-flash", 0.5, kind='keywords')
+
+        entries = read_ledger()
+        assert len(entries) == 2
+        assert entries[0]['paper'] == "Attention Is All You Need"
+        assert entries[0]['input_tokens'] == 1200
+        assert entries[0]['output_tokens'] == 300
+        assert entries[0]['cached_tokens'] == 1000
+        assert entries[0]['latency'] == 1.235
+        assert entries[1]['paper'] is None
+        assert entries[1]['kind'] == 'keywords'
+
+        usage = get_run_usage()
+        assert usage['total']['requests'] == 2
+        assert usage['total']['output_tokens'] == 600
+        assert usage['models']['gemini-1.5-flash']['input_tokens'] == 1200
+
+    def test_today_usage_includes_previous_runs(self):
+        """今日の使用量に以前の実行の分を含め、別の日の分は含めないかのテスト"""
+        with open(get_ledger_path(), 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'date': quota_date(), 'input_tokens': 5000,
+                                'output_tokens': 500}) + '\n')
+            f.write(json.dumps({'date': '2000-01-01', 'input_tokens': 9999}) + '\n')
+            f.write("壊れた行\n")
+        record_usage(FakeResponse("{}", FakeUsageMetadata(100, 10)), "gemini-2.5-flash", 0.1)
+
+        today = get_today_usage()
+        assert today['requests'] == 2
+        assert today['input_tokens'] == 5100
+        assert today['output_tokens'] == 510
+
+    def test_daily_quota(self):
+        """1日の上限の残りで要約を始めるか判断するかのテスト"""
+        record_usage(FakeResponse("{}", FakeUsageMetadata(9000, 500)), "gemini-2.5-flash", 0.1)
+        with patch.object(usage_ledger, 'GEMINI_DAILY_TOKEN_LIMIT', 10000):
+            assert has_daily_quota(400)
+            assert not has_daily_quota(600)
+            assert scheduler.clamp_to_daily_quota(None, 100000) == (None, 500)
+        with patch.object(usage_ledger, 'GEMINI_DAILY_REQUEST_LIMIT', 1):
+            assert not has_daily_quota()
+            assert scheduler.clamp_to_daily_quota(5, None) == (0, None)
+        assert has_daily_quota(10 ** 9)
+
+    def test_summarize_text_records_usage(self):
+        """要約のリクエストの使用量がモデル名と論文名付きで記録されるかのテスト"""
+        with patch.object(pdf_processor, 'genai', FakeGenAI()), \
+                patch.object(pdf_processor, 'load_custom_prompt',
+                             return_value=clean_text("Static prompt")), \
+                patch.object(pdf_processor, 'KeywordManager'), \
+                usage_paper("Synthetic Paper 0001"):
+            summarize_text("Synthetic Paper 0001 body text")
+
+        entry, = read_ledger()
+        assert entry['model'] == "gemini-2.5-flash"
+        assert entry['kind'] == 'summary'
+        assert entry['paper'] == "Synthetic Paper 0001"
+        assert entry['input_tokens'] > 0 and entry['output_tokens'] > 0
+
+    def test_ledger_disabled(self):
+        """GEMINI_USAGE_LEDGERを無効にした場合は台帳に書かず、集計だけ行うかのテスト"""
+        with patch.object(usage_ledger, 'GEMINI_USAGE_LEDGER', False):
+            record_usage(FakeResponse("{}", FakeUsageMetadata(10, 1)), "gemini-2.5-flash", 0.1)
+        assert not os.path.exists(get_ledger_path())
+        assert get_run_usage()['total']['requests'] == 1
+
+    def test_process_pdf_stops_at_daily_limit(self):
+        """上限に達した場合は要約せず、ノートも作らずに次回の実行に回すかのテスト"""
+        import main
+        with patch.object(usage_ledger, 'GEMINI_DAILY_REQUEST_LIMIT', 0), \
+                patch('main.open_pdf'), \
+                patch('main.extract_text_from_pdf', return_value="Paper text"), \
+                patch('main.save_cached_text'), \
+                patch('main.summarize_routed') as mock_summarize, \
+                patch('main.create_obsidian_note') as mock_create:
+            assert main.process_pdf("paper.pdf") is False
+
+        mock_summarize.assert_not_called()
+        mock_create.assert_not_called()
@@ -0,0 +1,162 @@
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from src.obsidian_automation import vault_index
+from src.obsidian_automation.vault_index import (
+    extract_tags,
+    first_section_line,
+    parse_frontmatter,
+    update_vault_index,
+    update_vault_indexes,
+)
+
+NOTE = """---
+title: "Attention Is All You Need"
+authors:
+  - Vaswani, Ashish
+  - Shazeer, Noam
+year: "2017"
+rating: 4
+---
+
+> [!Abstract]
+> The dominant sequence transduction models ...
+
+# Memo
+
+# Comments
+
+Transformerの原論文。
+二行目は含めない
+
+# Citation
+
+> [!Keyword]-
+> Field: #NLP
+> Theme: #Attention
+> #Transformer
+> #MachineTranslation
+"""
+
+
+def write_note(folder, name, content):
+    path = os.path.join(folder, f"{name}.md")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+class TestVaultIndex:
+    """vault_index.pyのテスト"""
+
+    def test_parse_frontmatter(self):
+        """フロントマターの文字列・数値・リストを解析できるかのテスト"""
+        frontmatter = parse_frontmatter(NOTE)
+        assert frontmatter['title'] == "Attention Is All You Need"
+        assert frontmatter['authors'] == ["Vaswani, Ashish", "Shazeer, Noam"]
+        assert frontmatter['year'] == "2017"
+        assert frontmatter['rating'] == 4
+
+    def test_first_comment_line_and_tags(self):
+        """コメントの1行目とタグを取得できるかのテスト"""
+        assert first_section_line(NOTE) == "Transformerの原論文。"
+        assert extract_tags(NOTE) == [
+            "NLP", "Attention", "Transformer", "MachineTranslation"]
+
+    def test_update_vault_index_writes_json(self):
+        """Vault全体のインデックスJSONが作成されるかのテスト"""
+        with tempfile.TemporaryDirectory() as note_folder:
+            write_note(note_folder, "Attention", NOTE)
+            write_note(note_folder, "Unread", NOTE.replace("rating: 4", "rating: 0"))
+            update_vault_index(note_folder)
+
+            with open(os.path.join(note_folder, "paper_index.json"),
+                      encoding='utf-8') as f:
+                index = json.load(f)
+
+        entry = index['notes']['Attention.md']
+        assert entry['name'] == "Attention"
+        assert entry['rating'] == 4
+        assert entry['comment'] == "Transformerの原論文。"
+        assert index['notes']['Unread.md']['rating'] == 0
+
+    def test_update_vault_index_reparses_only_changed_notes(self):
+        """変更されたノートだけを読み直し、削除されたノートを除くかのテスト"""
+        with tempfile.TemporaryDirectory() as note_folder:
+            first = write_note(note_folder, "First", NOTE)
+            second = write_note(note_folder, "Second", NOTE)
+            update_vault_index(note_folder)
+
+            write_note(note_folder, "First", NOTE.replace("rating: 4", "rating: 5"))
+            os.remove(second)
+            with patch.object(vault_index, 'build_note_entry',
+                              wraps=vault_index.build_note_entry) as build:
+                index = update_vault_index(note_folder)
+
+        assert build.call_count == 1
+        assert build.call_args.args[1] == first
+        assert index['notes']['First.md']['rating'] == 5
+        assert 'Second.md' not in index['notes']
+
+    def test_update_vault_index_for_written_notes(self):
+        """書き込んだノートだけを指定して更新できるかのテスト"""
+        with tempfile.TemporaryDirectory() as note_folder:
+            write_note(note_folder, "Existing", NOTE)
+            update_vault_index(note_folder)
+            new_note = write_note(note_folder, "New", NOTE)
+            index = update_vault_index(note_folder, [new_note])
+
+        assert set(index['notes']) == {"Existing.md", "New.md"}
+
+    def test_notes_in_note_folders_use_their_own_index(self):
+        """NOTE_FOLDERSのノートはそのフォルダのインデックスに、フォルダからの相対パスで入るかのテスト"""
+        with tempfile.TemporaryDirectory() as vault, \
+                tempfile.TemporaryDirectory() as other_vault:
+            nested = os.path.join(vault, "archive")
+            os.makedirs(nested)
+            roots = [vault, other_vault, nested]
+            write_note(vault, "Main", NOTE)
+            write_note(nested, "Archived", NOTE)
+            other_note = write_note(other_vault, "Other", NOTE)
+
+            indexes = update_vault_indexes([other_note], roots)
+            assert list(indexes) == [other_vault]
+            entry = indexes[other_vault]['notes']['Other.md']
+            assert entry['path'] == "Other.md"
+            assert not os.path.exists(os.path.join(vault, "paper_index.json"))
+
+            # 全体を更新する場合はルートごとに走査し、入れ子のルートは外側のルートに含める
+            indexes = update_vault_indexes(roots=roots)
+            assert set(indexes) == {vault, other_vault}
+            assert set(indexes[vault]['notes']) == {"Main.md", "archive/Archived.md"}
+            assert set(indexes[other_vault]['notes']) == {"Other.md"}
+            assert not os.path.exists(os.path.join(nested, "paper_index.json"))
+            with open(os.path.join(vault, "paper_index.json"), encoding='utf-8') as f:
+                assert not any(key.startswith('..') for key in json.load(f)['notes'])
+
+    def test_vault_index_file_applies_to_note_folder(self):
+        """VAULT_INDEX_FILEはNOTE_FOLDERのインデックスにだけ使うかのテスト"""
+        with patch.object(vault_index, 'VAULT_INDEX_FILE', "/dashboards/index.json"), \
+                patch.object(vault_index, 'NOTE_FOLDER', "/vault"):
+            assert vault_index.get_index_path("/vault") == "/dashboards/index.json"
+            assert vault_index.get_index_path("/other_vault") == os.path.join(
+                "/other_vault", "paper_index.json")
+
+    def test_create_obsidian_note_defers_index_update(self):
+        """ノート作成ごとにはインデックスを書き込まず、実行の最後の更新で反映されるかのテスト"""
+        from src.obsidian_automation import obsidian_note_creator
+
+        with tempfile.TemporaryDirectory() as note_folder, \
+                patch.object(obsidian_note_creator, 'NOTE_FOLDER', note_folder), \
+                patch.object(obsidian_note_creator, 'load_template',
+                             return_value=None):
+            obsidian_note_creator.create_obsidian_note(
+                "/pdfs/Paper.pdf", None, {'abstract': 'text'})
+            assert not os.path.exists(os.path.join(note_folder, "paper_index.json"))
+            update_vault_index(note_folder)
+            index = vault_index.load_vault_index(
+                os.path.join(note_folder, "paper_index.json"))
+
+        assert "Paper.md" in index['notes']
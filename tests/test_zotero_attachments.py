@@ -0,0 +1,141 @@
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.obsidian_automation import zotero_integrator
+from src.obsidian_automation.zotero_attachments import AttachmentIndex
+from src.obsidian_automation.zotero_local import ZoteroLocalLibrary
+from tests.zotero_fixture import create_zotero_library
+
+
+class FakeAttachmentClient:
+    """添付ファイルの取得だけに対応したpyzoteroのフェイク"""
+
+    def __init__(self, version, attachments, deleted=()):
+        self.version = version
+        self.attachments = attachments
+        self.deleted_keys = list(deleted)
+        self.calls = []
+
+    def last_modified_version(self):
+        self.calls.append(('last_modified_version', {}))
+        return self.version
+
+    def items(self, **kwargs):
+        self.calls.append(('items', kwargs))
+        return [{'key': data['key'], 'data': data} for data in self.attachments]
+
+    def everything(self, query):
+        return query
+
+    def deleted(self, **kwargs):
+        self.calls.append(('deleted', kwargs))
+        return {'items': self.deleted_keys}
+
+    def item(self, key):
+        self.calls.append(('item', {'key': key}))
+        return {'key': key, 'data': {'key': key, 'title': f"Parent {key}"}}
+
+
+class TestAttachmentIndex:
+    """zotero_attachments.pyのテスト"""
+
+    def test_find_parent(self):
+        """パスの一致を優先し、ファイル名が一意なら親アイテムを返すかのテスト"""
+        index = AttachmentIndex()
+        index.update([
+            {'key': 'A1', 'parentItem': 'P1', 'path': '/papers/Paper One.pdf'},
+            {'key': 'A2', 'parentItem': 'P2', 'filename': 'Paper Two.pdf'},
+            {'key': 'A3', 'parentItem': 'P3', 'path': 'attachments:sub/Shared.pdf'},
+            {'key': 'A4', 'parentItem': 'P4', 'path': '/other/Shared.pdf'},
+            {'key': 'A5', 'path': '/papers/Standalone.pdf'},
+        ])
+        assert index.find_parent('/papers/Paper One.pdf') == 'P1'
+        assert index.find_parent('/moved/paper two.PDF') == 'P2'
+        assert index.find_parent('/other/Shared.pdf') == 'P4'
+        # 同じファイル名の添付ファイルが複数ある場合は特定しない
+        assert index.find_parent('/downloads/Shared.pdf') is None
+        assert index.find_parent('/papers/Standalone.pdf') is None
+        assert index.find_parent('/papers/Unknown.pdf') is None
+
+    def test_save_and_load(self):
+        """バージョンと添付ファイルを保存して読み込めるかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            index_file = os.path.join(folder, "data", "zotero_attachments.json")
+            index = AttachmentIndex(index_file)
+            index.update([{'key': 'A1', 'parentItem': 'P1', 'filename': 'Paper.pdf'}],
+                         version=12)
+            assert index.save()
+
+            reloaded = AttachmentIndex(index_file)
+            assert reloaded.version == 12
+            assert reloaded.find_parent('/pdfs/Paper.pdf') == 'P1'
+
+            reloaded.update([], deleted_keys=['A1'], version=13)
+            assert reloaded.find_parent('/pdfs/Paper.pdf') is None
+
+
+class TestAttachmentLookup:
+    """zotero_integrator.pyの添付ファイルからの検索のテスト"""
+
+    @pytest.fixture(autouse=True)
+    def reset_index(self):
+        zotero_integrator.reset_attachment_index()
+        yield
+        zotero_integrator.reset_attachment_index()
+
+    def test_local_backend(self):
+        """zotero.sqliteのリンクファイルから親アイテムを特定し、タイトル検索をしないかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            sqlite_path = create_zotero_library(os.path.join(folder, "zotero.sqlite"))
+            library = ZoteroLocalLibrary(sqlite_path, use_snapshot=False)
+            with patch.object(zotero_integrator, 'ZOTERO_BACKEND', 'local'), \
+                    patch.object(zotero_integrator, 'get_local_library',
+                                 return_value=library), \
+                    patch.object(library, 'search_items') as mock_search:
+                data = zotero_integrator.get_zotero_item_info(
+                    "renamed", "/papers/Attention Is All You Need.pdf")
+
+        mock_search.assert_not_called()
+        assert data['key'] == 'ABCD1234'
+
+    def test_api_incremental_update(self):
+        """Web APIでは前回のバージョン以降の添付ファイルだけを取得するかのテスト"""
+        with tempfile.TemporaryDirectory() as folder, \
+                patch.object(zotero_integrator, 'ZOTERO_BACKEND', 'api'), \
+                patch.object(zotero_integrator, 'DATA_DIR', folder):
+            first = FakeAttachmentClient(5, [
+                {'key': 'A1', 'parentItem': 'P1', 'filename': 'Paper One.pdf'}])
+            with patch.object(zotero_integrator, 'get_zotero_client', return_value=first):
+                data = zotero_integrator.get_zotero_item_info("Paper One", "/pdfs/Paper One.pdf")
+            assert data['key'] == 'P1'
+            assert ('items', {'itemType': 'attachment', 'limit': 100}) in first.calls
+
+            zotero_integrator.reset_attachment_index()
+            second = FakeAttachmentClient(8, [
+                {'key': 'A2', 'parentItem': 'P2', 'filename': 'Paper Two.pdf'}],
+                deleted=['A1'])
+            with patch.object(zotero_integrator, 'get_zotero_client', return_value=second):
+                index = zotero_integrator.get_attachment_index()
+            assert ('items', {'itemType': 'attachment', 'limit': 100, 'since': 5}) \
+                in second.calls
+            assert index.version == 8
+            assert index.find_parent('/pdfs/Paper Two.pdf') == 'P2'
+            assert index.find_parent('/pdfs/Paper One.pdf') is None
+
+    def test_fallback_to_title_search(self):
+        """添付ファイルから特定できない場合はタイトル検索を使うかのテスト"""
+        client = MagicMock()
+        client.items.return_value = [
+            {'data': {'itemType': 'attachment', 'title': 'Some Paper', 'parentItem': 'P9'}}]
+        client.item.return_value = {'data': {'key': 'P9', 'title': 'Some Paper'}}
+        with patch.object(zotero_integrator, 'ZOTERO_BACKEND', 'api'), \
+                patch.object(zotero_integrator, 'get_attachment_index',
+                             return_value=AttachmentIndex()), \
+                patch.object(zotero_integrator, 'get_zotero_client', return_value=client):
+            data = zotero_integrator.get_zotero_item_info("Some Paper", "/pdfs/Some Paper.pdf")
+
+        assert data['key'] == 'P9'
+        client.items.assert_called_once()
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import tempfile
+from unittest.mock import patch
+
+import pytest
+
+from src.obsidian_automation import zotero_integrator
+from src.obsidian_automation.zotero_local import SNAPSHOT_FILE_NAME, ZoteroLocalLibrary
+from tests.zotero_fixture import create_zotero_library
+
+
+class TestZoteroLocal:
+    """zotero_local.pyのテスト"""
+
+    @pytest.fixture
+    def library(self):
+        """テスト用のzotero.sqliteをスナップショット経由で開く"""
+        with tempfile.TemporaryDirectory() as folder:
+            sqlite_path = create_zotero_library(os.path.join(folder, "zotero.sqlite"))
+            yield ZoteroLocalLibrary(sqlite_path, use_snapshot=True,
+                                     snapshot_dir=os.path.join(folder, "data"))
+
+    def test_item_shape(self, library):
+        """Web APIと同じ形のアイテムを返すかのテスト"""
+        item = library.item('ABCD1234')
+        data = item['data']
+        assert item['key'] == 'ABCD1234'
+        assert data['itemType'] == 'conferencePaper'
+        assert data['title'] == 'Attention Is All You Need'
+        assert data['date'] == '2017'
+        assert data['proceedingsTitle'] == 'NeurIPS'
+        assert data['creators'] == [
+            {'creatorType': 'author', 'firstName': 'Ashish', 'lastName': 'Vaswani'},
+            {'creatorType': 'author', 'name': 'Google Brain'}]
+        assert data['tags'] == [{'tag': 'Transformer'}]
+        assert data['collections'] == ['COLL0001']
+        assert data['dateAdded'] == '2024-03-01T09:30:00Z'
+        assert library.item('MISSING') is None
+
+    def test_attachment_shape(self, library):
+        """添付ファイルに親アイテムとパスが含まれるかのテスト"""
+        data = library.item('ATT00001')['data']
+        assert data['parentItem'] == 'ABCD1234'
+        assert data['linkMode'] == 'linked_file'
+        assert data['path'] == '/papers/Attention Is All You Need.pdf'
+        assert 'creators' not in data
+
+    def test_search_items(self, library):
+        """すべての単語を含むアイテムだけを返し、ゴミ箱のアイテムは除くかのテスト"""
+        keys = [item['key'] for item in library.search_items("attention is all you need")]
+        assert keys == ['ABCD1234']
+        assert [item['key'] for item in library.search_items("Vaswani 2017")] == ['ABCD1234']
+        assert library.search_items("attention residual") == []
+        assert library.search_items("") == []
+
+    def test_snapshot_is_reused(self, library):
+        """元のファイルが変わらなければスナップショットを作り直さないかのテスト"""
+        library.item('ABCD1234')
+        snapshot = os.path.join(library.snapshot_dir, SNAPSHOT_FILE_NAME)
+        assert os.path.exists(snapshot)
+        mtime = os.stat(snapshot).st_mtime_ns
+
+        reopened = ZoteroLocalLibrary(library.sqlite_path, use_snapshot=True,
+                                      snapshot_dir=library.snapshot_dir)
+        assert reopened.item('EFGH5678')['data']['DOI'] == '10.1109/CVPR.2016.90'
+        assert os.stat(snapshot).st_mtime_ns == mtime
+
+    def test_read_while_locked(self, library):
+        """Zoteroが排他ロックしていても読めるかのテスト"""
+        locker = sqlite3.connect(library.sqlite_path)
+        try:
+            locker.execute("PRAGMA locking_mode = EXCLUSIVE")
+            locker.execute("BEGIN EXCLUSIVE")
+            direct = ZoteroLocalLibrary(library.sqlite_path, use_snapshot=False)
+            assert direct.item('ABCD1234')['data']['title'] == 'Attention Is All You Need'
+        finally:
+            locker.close()
+
+    def test_get_zotero_item_info_local_backend(self, library):
+        """ZOTERO_BACKEND=localでWeb APIを使わずにメタデータを取得できるかのテスト"""
+        with patch.object(zotero_integrator, 'ZOTERO_BACKEND', 'local'), \
+                patch.object(zotero_integrator, 'get_local_library', return_value=library), \
+                patch.object(zotero_integrator, 'get_zotero_client') as mock_client:
+            data = zotero_integrator.get_zotero_item_info("Attention Is All You Need")
+
+        mock_client.assert_not_called()
+        assert data['key'] == 'ABCD1234'
+        assert data['proceedingsTitle'] == 'NeurIPS'
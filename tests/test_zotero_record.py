@@ -0,0 +1,102 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from src.obsidian_automation import obsidian_note_creator, zotero_integrator
+from src.obsidian_automation.obsidian_note_creator import render_template_note
+from src.obsidian_automation.zotero_local import ZoteroLocalLibrary
+from src.obsidian_automation.zotero_record import (
+    RECORD_KEY,
+    attach_record,
+    get_record,
+    normalize_item,
+    parse_date,
+)
+from tests.zotero_fixture import create_zotero_library
+
+ZOTERO_DATA = {
+    'title': 'Attention Is All You Need', 'date': '2017-06-12', 'version': 3,
+    'dateAdded': '2024-03-01T09:30:00Z', 'itemType': 'conferencePaper',
+    'DOI': '10.5555/3295222',
+    'creators': [
+        {'creatorType': 'author', 'firstName': 'Ashish', 'lastName': 'Vaswani'},
+        {'creatorType': 'author', 'name': 'Google Brain'},
+        {'creatorType': 'editor', 'firstName': 'Isabelle', 'lastName': 'Guyon'},
+    ],
+}
+
+TEMPLATE = """---
+year: "{{date | format('YYYY')}}"
+dateread: '{{importDate | format("YYYY-MM-DD")}}'
+authors:
+{{authors_block}}
+---
+{{info_block}}
+{{authors}} ({{year}})
+{{bibliography.slice(4)}}"""
+
+
+class TestZoteroRecord:
+    """zotero_record.pyのテスト"""
+
+    def test_parse_date(self):
+        """Zoteroの日付形式を解析できるかのテスト"""
+        assert parse_date('2024-03-01T09:30:00Z').hour == 9
+        assert parse_date('2023/12/25').day == 25
+        assert parse_date('2017').year == 2017
+        assert parse_date('May 2024') is None
+        assert parse_date('') is None
+
+    def test_normalize_item(self):
+        """日付・著者名・引用をまとめたレコードを作るかのテスト"""
+        record = normalize_item(ZOTERO_DATA)
+        assert record['dates'] == {'date': [2017, 6, 12, 0, 0, 0],
+                                   'dateAdded': [2024, 3, 1, 9, 30, 0]}
+        assert record['year'] == '2017'
+        assert record['author_names'] == ['Ashish Vaswani']
+        assert record['creator_lines'] == ['> **Author**: Vaswani, Ashish',
+                                           '> **Author**: Google Brain',
+                                           '> **Editor**: Guyon, Isabelle']
+        assert record['citation'].startswith("Vaswani, Ashish. 'Attention Is All You Need'")
+
+    def test_render_without_parsing(self):
+        """レコードが付いていればノートの作成時に日付を解析しないかのテスト"""
+        zotero_data = attach_record(dict(ZOTERO_DATA))
+        with patch.object(obsidian_note_creator, 'parse_date',
+                          side_effect=AssertionError("parsed while rendering")):
+            content = render_template_note(TEMPLATE, "Note", "Note.pdf", zotero_data, {})
+
+        assert 'year: "2017"' in content
+        assert "dateread: '2024-03-01'" in content
+        assert "  - Vaswani, Ashish" in content
+        assert "> **FirstAuthor**: Vaswani, Ashish\n> **Author**: Google Brain" in content
+        assert "Ashish Vaswani (2017)" in content
+        assert "[https://doi.org/10.5555/3295222]" in content
+
+    def test_render_matches_without_record(self):
+        """レコードの有無でノートの内容が変わらないかのテスト"""
+        with_record = render_template_note(
+            TEMPLATE, "Note", "Note.pdf", attach_record(dict(ZOTERO_DATA)), {})
+        without_record = render_template_note(
+            TEMPLATE, "Note", "Note.pdf", dict(ZOTERO_DATA), {})
+        assert with_record == without_record
+
+    def test_stale_record(self):
+        """アイテムのバージョンが変わったレコードは使わないかのテスト"""
+        zotero_data = attach_record(dict(ZOTERO_DATA))
+        zotero_data['version'] = 4
+        zotero_data['date'] = '2018-01-01'
+        assert get_record(zotero_data)['year'] == '2018'
+
+    def test_attached_on_fetch(self):
+        """Zoteroから取得したアイテムにレコードが付くかのテスト"""
+        with tempfile.TemporaryDirectory() as folder:
+            sqlite_path = create_zotero_library(os.path.join(folder, "zotero.sqlite"))
+            library = ZoteroLocalLibrary(sqlite_path, use_snapshot=False)
+            with patch.object(zotero_integrator, 'ZOTERO_BACKEND', 'local'), \
+                    patch.object(zotero_integrator, 'get_local_library',
+                                 return_value=library):
+                data = zotero_integrator.get_zotero_item_info("Attention Is All You Need")
+
+        assert data[RECORD_KEY]['year'] == '2017'
+        assert data[RECORD_KEY]['author_names'] == ['Ashish Vaswani']
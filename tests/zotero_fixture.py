@@ -0,0 +1,81 @@
+import sqlite3
+
+# zotero.sqliteのうち、zotero_local.pyが読むテーブルだけを持つ小さなデータベース
+# （主キーとインデックスは実際のスキーマに合わせている）
+SCHEMA = """
+CREATE TABLE itemTypes (itemTypeID INTEGER PRIMARY KEY, typeName TEXT);
+CREATE TABLE items (itemID INTEGER PRIMARY KEY, itemTypeID INT, dateAdded TEXT,
+                    dateModified TEXT, libraryID INT, key TEXT UNIQUE, version INT DEFAULT 0);
+CREATE TABLE fields (fieldID INTEGER PRIMARY KEY, fieldName TEXT);
+CREATE TABLE itemDataValues (valueID INTEGER PRIMARY KEY, value TEXT);
+CREATE TABLE itemData (itemID INT, fieldID INT, valueID INT, PRIMARY KEY (itemID, fieldID));
+CREATE TABLE creators (creatorID INTEGER PRIMARY KEY, firstName TEXT, lastName TEXT,
+                       fieldMode INT);
+CREATE TABLE creatorTypes (creatorTypeID INTEGER PRIMARY KEY, creatorType TEXT);
+CREATE TABLE itemCreators (itemID INT, creatorID INT, creatorTypeID INT, orderIndex INT,
+                           PRIMARY KEY (itemID, creatorID, creatorTypeID, orderIndex));
+CREATE TABLE itemAttachments (itemID INTEGER PRIMARY KEY, parentItemID INT, linkMode INT,
+                              contentType TEXT, path TEXT);
+CREATE TABLE deletedItems (itemID INTEGER PRIMARY KEY);
+CREATE TABLE tags (tagID INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE itemTags (itemID INT, tagID INT, type INT, PRIMARY KEY (itemID, tagID));
+CREATE TABLE collections (collectionID INTEGER PRIMARY KEY, key TEXT);
+CREATE TABLE collectionItems (collectionID INT, itemID INT, PRIMARY KEY (collectionID, itemID));
+CREATE INDEX collectionItems_itemID ON collectionItems(itemID);
+"""
+
+ITEM_TYPES = ['journalArticle', 'conferencePaper', 'attachment', 'note']
+FIELDS = ['title', 'date', 'url', 'DOI', 'publicationTitle', 'proceedingsTitle']
+
+
+def create_zotero_library(path):
+    """
+    テスト用のzotero.sqliteを作成
+
+    - ABCD1234: 論文 "Attention Is All You Need"（著者2人、タグ、コレクション）
+    - ATT00001: その論文のPDF（ZotMoovで移動したリンクファイル）
+    - EFGH5678: 論文 "Deep Residual Learning for Image Recognition"（添付なし）
+    - TRASH001: ゴミ箱に入れた論文 "Attention Is All You Need"（検索対象外）
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO itemTypes VALUES (?, ?)", enumerate(ITEM_TYPES, 1))
+    conn.executemany("INSERT INTO fields VALUES (?, ?)", enumerate(FIELDS, 1))
+    conn.executemany("INSERT INTO creatorTypes VALUES (?, ?)", [(1, 'author'), (2, 'editor')])
+
+    def add_item(item_id, type_name, key, values, date_added='2024-01-01 10:00:00'):
+        conn.execute("INSERT INTO items VALUES (?, ?, ?, ?, 1, ?, 3)",
+                     (item_id, ITEM_TYPES.index(type_name) + 1, date_added,
+                      date_added, key))
+        for field, value in values.items():
+            value_id = conn.execute("INSERT INTO itemDataValues (value) VALUES (?)",
+                                    (value,)).lastrowid
+            conn.execute("INSERT INTO itemData VALUES (?, ?, ?)",
+                         (item_id, FIELDS.index(field) + 1, value_id))
+
+    add_item(1, 'conferencePaper', 'ABCD1234', {
+        'title': 'Attention Is All You Need', 'date': '2017-00-00 2017',
+        'proceedingsTitle': 'NeurIPS', 'url': 'https://arxiv.org/abs/1706.03762'},
+        '2024-03-01 09:30:00')
+    conn.executemany("INSERT INTO creators VALUES (?, ?, ?, ?)",
+                     [(1, 'Ashish', 'Vaswani', 0), (2, '', 'Google Brain', 1)])
+    conn.executemany("INSERT INTO itemCreators VALUES (?, ?, ?, ?)",
+                     [(1, 1, 1, 0), (1, 2, 1, 1)])
+    conn.execute("INSERT INTO tags VALUES (1, 'Transformer')")
+    conn.execute("INSERT INTO itemTags VALUES (1, 1, 0)")
+    conn.execute("INSERT INTO collections VALUES (1, 'COLL0001')")
+    conn.execute("INSERT INTO collectionItems VALUES (1, 1)")
+
+    add_item(2, 'attachment', 'ATT00001', {'title': 'Full Text PDF'})
+    conn.execute("INSERT INTO itemAttachments VALUES (2, 1, 2, 'application/pdf', ?)",
+                 ('/papers/Attention Is All You Need.pdf',))
+
+    add_item(3, 'journalArticle', 'EFGH5678', {
+        'title': 'Deep Residual Learning for Image Recognition',
+        'date': '2016-06-00 June 2016', 'DOI': '10.1109/CVPR.2016.90'})
+
+    add_item(4, 'conferencePaper', 'TRASH001', {'title': 'Attention Is All You Need'})
+    conn.execute("INSERT INTO deletedItems VALUES (4)")
+    conn.commit()
+    conn.close()
+    return path